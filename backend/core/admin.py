@@ -5,6 +5,9 @@ from .models import Transaction, ChatMessage
 class ChatMessageAdmin(admin.ModelAdmin):
     list_display = ('user', 'created_at', 'source', 'message_short')
     readonly_fields = ('created_at',)
+    list_select_related = ('user',)
+    # skip the COUNT(*) over the whole table on every changelist page
+    show_full_result_count = False
 
     def message_short(self, obj):
         return (obj.message[:75] + '...') if len(obj.message) > 75 else obj.message
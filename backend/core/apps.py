@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from . import forecasting, ledger, search, sync, versioning
+        # derived state first: a read between a state update and the version bump
+        # must not cache the old state under the new version
+        ledger.connect_signals()
+        search.connect_signals()
+        forecasting.connect_signals()
+        versioning.connect_signals()
+        # stamps rows and tombstones from inside versioning's bump (version_bumped)
+        sync.connect_signals()
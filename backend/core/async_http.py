@@ -0,0 +1,57 @@
+# core/async_http.py
+"""
+Shared httpx.AsyncClient for the async LLM proxy.
+
+ - keep-alive connections are pooled by httpx and reused across requests
+ - MAX_CONNECTIONS caps concurrent connections across all hosts
+ - CONNECT_TIMEOUT bounds the TCP/TLS handshake, READ_TIMEOUT bounds every
+   wait for response bytes (so a stalled stream fails instead of hanging)
+
+get_client() returns one client per event loop (connections can't cross
+loops); close_client() closes and forgets it.
+"""
+
+import asyncio
+import weakref
+
+from django.conf import settings
+
+DEFAULT_CONFIG = {
+    "CONNECT_TIMEOUT": 5.0,
+    "READ_TIMEOUT": 60.0,
+    "MAX_CONNECTIONS": 20,
+}
+
+
+class HTTPError(Exception):
+    pass
+
+
+_clients = weakref.WeakKeyDictionary()
+
+
+def http_config():
+    return {**DEFAULT_CONFIG, **getattr(settings, "LLM_HTTP", {})}
+
+
+def get_client():
+    """Shared client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        # imported here: the sync views share http_config() but never need httpx
+        import httpx
+
+        config = http_config()
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(config["READ_TIMEOUT"], connect=config["CONNECT_TIMEOUT"]),
+            limits=httpx.Limits(max_connections=config["MAX_CONNECTIONS"]),
+        )
+        _clients[loop] = client
+    return client
+
+
+async def close_client():
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
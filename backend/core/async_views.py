@@ -0,0 +1,169 @@
+# core/async_views.py
+"""
+Async views, served through the ASGI entry point (finance_ai/asgi.py).
+
+ChatbotLLMStreamView is the streaming counterpart of ChatbotLLMView. It sends
+the chat to OpenRouter with "stream": true on the shared httpx client
+(core.async_http) and relays the tokens as server-sent events while they
+arrive, so a long completion parks a coroutine instead of a worker thread.
+
+Replies go through the same cache as the sync view (core.llm_cache): a
+hit, or a request identical to one already streaming, gets the whole reply
+as a single token event without calling upstream.
+
+Events sent to the client:
+    data: {"token": "..."}                  one per content delta
+    event: done   data: <ChatMessage>       the saved message, last
+    event: error  data: {"detail": "..."}   upstream failure or timeout
+"""
+
+import asyncio
+import json
+import os
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .async_http import HTTPError, get_client, http_config
+from .llm_cache import get_reply_cache, reply_cache_key
+from .models import ChatMessage
+from .serializers import ChatMessageSerializer
+from .views import llm_history, openrouter_request
+
+
+def _sse(data, event=None):
+    frame = f"data: {json.dumps(data)}\n\n"
+    return f"event: {event}\n{frame}" if event else frame
+
+
+def _authenticate(request):
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return None
+    return result[0] if result else None
+
+
+def _upstream_error(body, status):
+    try:
+        error = json.loads(body).get("error")
+    except (ValueError, AttributeError):
+        error = None
+    if isinstance(error, dict):
+        error = error.get("message")
+    return error or f"OpenRouter returned HTTP {status}"
+
+
+async def _stream_upstream(url, headers, payload, tokens):
+    try:
+        async with get_client().stream("POST", url, headers=headers, json=payload) as response:
+            if response.status_code != 200:
+                body = (await response.aread()).decode("utf-8", "replace")
+                raise HTTPError(_upstream_error(body, response.status_code))
+            # read to the end of the body (past [DONE]) so the connection goes back to the pool
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    # blank separators and ": keep-alive" comments
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    continue
+                event = json.loads(data)
+                if event.get("error"):
+                    raise HTTPError(_upstream_error(data, response.status_code))
+                token = ((event.get("choices") or [{}])[0].get("delta") or {}).get("content")
+                if token:
+                    tokens.append(token)
+                    yield token
+    except httpx.TimeoutException:
+        raise HTTPError(f"No data from upstream for {http_config()['READ_TIMEOUT']}s") from None
+    except httpx.HTTPError as e:
+        raise HTTPError(f"Could not reach upstream: {e}") from None
+
+
+async def _reply_tokens(user, url, headers, payload):
+    """Tokens of the reply: from the cache, a coalesced in-flight call, or streamed from upstream."""
+    cache = get_reply_cache()
+    key = reply_cache_key(payload["model"], payload["messages"], user.pk)
+    reply = cache.get(key)
+    if reply is not None:
+        yield reply
+        return
+
+    future, leader = cache.claim(key)
+    if not leader:
+        timeout = http_config()["READ_TIMEOUT"]
+        try:
+            yield await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            raise HTTPError("Timed out waiting for an identical request in flight") from None
+        return
+
+    tokens = []
+    error = HTTPError("Request cancelled")
+    try:
+        async for token in _stream_upstream(url, headers, payload, tokens):
+            yield token
+        error = None
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        # always settle the future, even if the client went away mid-stream
+        cache.resolve(key, future, "".join(tokens) if error is None else None, error)
+
+
+async def _relay(user, user_msg, url, headers, payload):
+    tokens = []
+    try:
+        async for token in _reply_tokens(user, url, headers, payload):
+            tokens.append(token)
+            yield _sse({"token": token})
+    except (HTTPError, ValueError) as e:
+        yield _sse({"detail": str(e)}, event="error")
+        return
+
+    msg = await sync_to_async(ChatMessage.objects.create)(
+        user=user,
+        message=user_msg,
+        reply="".join(tokens),
+        source="openrouter",
+    )
+    yield _sse(ChatMessageSerializer(msg).data, event="done")
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class ChatbotLLMStreamView(View):
+    http_method_names = ["post"]
+
+    async def post(self, request):
+        user = await sync_to_async(_authenticate)(request)
+        if user is None:
+            return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+
+        try:
+            user_msg = (json.loads(request.body or b"{}").get("message") or "").strip()
+        except (ValueError, AttributeError):
+            user_msg = ""
+        if not user_msg:
+            return JsonResponse({"detail": "Message required."}, status=400)
+
+        api_key = os.environ.get("OPENROUTER_API_KEY")
+        if not api_key:
+            return JsonResponse({"detail": "OpenRouter API key missing"}, status=503)
+
+        history = await sync_to_async(llm_history)(user, user_msg)
+        url, headers, payload = openrouter_request(history, api_key, stream=True)
+
+        response = StreamingHttpResponse(_relay(user, user_msg, url, headers, payload),
+                                         content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        # don't let nginx buffer the stream
+        response["X-Accel-Buffering"] = "no"
+        return response
@@ -0,0 +1,163 @@
+# core/batch.py
+"""
+Batched, idempotent writes for clients replaying an offline queue.
+
+A batch is a list of items:
+    {"key": "<client idempotency key>", "op": "create", "kind": "expense", "data": {...}}
+    {"key": "<client idempotency key>", "op": "delete", "kind": "goal", "id": 42}
+where kind is transaction, expense, income or goal and `data` is what the
+kind's list endpoint accepts on POST.
+
+Keys already applied (IdempotencyKey, unique on (user, key)) are answered
+with their stored result, found with one indexed lookup for the whole
+batch; a key repeated inside the batch shares the first item's result.
+The other items are validated with the regular serializers. If any is
+invalid nothing is applied; otherwise they are applied in one transaction
+with one bulk insert and one DELETE per kind, and their keys are stored
+with one bulk_create. Deleting a row that is already gone is not an
+error: the item reports 404 and its key is stored like any other.
+"""
+
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction as db_transaction
+
+from .forecasting import FORECAST_SOURCES, rebuild_forecast_state
+from .models import Expense, Goal, IdempotencyKey, Income, Transaction
+from .serializers import ExpenseSerializer, GoalSerializer, IncomeSerializer, TransactionSerializer
+from .statements import bulk_insert
+from .sync import mark_changed
+from .versioning import bump_data_version
+
+MAX_ITEMS = 500
+MAX_KEY_LENGTH = 64
+
+# kind -> (model, serializer validating "create" data)
+KINDS = {
+    "transaction": (Transaction, TransactionSerializer),
+    "expense": (Expense, ExpenseSerializer),
+    "income": (Income, IncomeSerializer),
+    "goal": (Goal, GoalSerializer),
+}
+OPS = ("create", "delete")
+
+
+class BatchError(ValueError):
+    pass
+
+
+def _item_error(item):
+    if not isinstance(item, dict):
+        return {"non_field_errors": ["Each item must be an object."]}
+    errors = {}
+    key = item.get("key")
+    if not isinstance(key, str) or not 0 < len(key) <= MAX_KEY_LENGTH:
+        errors["key"] = [f"A string of 1 to {MAX_KEY_LENGTH} characters is required."]
+    if item.get("op") not in OPS:
+        errors["op"] = [f"Must be one of: {', '.join(OPS)}."]
+    if item.get("kind") not in KINDS:
+        errors["kind"] = [f"Must be one of: {', '.join(KINDS)}."]
+    if item.get("op") == "create" and not isinstance(item.get("data"), dict):
+        errors["data"] = ["An object is required for create."]
+    if item.get("op") == "delete" and (not isinstance(item.get("id"), int) or isinstance(item.get("id"), bool)):
+        errors["id"] = ["An integer id is required for delete."]
+    return errors
+
+
+def _result(item, status, **extra):
+    return {"key": item["key"], "op": item["op"], "kind": item["kind"], "status": status, **extra}
+
+
+def _apply(user, creates, deletes):
+    """Apply validated creates {kind: [(item, instance)]} and deletes {kind: [item]}; returns {key: result}."""
+    results = {}
+    with db_transaction.atomic():
+        for kind, entries in creates.items():
+            model = KINDS[kind][0]
+            instances = [instance for _, instance in entries]
+            # Goal is not a ledger model: nothing to fold in besides the sync stamp below
+            created = model.objects.bulk_create(instances) if model is Goal else bulk_insert(model, instances)
+            for (item, _), row in zip(entries, created):
+                results[item["key"]] = _result(item, 201, id=row.pk)
+        if creates:
+            # bulk_create skips the signals: refresh the forecast state, then bump once and stamp the rows
+            for kind in creates:
+                if kind in FORECAST_SOURCES:
+                    rebuild_forecast_state(user.pk, kind)
+            version = bump_data_version(user.pk)
+            for kind, entries in creates.items():
+                model = KINDS[kind][0]
+                mark_changed(model.objects.filter(pk__in=[results[item["key"]]["id"] for item, _ in entries]), version)
+
+        for kind, items in deletes.items():
+            # QuerySet.delete() still sends the per-row delete signals (totals, version, tombstones)
+            rows = KINDS[kind][0].objects.filter(user=user, pk__in=[item["id"] for item in items])
+            found = set(rows.values_list("pk", flat=True))
+            rows.delete()
+            for item in items:
+                results[item["key"]] = _result(item, 200 if item["id"] in found else 404, id=item["id"])
+
+        IdempotencyKey.objects.bulk_create(
+            [IdempotencyKey(user=user, key=key, result=result) for key, result in results.items()]
+        )
+    return results
+
+
+def apply_batch(user, items, retry=True):
+    """
+    Apply a batch for `user`. Returns (applied, results): one result per
+    item, in order; applied is False when invalid items rejected the batch.
+    """
+    if not isinstance(items, list) or not items:
+        raise BatchError("'items' must be a non-empty list.")
+    if len(items) > MAX_ITEMS:
+        raise BatchError(f"At most {MAX_ITEMS} items per batch.")
+
+    errors = [_item_error(item) for item in items]
+    keys = {item["key"] for item, error in zip(items, errors) if not error}
+    stored = dict(IdempotencyKey.objects.filter(user=user, key__in=keys).values_list("key", "result"))
+
+    creates, deletes = defaultdict(list), defaultdict(list)
+    seen = set(stored)
+    for index, item in enumerate(items):
+        if errors[index] or item["key"] in seen:
+            continue
+        seen.add(item["key"])
+        kind = item["kind"]
+        if item["op"] == "delete":
+            deletes[kind].append(item)
+            continue
+        serializer = KINDS[kind][1](data=item["data"])
+        if serializer.is_valid():
+            creates[kind].append((item, KINDS[kind][0](user=user, **serializer.validated_data)))
+        else:
+            errors[index] = serializer.errors
+
+    if any(errors):
+        results = []
+        for item, error in zip(items, errors):
+            if error:
+                key = item.get("key") if isinstance(item, dict) else None
+                results.append({"key": key, "status": 400, "errors": error})
+            elif item["key"] in stored:
+                results.append({**stored[item["key"]], "replayed": True})
+            else:
+                # valid, but not applied because another item failed
+                results.append(_result(item, 424))
+        return False, results
+
+    try:
+        applied = _apply(user, creates, deletes)
+    except IntegrityError:
+        if not retry:
+            raise
+        # a concurrent request stored some of these keys first: answer from what it stored
+        return apply_batch(user, items, retry=False)
+
+    results = []
+    for item in items:
+        if item["key"] in stored:
+            results.append({**stored[item["key"]], "replayed": True})
+        else:
+            results.append(applied[item["key"]])
+    return True, results
@@ -0,0 +1,115 @@
+# core/chat_archive.py
+"""
+Retention for ChatMessage.
+
+A message is archived once it is older than MAX_AGE_DAYS or no longer
+among its user's newest KEEP_LATEST (settings.CHAT_RETENTION; either limit
+can be None). Archived messages are moved, oldest first, into ChatArchive
+rows of at most BATCH_SIZE messages each: gzip-compressed NDJSON with the
+original ids and timestamps. Every batch is its own transaction, so a run
+can be interrupted at any point and the hot table stays bounded however
+long a user keeps chatting.
+
+restore() moves archived batches back into ChatMessage with their original
+ids and created_at. Restored messages are ordinary rows again: the next
+retention run archives them anew if they are still outside the policy.
+"""
+
+import datetime
+import gzip
+import json
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ChatArchive, ChatMessage
+
+DEFAULT_CONFIG = {
+    "MAX_AGE_DAYS": 90,
+    "KEEP_LATEST": 200,
+    "BATCH_SIZE": 500,
+}
+
+FIELDS = ["id", "message", "reply", "source", "created_at"]
+
+
+def retention_config(**overrides):
+    config = {**DEFAULT_CONFIG, **getattr(settings, "CHAT_RETENTION", {})}
+    config.update({k: v for k, v in overrides.items() if v is not None})
+    return config
+
+
+def pack(rows):
+    lines = [json.dumps({**row, "created_at": row["created_at"].isoformat()}, ensure_ascii=False) for row in rows]
+    return gzip.compress("\n".join(lines).encode("utf-8"))
+
+
+def unpack(data):
+    rows = [json.loads(line) for line in gzip.decompress(bytes(data)).decode("utf-8").splitlines()]
+    for row in rows:
+        row["created_at"] = datetime.datetime.fromisoformat(row["created_at"])
+    return rows
+
+
+def archivable(user_id, max_age_days=None, keep_latest=None, now=None):
+    """The user's messages that fall outside the retention policy."""
+    messages = ChatMessage.objects.filter(user_id=user_id)
+    expired = Q(pk__in=[])
+    if max_age_days is not None:
+        expired |= Q(created_at__lt=(now or timezone.now()) - datetime.timedelta(days=max_age_days))
+    if keep_latest is not None:
+        # newest message past the keep window; it and everything older goes
+        boundary = messages.order_by("-created_at", "-pk").values_list("created_at", "pk")[keep_latest:keep_latest + 1]
+        boundary = boundary.first()
+        if boundary is not None:
+            created_at, pk = boundary
+            expired |= Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lte=pk)
+    return messages.filter(expired)
+
+
+def archive_user(user_id, config=None, now=None):
+    """Move the user's expired messages into ChatArchive batches. Returns (messages, batches)."""
+    config = config or retention_config()
+    pending = archivable(user_id, config["MAX_AGE_DAYS"], config["KEEP_LATEST"], now).order_by("created_at", "pk")
+    moved = batches = 0
+    while True:
+        with db_transaction.atomic():
+            rows = list(pending.values(*FIELDS)[:config["BATCH_SIZE"]])
+            if not rows:
+                break
+            ChatArchive.objects.create(
+                user_id=user_id,
+                first_message_id=rows[0]["id"],
+                last_message_id=rows[-1]["id"],
+                first_created_at=rows[0]["created_at"],
+                last_created_at=rows[-1]["created_at"],
+                count=len(rows),
+                data=pack(rows),
+            )
+            ChatMessage.objects.filter(pk__in=[row["id"] for row in rows]).delete()
+        moved += len(rows)
+        batches += 1
+    return moved, batches
+
+
+def restore(user, archive_ids=None):
+    """Move archived batches of `user` (all, or just `archive_ids`) back into ChatMessage. Returns messages restored."""
+    archives = ChatArchive.objects.filter(user=user).order_by("first_created_at", "pk")
+    if archive_ids is not None:
+        archives = archives.filter(pk__in=archive_ids)
+
+    restored = 0
+    with db_transaction.atomic():
+        for archive in archives.select_for_update():
+            rows = unpack(archive.data)
+            messages = [ChatMessage(user=user, **row) for row in rows]
+            ChatMessage.objects.bulk_create(messages)
+            # created_at is auto_now_add: put the original timestamps back
+            for message, row in zip(messages, rows):
+                message.created_at = row["created_at"]
+            ChatMessage.objects.bulk_update(messages, ["created_at"])
+            archive.delete()
+            restored += len(messages)
+    return restored
@@ -0,0 +1,127 @@
+# core/chat_context.py
+"""
+Token-budgeted context for the LLM chatbot.
+
+build_context() sends the newest turns that fit settings.LLM_CONTEXT's
+TOKEN_BUDGET (each reply clipped to MAX_TURN_TOKENS), newest first, up to
+MAX_TURNS. Everything older is carried by a rolling per-user summary
+(ChatSummary) sent as a system message instead.
+
+The summary is extractive and maintained incrementally: each turn that
+leaves the window is folded in as one short "Q: ... -> A: ..." line, and
+ChatSummary.last_message_id marks how far folding has got, so a request
+only touches the turns that dropped out since the last one. Lines past
+SUMMARY_TOKENS are dropped oldest first.
+
+Token counts are estimates (about 4 characters per token plus a small
+per-message overhead); no tokenizer is needed.
+"""
+
+import math
+import re
+
+from django.conf import settings
+
+from .models import ChatMessage, ChatSummary
+
+DEFAULT_CONFIG = {
+    "TOKEN_BUDGET": 1200,
+    "MAX_TURNS": 6,
+    "MAX_TURN_TOKENS": 200,
+    "SUMMARY_TOKENS": 300,
+    # at most this many turns are folded in one request (first request of a long history)
+    "MAX_FOLD": 50,
+}
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD = 4
+SUMMARY_HEADER = "Summary of the earlier conversation:"
+
+_SENTENCE = re.compile(r"(?<=[.!?])\s")
+
+
+def _config():
+    return {**DEFAULT_CONFIG, **getattr(settings, "LLM_CONTEXT", {})}
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text or "") / CHARS_PER_TOKEN)
+
+
+def message_tokens(message):
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD
+
+
+def clip(text, max_tokens):
+    text = " ".join((text or "").split())
+    limit = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    return text[:max(limit - 1, 0)].rstrip() + "…"
+
+
+def summary_line(turn):
+    answer = _SENTENCE.split(" ".join((turn.reply or "").split()), 1)[0]
+    return f"- Q: {clip(turn.message, 30)} -> A: {clip(answer, 40)}"
+
+
+def _trim_summary(lines, max_tokens):
+    total = sum(estimate_tokens(line) + 1 for line in lines)
+    start = 0
+    while total > max_tokens and start < len(lines):
+        total -= estimate_tokens(lines[start]) + 1
+        start += 1
+    return lines[start:]
+
+
+def fold_turns(user, before_id, config=None):
+    """Fold the user's not-yet-summarized turns older than `before_id` into their ChatSummary."""
+    config = config or _config()
+    summary, _ = ChatSummary.objects.get_or_create(user=user)
+    pending = ChatMessage.objects.filter(user=user, pk__gt=summary.last_message_id)
+    if before_id is not None:
+        pending = pending.filter(pk__lt=before_id)
+    turns = list(pending.order_by("-pk")[:config["MAX_FOLD"]])
+    if not turns:
+        return summary
+
+    turns.reverse()
+    lines = summary.summary.splitlines() + [summary_line(turn) for turn in turns]
+    summary.summary = "\n".join(_trim_summary(lines, config["SUMMARY_TOKENS"]))
+    summary.last_message_id = turns[-1].pk
+    summary.turns += len(turns)
+    summary.save(update_fields=["summary", "last_message_id", "turns", "updated_at"])
+    return summary
+
+
+def build_context(user, user_msg):
+    """OpenRouter chat messages for `user_msg`: summary + newest turns within the token budget + prompt."""
+    config = _config()
+    prompt = {"role": "user", "content": user_msg}
+    budget = config["TOKEN_BUDGET"] - message_tokens(prompt)
+    summary_budget = config["SUMMARY_TOKENS"] + MESSAGE_OVERHEAD + estimate_tokens(SUMMARY_HEADER)
+
+    turns = []
+    recent = ChatMessage.objects.filter(user=user).order_by("-created_at", "-pk")[:config["MAX_TURNS"]]
+    for turn in recent:
+        pair = [
+            {"role": "user", "content": clip(turn.message, config["MAX_TURN_TOKENS"])},
+            {"role": "assistant", "content": clip(turn.reply, config["MAX_TURN_TOKENS"])},
+        ]
+        cost = sum(message_tokens(m) for m in pair)
+        # keep room for the summary of everything older
+        if cost > budget - summary_budget:
+            break
+        budget -= cost
+        turns.append((turn.pk, pair))
+
+    oldest_kept = turns[-1][0] if turns else None
+    summary = fold_turns(user, oldest_kept, config)
+
+    messages = []
+    if summary.summary:
+        messages.append({"role": "system", "content": f"{SUMMARY_HEADER}\n{summary.summary}"})
+    for _, pair in reversed(turns):
+        messages.extend(pair)
+    messages.append(prompt)
+    return messages
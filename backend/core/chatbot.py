@@ -1,58 +1,153 @@
 # core/chatbot.py
+"""
+Rule-based local chatbot (ChatbotView).
+
+Intents are matched by one compiled regex in a single scan of the message;
+when several match, the one listed first in INTENTS wins. Numbers come
+from a fact snapshot read in a single query -- running totals from
+LedgerSummary, this month's bucket from LedgerTotal and the newest
+Transaction, all as indexed scalar subqueries -- and only for intents that
+need it.
+"""
 
 import datetime
+import re
+from collections import namedtuple
 
-def chatbot_response(message, user, transactions):
-    msg = message.lower()
-
-    # ---------- 1. GREETINGS ----------
-    if any(word in msg for word in ["hello", "hi", "hey"]):
-        return "Hello! How can I assist you with your finances today?"
-
-    # ---------- 2. TOTAL EXPENSES ----------
-    if "total expense" in msg or "spent" in msg:
-        total = sum(t.amount for t in transactions if t.category == "expense")
-        return f"You have spent a total of ₹{total:.2f} so far."
-
-    # ---------- 3. TOTAL INCOME ----------
-    if "income" in msg:
-        total = sum(t.amount for t in transactions if t.category == "income")
-        return f"Your total income recorded is ₹{total:.2f}."
-
-    # ---------- 4. SAVINGS ----------
-    if "saving" in msg or "left" in msg:
-        income = sum(t.amount for t in transactions if t.category == "income")
-        expenses = sum(t.amount for t in transactions if t.category == "expense")
-        savings = income - expenses
-        return f"You currently have ₹{savings:.2f} as savings."
-
-    # ---------- 5. LAST TRANSACTION ----------
-    if "last transaction" in msg or "recent" in msg:
-        if not transactions:
-            return "You have no transactions yet."
-        last = transactions.order_by("-date").first()
-        return f"Your last transaction was {last.category} of ₹{last.amount} on {last.date}."
-
-    # ---------- 6. MONTHLY SUMMARY ----------
-    if "month" in msg or "monthly" in msg or "this month" in msg:
-        today = datetime.date.today()
-        monthly_exp = sum(
-            t.amount for t in transactions 
-            if t.category == "expense" and t.date.month == today.month
+from django.contrib.auth.models import User
+from django.db.models import OuterRef, Subquery, Sum
+
+from ml.finance_score import calculate_financial_score
+
+from .forecasting import transaction_forecast
+from .models import LedgerSummary, LedgerTotal, Transaction
+
+# (intent, keywords) in priority order; keywords match at a word start,
+# a trailing "$" means the whole word only ("hi" but not "this")
+INTENTS = [
+    ("greeting", ["hello$", "hi$", "hey$"]),
+    ("help", ["help$"]),
+    # ahead of the amount/period intents: "forecast my expenses" asks for a forecast
+    ("forecast", ["forecast", "predict"]),
+    ("month", ["this month", "monthly", "month"]),
+    ("income", ["income", "earned", "earning"]),
+    ("expense", ["total expense", "expense", "spent", "spend"]),
+    ("balance", ["saving", "saved$", "left$", "balance"]),
+    ("last_transaction", ["last transaction", "recent", "latest"]),
+    ("score", ["score", "health"]),
+    ("advice", ["save$", "advice", "tip$", "tips$"]),
+    ("emi", ["emi$"]),
+]
+
+
+def _compile(intents):
+    groups = []
+    for name, keywords in intents:
+        words = "|".join(
+            re.escape(k[:-1]) + r"\b" if k.endswith("$") else re.escape(k)
+            for k in keywords
         )
-        return f"This month's total expenses are ₹{monthly_exp:.2f}."
-
-    # ---------- 7. HELP ----------
-    if "help" in msg:
-        return (
-            "You can ask things like:\n"
-            "- 'What is my total expense?'\n"
-            "- 'How much did I save?'\n"
-            "- 'What is my income?'\n"
-            "- 'Show my last transaction'\n"
-            "- 'Monthly expenses'\n"
-            "- 'Hello'\n"
+        groups.append(rf"(?P<{name}>\b(?:{words}))")
+    return re.compile("|".join(groups))
+
+
+_PATTERN = _compile(INTENTS)
+_PRIORITY = {name: i for i, (name, _) in enumerate(INTENTS)}
+
+
+def route(message):
+    """Intent of `message` (None if nothing matched)."""
+    best = None
+    for match in _PATTERN.finditer((message or "").lower()):
+        name = match.lastgroup
+        if best is None or _PRIORITY[name] < _PRIORITY[best]:
+            best = name
+            if _PRIORITY[name] == 0:
+                break
+    return best
+
+
+Facts = namedtuple("Facts", [
+    "income", "expense", "month_income", "month_expense",
+    "last_category", "last_amount", "last_date",
+])
+
+
+def fact_snapshot(user, today=None):
+    """Totals, month-to-date and the newest transaction of `user`, in one query."""
+    month = (today or datetime.date.today()).strftime("%Y-%m")
+    summary = LedgerSummary.objects.filter(user=OuterRef("pk"))
+
+    def month_total(category):
+        return Subquery(
+            LedgerTotal.objects.filter(user=OuterRef("pk"), ledger="transaction", category=category, month=month)
+            .values("user").annotate(total=Sum("total")).values("total")[:1]
         )
 
-    # ---------- 8. DEFAULT ----------
-    return "I'm not sure I understood that. Try asking about expenses, income, or savings."
+    last = Transaction.objects.filter(user=OuterRef("pk")).order_by("-date", "-pk")
+    row = User.objects.filter(pk=user.pk).values_list(
+        Subquery(summary.values("transaction_income")[:1]),
+        Subquery(summary.values("transaction_expense")[:1]),
+        month_total("income"),
+        month_total("expense"),
+        Subquery(last.values("category")[:1]),
+        Subquery(last.values("amount")[:1]),
+        Subquery(last.values("date")[:1]),
+    ).first()
+    income, expense, month_income, month_expense, category, amount, date = row or (None,) * 7
+    if isinstance(date, str):
+        date = datetime.date.fromisoformat(date)
+    return Facts(income or 0.0, expense or 0.0, month_income or 0.0, month_expense or 0.0,
+                 category, amount, date)
+
+
+HELP = (
+    "You can ask things like:\n"
+    "- 'What is my total expense?'\n"
+    "- 'How much do I have left?'\n"
+    "- 'What is my income?'\n"
+    "- 'Show my last transaction'\n"
+    "- 'Monthly expenses'\n"
+    "- 'What is my score?' / 'Forecast my expenses'\n"
+)
+
+DEFAULT_REPLY = "I'm not sure how to respond to that. Try asking about income, expenses, score, or forecast."
+
+
+def chatbot_reply(user, message):
+    intent = route(message)
+
+    if intent == "greeting":
+        return f"Hello {user.username}! How can I assist you today?"
+    if intent == "help":
+        return HELP
+    if intent == "advice":
+        return "Tip: Use the 50-30-20 rule — 50% needs, 30% wants, 20% savings."
+    if intent == "emi":
+        return "EMI = Equated Monthly Installment — fixed monthly loan repayment."
+    if intent == "forecast":
+        preds = transaction_forecast(user)
+        if preds is None:
+            return "I need at least 7 expense records to generate a forecast."
+        return f"Your next 7-day predicted expenses are: {preds}"
+    if intent is None:
+        return DEFAULT_REPLY
+
+    facts = fact_snapshot(user)
+    if intent == "month":
+        return (f"This month you have spent ₹{facts.month_expense:.2f} "
+                f"and earned ₹{facts.month_income:.2f}.")
+    if intent == "income":
+        return f"Your total income is ₹{facts.income:.2f}."
+    if intent == "expense":
+        return f"You have spent a total of ₹{facts.expense:.2f}."
+    if intent == "balance":
+        return f"You currently have ₹{facts.income - facts.expense:.2f} left after expenses."
+    if intent == "last_transaction":
+        if facts.last_date is None:
+            return "You have no transactions yet."
+        return f"Your last transaction was {facts.last_category} of ₹{facts.last_amount} on {facts.last_date}."
+    if intent == "score":
+        score_data = calculate_financial_score(facts.income, facts.expense)
+        return f"Your financial health score is {score_data['financial_score']}. Status: {score_data['status']}."
+    return DEFAULT_REPLY
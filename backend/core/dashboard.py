@@ -0,0 +1,97 @@
+# core/dashboard.py
+"""
+Composite home-screen payload: what the mobile client used to fetch from
+/me, /score, /financial-score, /forecast-v2, /goals, /expenses and /income,
+in one response.
+
+Sections (pick with ?include=a,b; default all):
+    profile          UserSerializer of the requesting user (no query)
+    totals           LedgerSummary running totals
+    score            /score/ (transaction totals)
+    financial_score  /financial-score/ (expense and income ledgers)
+    forecast         /forecast-v2/ next 7 days, or null without enough data
+    goals            the next UPCOMING_GOALS goals by deadline
+    recent           the newest RECENT_ENTRIES expenses and income entries
+
+totals and both scores share one LedgerSummary read. Everything except the
+profile is cached per (user, data version, day, sections), so a repeat
+open of the home screen costs version lookups only -- or just one, and a
+304, when the client sends back the ETag (core.conditional).
+"""
+
+import datetime
+
+from ml.finance_score import calculate_financial_score
+
+from .forecasting import cached_for_user, expense_forecast
+from .ledger import get_summary
+from .models import Expense, Goal, Income
+from .serializers import ExpenseSerializer, GoalSerializer, IncomeSerializer, UserSerializer
+
+SECTIONS = ["profile", "totals", "score", "financial_score", "forecast", "goals", "recent"]
+
+UPCOMING_GOALS = 5
+RECENT_ENTRIES = 5
+
+
+class DashboardError(ValueError):
+    pass
+
+
+def parse_include(params):
+    raw = params.get("include")
+    if not raw:
+        return list(SECTIONS)
+    sections = [name.strip() for name in raw.split(",") if name.strip()]
+    unknown = sorted(set(sections) - set(SECTIONS))
+    if unknown:
+        raise DashboardError(f"Unknown section(s): {', '.join(unknown)}. Choose from: {', '.join(SECTIONS)}.")
+    # keep the canonical order, drop duplicates
+    return [name for name in SECTIONS if name in sections]
+
+
+def _ledger_sections(user, sections, today):
+    data = {}
+    if {"totals", "score", "financial_score"}.intersection(sections):
+        summary = get_summary(user)
+        if "totals" in sections:
+            data["totals"] = {
+                "transaction_income": summary.transaction_income,
+                "transaction_expense": summary.transaction_expense,
+                "income_total": summary.income_total,
+                "expense_total": summary.expense_total,
+            }
+        if "score" in sections:
+            data["score"] = calculate_financial_score(summary.transaction_income, summary.transaction_expense)
+        if "financial_score" in sections:
+            data["financial_score"] = calculate_financial_score(summary.income_total, summary.expense_total)
+
+    if "forecast" in sections:
+        data["forecast"] = {"next_7_days": expense_forecast(user)}
+
+    if "goals" in sections:
+        goals = Goal.objects.filter(user=user, deadline__gte=today).order_by("deadline")[:UPCOMING_GOALS]
+        data["goals"] = list(GoalSerializer(goals, many=True).data)
+
+    if "recent" in sections:
+        expenses = Expense.objects.filter(user=user).order_by("-date", "-id")[:RECENT_ENTRIES]
+        incomes = Income.objects.filter(user=user).order_by("-date", "-id")[:RECENT_ENTRIES]
+        data["recent"] = {
+            "expenses": list(ExpenseSerializer(expenses, many=True).data),
+            "income": list(IncomeSerializer(incomes, many=True).data),
+        }
+    return data
+
+
+def build_dashboard(user, sections, today=None):
+    today = today or datetime.date.today()
+    cached = [name for name in sections if name != "profile"]
+    data = {}
+    if "profile" in sections:
+        data["profile"] = UserSerializer(user).data
+    if cached:
+        data.update(cached_for_user(
+            user, f"dashboard:{today.isoformat()}:{','.join(cached)}",
+            lambda: _ledger_sections(user, cached, today),
+        ))
+    return {name: data[name] for name in sections}
@@ -0,0 +1,115 @@
+# core/export.py
+"""
+Streaming ledger export (CSV / NDJSON).
+
+Rows are read with `.values_list().iterator(chunk_size=...)` and written out
+one chunk at a time, so memory stays flat no matter how long the user's
+history is. Transaction descriptions are decrypted a chunk at a time.
+"""
+
+import csv
+import datetime
+import json
+from itertools import islice
+
+from .models import Transaction, Expense, Income
+from .utils import decrypt_many
+
+CHUNK_SIZE = 2000
+
+# ledger -> (model, category field, text column, CSV header)
+EXPORTS = {
+    "transaction": (Transaction, "category", "description", ["Date", "Category", "Amount", "Description"]),
+    "expense": (Expense, "category", "note", ["Date", "Category", "Amount", "Note"]),
+    "income": (Income, "source", "note", ["Date", "Source", "Amount", "Note"]),
+}
+
+FILENAMES = {"transaction": "transactions", "expense": "expenses", "income": "income"}
+
+CONTENT_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+class ExportError(ValueError):
+    pass
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def _parse_date(params, name):
+    raw = params.get(name)
+    if not raw:
+        return None
+    try:
+        return datetime.date.fromisoformat(raw)
+    except ValueError:
+        raise ExportError(f"'{name}' must be a date in YYYY-MM-DD format.")
+
+
+def build_export_queryset(user, params):
+    """Validate the query params and return (ledger, output, queryset)."""
+    ledger = params.get("ledger", "transaction")
+    if ledger not in EXPORTS:
+        raise ExportError(f"'ledger' must be one of: {', '.join(EXPORTS)}.")
+    output = params.get("output", "csv")
+    if output not in CONTENT_TYPES:
+        raise ExportError(f"'output' must be one of: {', '.join(CONTENT_TYPES)}.")
+
+    model, category_field, text_field, _ = EXPORTS[ledger]
+    qs = model.objects.filter(user=user)
+
+    start, end = _parse_date(params, "start"), _parse_date(params, "end")
+    if start:
+        qs = qs.filter(date__gte=start)
+    if end:
+        qs = qs.filter(date__lte=end)
+    category = params.get("category")
+    if category:
+        qs = qs.filter(**{category_field: category})
+
+    qs = qs.order_by("date", "id").values_list("date", category_field, "amount", text_field)
+    return ledger, output, qs
+
+
+def iter_chunks(ledger, qs, chunk_size=CHUNK_SIZE):
+    """Yield lists of (date, category, amount, text) rows, decrypting transaction descriptions."""
+    rows = qs.iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        if ledger == "transaction":
+            texts = decrypt_many([row[3] for row in chunk], strict=False)
+            chunk = [row[:3] + (text,) for row, text in zip(chunk, texts)]
+        yield chunk
+
+
+def stream_csv(ledger, qs, chunk_size=CHUNK_SIZE):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORTS[ledger][3])
+    for chunk in iter_chunks(ledger, qs, chunk_size):
+        yield "".join(writer.writerow(row) for row in chunk)
+
+
+def stream_ndjson(ledger, qs, chunk_size=CHUNK_SIZE):
+    _, category_field, text_field, _ = EXPORTS[ledger]
+    for chunk in iter_chunks(ledger, qs, chunk_size):
+        yield "".join(
+            json.dumps({
+                "date": date.isoformat(),
+                category_field: category,
+                "amount": str(amount),
+                text_field: text or "",
+            }) + "\n"
+            for date, category, amount, text in chunk
+        )
+
+
+def stream_export(ledger, output, qs, chunk_size=CHUNK_SIZE):
+    if output == "ndjson":
+        return stream_ndjson(ledger, qs, chunk_size)
+    return stream_csv(ledger, qs, chunk_size)
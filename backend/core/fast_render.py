@@ -0,0 +1,169 @@
+# core/fast_render.py
+"""
+Fast read path for the ledger list endpoints (KeysetListMixin).
+
+DRF renders a list by walking every declared field of every row through
+the serializer machinery, then json.dumps() the result. For these lists
+the output only depends on a few columns, so RowRenderer reads plain
+`.values()` dicts and converts just the columns that need it, with the
+serializer fields' own to_representation (decimals, floats, choices;
+ISO dates and datetimes are formatted directly, with the timezone looked
+up once per page); strings, integers and foreign keys pass through as
+they are. The JSON is written by orjson when it is installed, else by
+DRF's JSONRenderer itself.
+
+The bytes are the same as ModelSerializer + JSONRenderer produce: field
+order, decimal/date formatting and the \\u2028 / \\u2029 escaping all
+match, and a page with a float orjson would format differently from
+json.dumps (exponent notation, NaN) is rendered by JSONRenderer instead.
+Serializers whose fields don't map one-to-one onto model columns are not
+handled here (fast_renderer() returns None) and keep the regular path.
+
+settings.FAST_LIST_RENDER = False turns the fast path off.
+"""
+
+import datetime
+import functools
+import math
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.http import HttpResponse
+from rest_framework import ISO_8601, serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+# to_representation is the identity for the values these read from the database
+PASSTHROUGH = (serializers.CharField, serializers.IntegerField, serializers.PrimaryKeyRelatedField)
+
+
+@functools.cache
+def load_orjson():
+    """orjson if installed, else None (it is an optional speed-up)."""
+    try:
+        import orjson
+    except ImportError:
+        return None
+    return orjson
+
+
+def _orjson_compatible():
+    # orjson only writes what JSONRenderer writes with the default DRF settings
+    return not JSONRenderer.ensure_ascii and JSONRenderer.compact and JSONRenderer.strict
+
+
+def _plain_float(value):
+    # json.dumps switches to exponent notation outside this range; orjson's differs there
+    return value is None or (math.isfinite(value) and (value == 0 or 1e-4 <= abs(value) < 1e16))
+
+
+def dumps(data, allow_orjson=True):
+    """`data` as the bytes JSONRenderer would produce."""
+    orjson = load_orjson() if allow_orjson and _orjson_compatible() else None
+    if orjson is None:
+        return JSONRenderer().render(data)
+    body = orjson.dumps(data)
+    if b"\xe2\x80\xa8" in body or b"\xe2\x80\xa9" in body:
+        body = body.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+    return body
+
+
+class Unsupported(Exception):
+    pass
+
+
+def _iso_format(field, default):
+    output_format = getattr(field, "format", default)
+    return output_format is not None and output_format.lower() == ISO_8601
+
+
+def _converter(field):
+    """
+    A per-value equivalent of field.to_representation for one page, or None
+    for the identity. DateTimeField looks up the current timezone for every
+    value; here it is looked up once per page.
+    """
+    if isinstance(field, PASSTHROUGH):
+        return None
+    if type(field) is serializers.DateField and _iso_format(field, api_settings.DATE_FORMAT):
+        def convert(value):
+            return value.isoformat() if type(value) is datetime.date else field.to_representation(value)
+        return convert
+    if type(field) is serializers.DateTimeField and _iso_format(field, api_settings.DATETIME_FORMAT):
+        tz = field.timezone if hasattr(field, "timezone") else field.default_timezone()
+        if tz is not None:
+            def convert(value):
+                if type(value) is not datetime.datetime or value.utcoffset() is None:
+                    return field.to_representation(value)
+                value = value.astimezone(tz).isoformat()
+                return value[:-6] + "Z" if value.endswith("+00:00") else value
+            return convert
+    return field.to_representation
+
+
+class RowRenderer:
+    """Renders `.values()` rows of `serializer_class`'s model as that serializer would."""
+
+    def __init__(self, serializer_class, fields=None):
+        serializer = serializer_class(fields=list(fields) if fields is not None else None)
+        model = serializer_class.Meta.model
+        self.columns = []
+        self.floats = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if len(field.source_attrs) != 1:
+                raise Unsupported(name)
+            try:
+                model_field = model._meta.get_field(field.source_attrs[0])
+            except FieldDoesNotExist:
+                raise Unsupported(name)
+            if not model_field.concrete or model_field.many_to_many:
+                raise Unsupported(name)
+            self.columns.append((name, model_field.attname, field))
+            if isinstance(field, serializers.FloatField):
+                self.floats.append(name)
+        list_serializer = getattr(serializer_class.Meta, "list_serializer_class", None)
+        self.finish = getattr(list_serializer, "decrypt_rows", None)
+
+    @property
+    def value_names(self):
+        return [attname for _, attname, _ in self.columns]
+
+    def render(self, rows):
+        """Rendered rows and whether orjson writes them exactly like json.dumps."""
+        columns = [(name, attname, _converter(field)) for name, attname, field in self.columns]
+        out = []
+        for row in rows:
+            item = {}
+            for name, attname, convert in columns:
+                value = row[attname]
+                item[name] = value if value is None or convert is None else convert(value)
+            out.append(item)
+        if self.finish is not None:
+            self.finish(out)
+        plain = all(_plain_float(item[name]) for name in self.floats for item in out)
+        return out, plain
+
+
+@functools.lru_cache(maxsize=64)
+def _renderer(serializer_class, fields):
+    try:
+        return RowRenderer(serializer_class, fields)
+    except Unsupported:
+        return None
+
+
+def fast_renderer(request, serializer_class, fields=None):
+    """A RowRenderer when this request can take the fast path, else None."""
+    if not getattr(settings, "FAST_LIST_RENDER", True):
+        return None
+    # plain JSON only: not the browsable API, not an ?indent= media type
+    renderer = getattr(request, "accepted_renderer", None)
+    if type(renderer) is not JSONRenderer or "indent" in (request.accepted_media_type or ""):
+        return None
+    return _renderer(serializer_class, tuple(fields) if fields is not None else None)
+
+
+def json_response(data, allow_orjson=True, status=200):
+    return HttpResponse(dumps(data, allow_orjson), content_type=JSONRenderer.media_type, status=status)
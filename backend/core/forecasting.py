@@ -0,0 +1,288 @@
+# core/forecasting.py
+"""
+Forecast entry points for the views, with a versioned result cache.
+
+Results are cached under forecast:<kind>:<user id>:<data version>. Any
+write to the user's ledger bumps the data version (core.versioning), so a
+repeated dashboard refresh is one cache hit and a new expense is picked up
+straight away. Entries for old versions simply age out.
+
+Backend is picked by settings.FORECAST_CACHE["BACKEND"]:
+ - "lru":    in-process LRU with TTL (per worker)
+ - "django": Django's cache framework (settings.CACHES[CACHE_ALIAS])
+
+On a miss the per-entry forecasts don't read the series at all: a
+ForecastState row per (user, kind) holds the sliding-window statistics
+(ml.online) and signals fold each new row into it in O(1). Backdated
+inserts, updates and deletes rebuild the state from the tail window.
+Bulk paths that skip model signals must call rebuild_forecast_states().
+
+Users picked for another model by `manage.py select_forecast_models`
+(ForecastModelChoice, see ml.engine) get that model run on their tail
+window instead; everyone else stays on the default blend.
+"""
+
+import datetime
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models.signals import post_delete, post_save
+
+from ml.engine import DEFAULT_MODEL, FORECASTERS, forecast as run_model
+from ml.forecast_model import FORECAST_WINDOW
+from ml.online import STATE_FIELDS, OnlineForecast
+from ml.series import load_daily_tail, load_tail
+
+from .models import Transaction, Expense, ForecastState, ForecastModelChoice
+from .versioning import get_data_version
+
+MIN_POINTS = 7
+
+DEFAULT_CONFIG = {
+    "BACKEND": "lru",
+    "TTL": 6 * 60 * 60,
+    "MAX_ENTRIES": 10000,
+    "CACHE_ALIAS": "default",
+}
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe in-process LRU cache with a per-entry TTL."""
+
+    def __init__(self, max_entries=10000, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                return default
+            expires, value = item
+            if expires is not None and expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class DjangoCache:
+    """Adapter over a Django cache alias (shared between workers)."""
+
+    def __init__(self, alias="default", ttl=None):
+        self.alias = alias
+        self.ttl = ttl
+
+    def get(self, key, default=None):
+        return caches[self.alias].get(key, default)
+
+    def set(self, key, value):
+        caches[self.alias].set(key, value, self.ttl)
+
+    def clear(self):
+        caches[self.alias].clear()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_forecast_cache():
+    config = {**DEFAULT_CONFIG, **getattr(settings, "FORECAST_CACHE", {})}
+    key = tuple(sorted(config.items()))
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            if config["BACKEND"] == "django":
+                cache = DjangoCache(config["CACHE_ALIAS"], config["TTL"])
+            elif config["BACKEND"] == "lru":
+                cache = LRUCache(config["MAX_ENTRIES"], config["TTL"])
+            else:
+                raise RuntimeError(f"Unknown FORECAST_CACHE backend {config['BACKEND']!r}")
+            _caches[key] = cache
+    return cache
+
+
+def forecast_cache_key(kind, user_id, version):
+    return f"forecast:{kind}:{user_id}:{version}"
+
+
+def cached_for_user(user, kind, compute):
+    """Return compute() for `user`, cached until their data version changes."""
+    cache = get_forecast_cache()
+    key = forecast_cache_key(kind, user.pk, get_data_version(user))
+    value = cache.get(key, _MISSING)
+    if value is _MISSING:
+        value = compute()
+        cache.set(key, value)
+    return value
+
+
+def _forecast(queryset, daily=False, model=DEFAULT_MODEL):
+    window = FORECASTERS.get(model, FORECASTERS[DEFAULT_MODEL]).window
+    series = load_daily_tail(queryset, window=window) if daily else load_tail(queryset, window=window)
+    if len(series) < MIN_POINTS:
+        return None
+    return run_model(model, series)
+
+
+# kind -> base queryset, shared by the per-request path and the batch precompute
+FORECAST_SOURCES = {
+    "transaction": lambda: Transaction.objects.filter(category="expense"),
+    "expense": lambda: Expense.objects.all(),
+}
+
+
+# -------------------------
+# Incremental state
+# -------------------------
+def _as_date(value):
+    if isinstance(value, str):
+        return datetime.date.fromisoformat(value[:10])
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    return value
+
+
+def _state_fields(online, last_date, last_pk):
+    return {**online.as_dict(), "last_date": last_date, "last_pk": last_pk}
+
+
+def rebuild_forecast_state(user_id, kind, create=True):
+    """Recompute one ForecastState from the tail window; returns the OnlineForecast (None if the series is empty)."""
+    rows = list(
+        FORECAST_SOURCES[kind]().filter(user_id=user_id)
+        .order_by("-date", "-pk")
+        .values_list("date", "pk", "amount")[:FORECAST_WINDOW]
+    )
+    lookup = {"user_id": user_id, "kind": kind}
+    if not rows:
+        ForecastState.objects.filter(**lookup).delete()
+        return None
+
+    online = OnlineForecast.from_values([amount for _, _, amount in reversed(rows)])
+    fields = _state_fields(online, rows[0][0], rows[0][1])
+    if ForecastState.objects.filter(**lookup).update(**fields) or not create:
+        return online
+    try:
+        with db_transaction.atomic():
+            ForecastState.objects.create(**lookup, **fields)
+    except IntegrityError:
+        # another request created the row first
+        ForecastState.objects.filter(**lookup).update(**fields)
+    return online
+
+
+def rebuild_forecast_states(user_id):
+    for kind in FORECAST_SOURCES:
+        rebuild_forecast_state(user_id, kind)
+
+
+def _push(user_id, kind, instance):
+    """Fold a new row into the state in O(1); False if it has to be rebuilt instead."""
+    key = (_as_date(instance.date), instance.pk)
+    with db_transaction.atomic():
+        state = ForecastState.objects.select_for_update().filter(user_id=user_id, kind=kind).first()
+        if state is None or state.last_date is None or key <= (state.last_date, state.last_pk):
+            return False
+        online = OnlineForecast(**{name: getattr(state, name) for name in STATE_FIELDS})
+        online.push(instance.amount)
+        ForecastState.objects.filter(pk=state.pk).update(**_state_fields(online, *key))
+    return True
+
+
+def _state_forecast(user, kind):
+    state = ForecastState.objects.filter(user=user, kind=kind).first()
+    if state is None:
+        # series written before the state table existed
+        online = rebuild_forecast_state(user.pk, kind)
+    else:
+        online = OnlineForecast(**{name: getattr(state, name) for name in STATE_FIELDS})
+    return online.predict() if online is not None else None
+
+
+def _kinds_for(instance):
+    if isinstance(instance, Expense):
+        return ["expense"]
+    return ["transaction"]
+
+
+def _on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    for kind in _kinds_for(instance):
+        if kind == "transaction" and created and instance.category != "expense":
+            continue
+        # updates can move a row in or out of the window: recompute
+        if not (created and _push(instance.user_id, kind, instance)):
+            rebuild_forecast_state(instance.user_id, kind)
+
+
+def _on_delete(sender, instance, **kwargs):
+    for kind in _kinds_for(instance):
+        if kind == "transaction" and instance.category != "expense":
+            continue
+        # never create here: during a user delete cascade the user row is going away
+        rebuild_forecast_state(instance.user_id, kind, create=False)
+
+
+def connect_signals():
+    for model in (Transaction, Expense):
+        post_save.connect(_on_save, sender=model, dispatch_uid=f"forecast_post_save_{model.__name__}")
+        post_delete.connect(_on_delete, sender=model, dispatch_uid=f"forecast_post_delete_{model.__name__}")
+
+
+def forecast_kind(source, daily=False):
+    return f"{source}:daily" if daily else source
+
+
+def chosen_model(user, kind):
+    """Model selected for `user`'s `kind` series (DEFAULT_MODEL if none was picked)."""
+    choice = ForecastModelChoice.objects.filter(user=user, kind=kind).values_list("model", flat=True).first()
+    return choice if choice in FORECASTERS else DEFAULT_MODEL
+
+
+def _user_forecast(user, source, daily):
+    kind = forecast_kind(source, daily)
+
+    def compute():
+        model = chosen_model(user, kind)
+        if model == DEFAULT_MODEL and not daily:
+            return _state_forecast(user, source)
+        return _forecast(FORECAST_SOURCES[source]().filter(user=user), daily, model)
+
+    return cached_for_user(user, kind, compute)
+
+
+def transaction_forecast(user, daily=False):
+    """Next 7 predicted amounts from Transaction expenses; None with fewer than 7 points."""
+    return _user_forecast(user, "transaction", daily)
+
+
+def expense_forecast(user, daily=False):
+    """Next 7 predicted amounts from Expense entries; None with fewer than 7 points."""
+    return _user_forecast(user, "expense", daily)
@@ -0,0 +1,239 @@
+# core/ledger.py
+"""
+Running per-user ledger totals.
+
+Every Transaction / Expense / Income write is folded into:
+ - LedgerSummary: one row per user with the grand totals used by the score
+   and chatbot endpoints
+ - LedgerTotal: one row per (user, ledger, category, month) bucket
+
+so reads are a single-row lookup instead of summing the user's history.
+`rebuild_totals` / `check_totals` recompute everything from the raw rows
+(see the `rebuild_ledger_totals` management command).
+"""
+
+import datetime
+import math
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from .models import Transaction, Expense, Income, LedgerSummary, LedgerTotal
+
+# ledger name -> (model, field holding the category)
+LEDGERS = {
+    "transaction": (Transaction, "category"),
+    "expense": (Expense, "category"),
+    "income": (Income, "source"),
+}
+
+_TRACKED_FIELDS = {"user", "user_id", "amount", "date", "category", "source"}
+
+
+def _ledger_of(instance):
+    for name, (model, category_field) in LEDGERS.items():
+        if isinstance(instance, model):
+            return name, category_field
+    raise TypeError(f"{type(instance).__name__} is not a ledger model")
+
+
+def _month_of(value):
+    if isinstance(value, str):
+        value = datetime.date.fromisoformat(value[:10])
+    return value.strftime("%Y-%m")
+
+
+def _summary_field(ledger, category):
+    if ledger == "transaction":
+        return {
+            "income": "transaction_income",
+            "expense": "transaction_expense",
+        }.get((category or "").lower())
+    return "expense_total" if ledger == "expense" else "income_total"
+
+
+def _bump(model, lookup, create, **deltas):
+    updates = {name: F(name) + value for name, value in deltas.items()}
+    if model.objects.filter(**lookup).update(**updates) or not create:
+        return
+    try:
+        with db_transaction.atomic():
+            model.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        # another request created the row first
+        model.objects.filter(**lookup).update(**updates)
+
+
+def apply_entries(entries, sign=1):
+    """
+    Add (sign=1) or remove (sign=-1) ledger rows from the running totals.
+
+    Entries are grouped per bucket first, so a bulk insert of N rows costs
+    one UPDATE per touched bucket rather than one per row.
+    """
+    buckets = defaultdict(lambda: [0.0, 0])
+    for entry in entries:
+        ledger, category_field = _ledger_of(entry)
+        key = (entry.user_id, ledger, getattr(entry, category_field) or "", _month_of(entry.date))
+        buckets[key][0] += float(entry.amount)
+        buckets[key][1] += 1
+
+    if not buckets:
+        return
+
+    summaries = defaultdict(lambda: defaultdict(float))
+    with db_transaction.atomic():
+        for (user_id, ledger, category, month), (total, count) in buckets.items():
+            lookup = {"user_id": user_id, "ledger": ledger, "category": category, "month": month}
+            _bump(LedgerTotal, lookup, create=sign > 0, total=sign * total, count=sign * count)
+            if sign < 0:
+                LedgerTotal.objects.filter(count__lte=0, **lookup).delete()
+
+            field = _summary_field(ledger, category)
+            if field:
+                summaries[user_id][field] += sign * total
+
+        for user_id, deltas in summaries.items():
+            _bump(LedgerSummary, {"user_id": user_id}, create=sign > 0, **deltas)
+
+
+def get_summary(user):
+    """Totals row for `user`; an unsaved all-zero row if they have no entries yet."""
+    return LedgerSummary.objects.filter(user=user).first() or LedgerSummary(user=user)
+
+
+# -------------------------
+# Signal handlers
+# -------------------------
+def _remember_previous(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._ledger_previous = None
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and not _TRACKED_FIELDS.intersection(update_fields):
+        return
+    instance._ledger_previous = sender.objects.filter(pk=instance.pk).first()
+
+
+def _on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, "_ledger_previous", None)
+    if previous is not None:
+        apply_entries([previous], sign=-1)
+        apply_entries([instance])
+    elif created:
+        apply_entries([instance])
+
+
+def _on_delete(sender, instance, **kwargs):
+    apply_entries([instance], sign=-1)
+
+
+def connect_signals():
+    for model, _ in LEDGERS.values():
+        pre_save.connect(_remember_previous, sender=model, dispatch_uid=f"ledger_pre_save_{model.__name__}")
+        post_save.connect(_on_save, sender=model, dispatch_uid=f"ledger_post_save_{model.__name__}")
+        post_delete.connect(_on_delete, sender=model, dispatch_uid=f"ledger_post_delete_{model.__name__}")
+
+
+# -------------------------
+# Rebuild / verification
+# -------------------------
+def compute_totals(user_ids=None):
+    """
+    Recompute bucket and summary totals straight from the raw rows.
+
+    Returns (buckets, summaries):
+        buckets:   {(user_id, ledger, category, month): (total, count)}
+        summaries: {user_id: {summary_field: total}}
+    """
+    buckets = {}
+    summaries = defaultdict(lambda: defaultdict(float))
+    for ledger, (model, category_field) in LEDGERS.items():
+        qs = model.objects.all()
+        if user_ids is not None:
+            qs = qs.filter(user_id__in=user_ids)
+        rows = (
+            qs.annotate(bucket=TruncMonth("date"))
+            .values("user_id", category_field, "bucket")
+            .annotate(total=Sum("amount"), count=Count("id"))
+            .order_by()
+        )
+        for row in rows.iterator():
+            category = row[category_field] or ""
+            total = float(row["total"] or 0)
+            key = (row["user_id"], ledger, category, row["bucket"].strftime("%Y-%m"))
+            prev_total, prev_count = buckets.get(key, (0.0, 0))
+            buckets[key] = (prev_total + total, prev_count + row["count"])
+
+            field = _summary_field(ledger, category)
+            if field:
+                summaries[row["user_id"]][field] += total
+    return buckets, summaries
+
+
+def rebuild_totals(user_ids=None, batch_size=1000):
+    """Drop and recreate the materialized totals. Returns (buckets, users) written."""
+    buckets, summaries = compute_totals(user_ids)
+
+    with db_transaction.atomic():
+        totals_qs = LedgerTotal.objects.all()
+        summary_qs = LedgerSummary.objects.all()
+        if user_ids is not None:
+            totals_qs = totals_qs.filter(user_id__in=user_ids)
+            summary_qs = summary_qs.filter(user_id__in=user_ids)
+        totals_qs.delete()
+        summary_qs.delete()
+
+        LedgerTotal.objects.bulk_create(
+            [
+                LedgerTotal(user_id=user_id, ledger=ledger, category=category, month=month, total=total, count=count)
+                for (user_id, ledger, category, month), (total, count) in buckets.items()
+            ],
+            batch_size=batch_size,
+        )
+        LedgerSummary.objects.bulk_create(
+            [LedgerSummary(user_id=user_id, **fields) for user_id, fields in summaries.items()],
+            batch_size=batch_size,
+        )
+    return len(buckets), len(summaries)
+
+
+def _close(a, b):
+    return math.isclose(a, b, rel_tol=1e-9, abs_tol=0.005)
+
+
+def check_totals(user_ids=None):
+    """Compare the materialized totals with the raw rows. Returns a list of mismatch descriptions."""
+    buckets, summaries = compute_totals(user_ids)
+    problems = []
+
+    totals_qs = LedgerTotal.objects.all()
+    summary_qs = LedgerSummary.objects.all()
+    if user_ids is not None:
+        totals_qs = totals_qs.filter(user_id__in=user_ids)
+        summary_qs = summary_qs.filter(user_id__in=user_ids)
+
+    stored = {
+        (t.user_id, t.ledger, t.category, t.month): (t.total, t.count)
+        for t in totals_qs.iterator()
+    }
+    for key in set(buckets) | set(stored):
+        expected = buckets.get(key, (0.0, 0))
+        actual = stored.get(key, (0.0, 0))
+        if not _close(expected[0], actual[0]) or expected[1] != actual[1]:
+            problems.append(f"bucket {key}: expected {expected}, stored {actual}")
+
+    summary_fields = ["transaction_income", "transaction_expense", "expense_total", "income_total"]
+    stored_summaries = {s.user_id: s for s in summary_qs.iterator()}
+    for user_id in set(summaries) | set(stored_summaries):
+        row = stored_summaries.get(user_id)
+        for field in summary_fields:
+            expected = summaries.get(user_id, {}).get(field, 0.0)
+            actual = getattr(row, field) if row is not None else 0.0
+            if not _close(expected, actual):
+                problems.append(f"summary user={user_id} {field}: expected {expected:.2f}, stored {actual:.2f}")
+    return problems
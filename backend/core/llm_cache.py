@@ -0,0 +1,168 @@
+# core/llm_cache.py
+"""
+Reply cache and in-flight coalescing for the LLM chatbot proxy.
+
+A reply is cached under
+    llm:<model>:<scope>:<sha256 of context fingerprint + normalized prompt>
+where the prompt is NFKC/case-folded with whitespace collapsed and
+trailing punctuation dropped ("How much did I spend?" == "how much did i
+spend"). The fingerprint is the last LLM_CACHE["CONTEXT_TURNS"] turns
+only, not the whole history and rolling summary, so asking the same thing
+after the same recent exchange hits. The reply can still draw on the
+older history, so a key is scoped to its user ("<user id>") whenever
+there is more history than the fingerprint covers, and shared ("*") only
+when there isn't.
+
+Entries live in an in-process LRU with TTL (settings.LLM_CACHE). While a
+key is being fetched, identical requests wait on the same Future instead
+of calling upstream again -- from threads (sync view) or coroutines (the
+streaming view) alike. Hits, misses, coalesced waits, upstream calls and
+upstream errors are counted per process; see metrics().
+"""
+
+import hashlib
+import json
+import re
+import threading
+import unicodedata
+from collections import Counter
+from concurrent.futures import Future
+
+from django.conf import settings
+
+from .forecasting import LRUCache
+
+DEFAULT_CONFIG = {
+    "TTL": 10 * 60,
+    "MAX_ENTRIES": 5000,
+    "CONTEXT_TURNS": 1,
+}
+
+_SPACES = re.compile(r"\s+")
+_TRAILING = re.compile(r"[\s?!.,;:]+$")
+
+
+def normalize_prompt(text):
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    return _TRAILING.sub("", _SPACES.sub(" ", text).strip())
+
+
+def _config():
+    return {**DEFAULT_CONFIG, **getattr(settings, "LLM_CACHE", {})}
+
+
+def reply_cache_key(model, messages, user_id):
+    """Cache key of `user_id`'s chat completion; the last message is the prompt."""
+    *history, prompt = messages
+    turns = [m for m in history if m["role"] != "system"]
+    context_turns = _config()["CONTEXT_TURNS"]
+    recent = turns[-2 * context_turns:] if context_turns else []
+    fingerprint = [
+        [m["role"], normalize_prompt(m["content"]) if m["role"] == "user" else m["content"]] for m in recent
+    ]
+    digest = hashlib.sha256()
+    digest.update(json.dumps(fingerprint, ensure_ascii=False).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(normalize_prompt(prompt["content"]).encode("utf-8"))
+    scope = user_id if len(history) > len(recent) else "*"
+    return f"llm:{model}:{scope}:{digest.hexdigest()}"
+
+
+class ReplyCache:
+    def __init__(self, max_entries=5000, ttl=600):
+        self.replies = LRUCache(max_entries, ttl)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+    def _count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    def get(self, key):
+        reply = self.replies.get(key)
+        self._count("hits" if reply is not None else "misses")
+        return reply
+
+    def claim(self, key):
+        """
+        (future, leader) for a key that missed. The leader fetches and must
+        call resolve(); everyone else waits on the same future.
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self._counts["coalesced"] += 1
+                return future, False
+            # another leader may have finished between the miss and the claim
+            reply = self.replies.get(key)
+            if reply is not None:
+                future = Future()
+                future.set_result(reply)
+                return future, False
+            self._counts["upstream"] += 1
+            future = self._inflight[key] = Future()
+            return future, True
+
+    def resolve(self, key, future, reply=None, error=None):
+        if error is None:
+            self.replies.set(key, reply)
+            future.set_result(reply)
+        else:
+            self._count("errors")
+            future.set_exception(error)
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def get_or_fetch(self, key, fetch, timeout=None):
+        """Cached reply, or fetch() once for every concurrent caller of the same key (sync callers)."""
+        reply = self.get(key)
+        if reply is not None:
+            return reply
+        future, leader = self.claim(key)
+        if not leader:
+            return future.result(timeout)
+        try:
+            reply = fetch()
+        except Exception as e:
+            self.resolve(key, future, error=e)
+            raise
+        self.resolve(key, future, reply)
+        return reply
+
+    def metrics(self):
+        with self._lock:
+            counts = dict(self._counts)
+            inflight = len(self._inflight)
+        lookups = counts.get("hits", 0) + counts.get("misses", 0)
+        return {
+            "hits": counts.get("hits", 0),
+            "misses": counts.get("misses", 0),
+            "coalesced": counts.get("coalesced", 0),
+            # misses that actually went upstream
+            "upstream": counts.get("upstream", 0),
+            "errors": counts.get("errors", 0),
+            "hit_ratio": round(counts.get("hits", 0) / lookups, 4) if lookups else None,
+            "entries": len(self.replies),
+            "inflight": inflight,
+        }
+
+    def clear(self):
+        self.replies.clear()
+        with self._lock:
+            self._counts.clear()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_reply_cache():
+    config = _config()
+    key = (config["MAX_ENTRIES"], config["TTL"])
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = _caches[key] = ReplyCache(config["MAX_ENTRIES"], config["TTL"])
+    return cache
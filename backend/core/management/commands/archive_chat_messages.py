@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from core.chat_archive import archive_user, retention_config
+from core.models import ChatMessage
+
+
+class Command(BaseCommand):
+    help = (
+        "Move chat messages outside the retention policy (older than --max-age-days, "
+        "or beyond each user's newest --keep-latest) into compressed ChatArchive batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--max-age-days", type=int, help="Defaults to CHAT_RETENTION['MAX_AGE_DAYS'].")
+        parser.add_argument("--keep-latest", type=int, help="Defaults to CHAT_RETENTION['KEEP_LATEST'].")
+        parser.add_argument("--batch-size", type=int, help="Messages per archive batch and transaction.")
+        parser.add_argument(
+            "--user-id", type=int, action="append", dest="user_ids",
+            help="Limit to this user (repeatable). Defaults to every user with messages.",
+        )
+
+    def handle(self, *args, **options):
+        config = retention_config(
+            MAX_AGE_DAYS=options["max_age_days"],
+            KEEP_LATEST=options["keep_latest"],
+            BATCH_SIZE=options["batch_size"],
+        )
+        user_ids = options["user_ids"] or list(
+            ChatMessage.objects.order_by("user_id").values_list("user_id", flat=True).distinct()
+        )
+
+        moved = batches = users = 0
+        for user_id in user_ids:
+            user_moved, user_batches = archive_user(user_id, config)
+            if user_moved:
+                users += 1
+            moved += user_moved
+            batches += user_batches
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {moved} messages of {users} users in {batches} batches "
+            f"(max age {config['MAX_AGE_DAYS']} days, keep latest {config['KEEP_LATEST']})."
+        ))
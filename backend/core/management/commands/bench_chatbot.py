@@ -0,0 +1,79 @@
+import datetime
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.chatbot import chatbot_reply, route
+from core.ledger import rebuild_totals
+from core.models import Transaction
+
+MESSAGES = [
+    "hello there", "what is my income?", "how much have I spent", "my health score please",
+    "forecast next week", "any advice to save?", "what is an emi", "how much is left",
+    "show my last transaction", "expenses this month", "help", "what's the weather",
+]
+
+
+def _legacy_route(msg):
+    # the pre-router ChatbotView chain: one substring test per keyword, in order
+    if any(g in msg for g in ["hello", "hi", "hey"]):
+        return "greeting"
+    if "income" in msg:
+        return "income"
+    if "expense" in msg or "spent" in msg:
+        return "expense"
+    if "score" in msg or "health" in msg:
+        return "score"
+    if "forecast" in msg or "predict" in msg:
+        return "forecast"
+    if "save" in msg or "advice" in msg:
+        return "advice"
+    if "emi" in msg:
+        return "emi"
+    return None
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Microbenchmark: local chatbot throughput (messages/sec), routing alone and end to end."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=2000)
+        parser.add_argument("--transactions", type=int, default=5000)
+
+    def _rate(self, label, count, fn):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f"{label:<32} {count / elapsed:12,.0f} msg/s")
+
+    def handle(self, *args, **options):
+        count = options["messages"]
+        messages = [m.lower() for m in (MESSAGES * (count // len(MESSAGES) + 1))[:count]]
+
+        self._rate("route: if/elif chain (legacy)", count, lambda: [_legacy_route(m) for m in messages])
+        self._rate("route: compiled single scan", count, lambda: [route(m) for m in messages])
+
+        # end to end against a throwaway user, rolled back afterwards
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user("bench-chatbot", password="bench-chatbot")
+                rng = random.Random(0)
+                today = datetime.date.today()
+                Transaction.objects.bulk_create([
+                    Transaction(user=user, category=rng.choice(["income", "expense"]),
+                                amount=round(rng.uniform(1, 500), 2), date=today - datetime.timedelta(days=i % 365))
+                    for i in range(options["transactions"])
+                ])
+                # bulk_create skips the ledger signals
+                rebuild_totals([user.pk])
+                self._rate("reply: chatbot_reply", count, lambda: [chatbot_reply(user, m) for m in messages])
+                raise _Rollback
+        except _Rollback:
+            pass
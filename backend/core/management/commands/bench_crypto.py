@@ -0,0 +1,47 @@
+import base64
+import time
+
+from Crypto.Cipher import AES
+from django.core.management.base import BaseCommand
+
+from core.utils import _get_secret, decrypt_many, encrypt_many
+
+
+def _legacy_encrypt(raw):
+    # encrypt_data before the batch helpers: key lookup and EAX setup per value
+    cipher = AES.new(_get_secret(), AES.MODE_EAX)
+    ciphertext, tag = cipher.encrypt_and_digest(raw.encode('utf-8'))
+    return base64.b64encode(cipher.nonce + tag + ciphertext).decode('utf-8')
+
+
+def _legacy_decrypt(enc):
+    data = base64.b64decode(enc.encode('utf-8'))
+    cipher = AES.new(_get_secret(), AES.MODE_EAX, data[:16])
+    return cipher.decrypt_and_verify(data[32:], data[16:32]).decode('utf-8')
+
+
+class Command(BaseCommand):
+    help = "Microbenchmark: per-row cost of description encryption/decryption, per value vs the batch helpers."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000)
+
+    def _time(self, label, rows, fn):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f"{label:<32} {elapsed * 1e6 / rows:8.1f} µs/row")
+        return result
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        values = [f"Card payment #{i} - NETFLIX.COM subscription" for i in range(rows)]
+
+        encrypted = self._time("encrypt: per value (legacy)", rows, lambda: [_legacy_encrypt(v) for v in values])
+        self._time("encrypt: encrypt_many", rows, lambda: encrypt_many(values))
+
+        self._time("decrypt: per value (legacy)", rows, lambda: [_legacy_decrypt(v) for v in encrypted])
+        plain = self._time("decrypt: decrypt_many", rows, lambda: decrypt_many(encrypted))
+
+        if plain != values:
+            self.stderr.write("decrypt_many did not round-trip the legacy payloads")
@@ -0,0 +1,85 @@
+import datetime
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from core.fast_render import RowRenderer, dumps, load_orjson
+from core.models import Expense, Income, Transaction
+from core.serializers import ExpenseSerializer, IncomeSerializer, TransactionSerializer
+from core.utils import encrypt_many
+
+LEDGERS = {
+    "expense": (Expense, ExpenseSerializer),
+    "income": (Income, IncomeSerializer),
+    "transaction": (Transaction, TransactionSerializer),
+}
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _rows(model, user, count):
+    rng = random.Random(0)
+    today = datetime.date.today()
+    dates = [today - datetime.timedelta(days=i % 365) for i in range(count)]
+    if model is Transaction:
+        descriptions = encrypt_many([f"Card payment #{i} - café" for i in range(count)])
+        return [
+            Transaction(user=user, category=rng.choice(["income", "expense"]), amount=round(rng.uniform(1, 500), 2),
+                        description=desc, date=date)
+            for desc, date in zip(descriptions, dates)
+        ]
+    label = {"category": "groceries"} if model is Expense else {"source": "salary"}
+    return [
+        model(user=user, amount=round(rng.uniform(1, 500), 2), date=date, note=f"entry {i}", **label)
+        for i, date in enumerate(dates)
+    ]
+
+
+class Command(BaseCommand):
+    help = "Microbenchmark: list serialization, ModelSerializer + JSONRenderer vs core.fast_render."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100000)
+        parser.add_argument("--ledger", choices=sorted(LEDGERS), action="append")
+
+    def _time(self, label, rows, fn):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f"{label:<44} {elapsed:7.2f} s {elapsed * 1e6 / rows:8.2f} µs/row")
+        return result
+
+    def handle(self, *args, **options):
+        count = options["rows"]
+        if load_orjson() is None:
+            self.stdout.write("orjson is not installed: the fast path writes JSON with JSONRenderer")
+
+        # against a throwaway user, rolled back afterwards
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user("bench-serialization", password="bench-serialization")
+                for name in options["ledger"] or sorted(LEDGERS):
+                    model, serializer_class = LEDGERS[name]
+                    model.objects.bulk_create(_rows(model, user, count), batch_size=5000)
+                    queryset = model.objects.filter(user=user).order_by("-date", "-id")
+                    renderer = RowRenderer(serializer_class)
+
+                    def fast(allow_orjson):
+                        out, plain = renderer.render(queryset.values(*renderer.value_names))
+                        return dumps(out, allow_orjson and plain)
+
+                    expected = self._time(f"{name}: ModelSerializer + JSONRenderer", count,
+                                          lambda: JSONRenderer().render(serializer_class(queryset, many=True).data))
+                    body = self._time(f"{name}: values() + orjson", count, lambda: fast(True))
+                    stdlib = self._time(f"{name}: values() + JSONRenderer", count, lambda: fast(False))
+                    if not expected == body == stdlib:
+                        self.stderr.write(f"{name}: fast path output differs from the serializer's")
+                raise _Rollback
+        except _Rollback:
+            pass
@@ -0,0 +1,89 @@
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# each scenario runs in a fresh interpreter under `python -X importtime`
+SCENARIOS = {
+    "check": ["manage.py", "check"],
+    # what a WSGI worker does before serving its first request
+    "worker": ["-c", (
+        "from finance_ai.wsgi import application; "
+        "from django.urls import get_resolver; "
+        "get_resolver().url_patterns"
+    )],
+}
+
+# default import-time budgets in ms (total of every module imported)
+BUDGETS_MS = {"check": 650, "worker": 600}
+
+# heavy modules that must only be imported on first use
+LAZY_MODULES = ("numpy", "Crypto", "core.views", "core.ml_views", "rest_framework_simplejwt.views")
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure(scenario):
+    """(total import time in ms, {top-level module: cumulative ms}, set of every imported module)."""
+    env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "finance_ai.settings")}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *SCENARIOS[scenario]],
+        cwd=Path(settings.BASE_DIR), env=env, capture_output=True, text=True,
+    )
+    if result.returncode:
+        raise CommandError(f"{scenario} exited with {result.returncode}:\n{result.stderr[-2000:]}")
+
+    total = 0
+    top_level = {}
+    modules = set()
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        total += int(self_us)
+        modules.add(name)
+        if len(indent) == 1:
+            top_level[name] = int(cumulative_us) / 1000
+    return total / 1000, top_level, modules
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure `python -X importtime` for `manage.py check` and a worker cold start; "
+        "exits non-zero over budget or when a lazy module is imported at startup (for CI)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scenario", choices=sorted(SCENARIOS), action="append", dest="scenarios",
+                            help="Scenario to measure (repeatable). Defaults to all.")
+        parser.add_argument("--repeat", type=int, default=3, help="Runs per scenario; the median is reported.")
+        parser.add_argument("--check-budget-ms", type=float, default=BUDGETS_MS["check"])
+        parser.add_argument("--worker-budget-ms", type=float, default=BUDGETS_MS["worker"])
+        parser.add_argument("--top", type=int, default=8, help="Slowest top-level imports to list.")
+
+    def handle(self, *args, **options):
+        failures = []
+        for scenario in options["scenarios"] or sorted(SCENARIOS):
+            runs = [measure(scenario) for _ in range(max(options["repeat"], 1))]
+            total = statistics.median(run[0] for run in runs)
+            budget = options[f"{scenario}_budget_ms"]
+            top_level, modules = runs[-1][1], runs[-1][2]
+
+            self.stdout.write(f"{scenario}: {total:.1f} ms of imports (budget {budget:.0f} ms, {len(runs)} runs)")
+            for name, ms in sorted(top_level.items(), key=lambda item: -item[1])[:options["top"]]:
+                self.stdout.write(f"  {ms:8.1f} ms  {name}")
+
+            if total > budget:
+                failures.append(f"{scenario}: {total:.1f} ms > {budget:.0f} ms budget")
+            eager = sorted(m for m in LAZY_MODULES if m in modules)
+            if eager:
+                failures.append(f"{scenario}: imported at startup: {', '.join(eager)}")
+
+        if failures:
+            raise CommandError("Startup budget exceeded:\n" + "\n".join(failures))
@@ -0,0 +1,61 @@
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ml.engine import DEFAULT_MODEL
+from ml.forecast_model import build_batch_forecast
+from ml.series import load_tail_matrix
+
+from core.forecasting import FORECAST_SOURCES, MIN_POINTS, forecast_cache_key, get_forecast_cache
+from core.models import DataVersion, ForecastModelChoice
+
+
+class Command(BaseCommand):
+    help = (
+        "Nightly precompute of every user's forecast in one vectorized pass, "
+        "written to the forecast cache under each user's current data version."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--kind", choices=sorted(FORECAST_SOURCES), action="append", dest="kinds",
+                            help="Forecast kind to precompute (repeatable). Defaults to all.")
+
+    def handle(self, *args, **options):
+        backend = getattr(settings, "FORECAST_CACHE", {}).get("BACKEND", "lru")
+        if backend != "django":
+            self.stderr.write(
+                "FORECAST_CACHE backend is the in-process LRU; results written here are not "
+                "visible to web workers. Use the 'django' backend with a shared cache."
+            )
+
+        cache = get_forecast_cache()
+        versions = dict(DataVersion.objects.values_list("user_id", "version"))
+
+        for kind in options["kinds"] or sorted(FORECAST_SOURCES):
+            started = time.perf_counter()
+            user_ids, matrix = load_tail_matrix(FORECAST_SOURCES[kind]())
+            loaded = time.perf_counter()
+
+            predictions = build_batch_forecast(matrix)
+            computed = time.perf_counter()
+
+            # users moved onto another model by select_forecast_models are left to the request path
+            other_model = set(
+                ForecastModelChoice.objects.filter(kind=kind).exclude(model=DEFAULT_MODEL).values_list("user_id", flat=True)
+            )
+            enough = (~np.isnan(matrix)).sum(axis=1) >= MIN_POINTS
+            for user_id, row, ok in zip(user_ids, predictions, enough):
+                if user_id in other_model:
+                    continue
+                value = [float(v) for v in row] if ok else None
+                cache.set(forecast_cache_key(kind, user_id, versions.get(user_id, 0)), value)
+            finished = time.perf_counter()
+
+            users = len(user_ids)
+            self.stdout.write(
+                f"{kind}: {users} users | load {loaded - started:.2f}s, "
+                f"forecast {computed - loaded:.3f}s ({users / max(computed - loaded, 1e-9):,.0f} users/s), "
+                f"total {finished - started:.2f}s ({users / max(finished - started, 1e-9):,.0f} users/s)"
+            )
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from core.sync import purge_tombstones
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete sync tombstones older than --days (default SYNC['TOMBSTONE_TTL_DAYS']); "
+        "clients whose token predates them get a full resync."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int)
+
+    def handle(self, *args, **options):
+        deleted = purge_tombstones(options["days"])
+        self.stdout.write(self.style.SUCCESS(f"Purged {deleted} tombstones."))
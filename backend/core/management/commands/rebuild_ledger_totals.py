@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.ledger import check_totals, rebuild_totals
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-user ledger totals from the raw Transaction/Expense/Income rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check", action="store_true",
+            help="Only compare the stored totals with the raw rows; do not rewrite them.",
+        )
+        parser.add_argument(
+            "--user-id", type=int, action="append", dest="user_ids",
+            help="Limit to this user (repeatable). Defaults to every user.",
+        )
+
+    def handle(self, *args, **options):
+        user_ids = options["user_ids"]
+
+        if not options["check"]:
+            buckets, users = rebuild_totals(user_ids)
+            self.stdout.write(f"Rebuilt {buckets} buckets for {users} users.")
+
+        problems = check_totals(user_ids)
+        for problem in problems:
+            self.stderr.write(problem)
+        if problems:
+            raise CommandError(f"{len(problems)} ledger totals do not match the raw rows.")
+        self.stdout.write(self.style.SUCCESS("Ledger totals match the raw rows."))
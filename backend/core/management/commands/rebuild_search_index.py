@@ -0,0 +1,36 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+
+from core.models import SearchToken, Transaction
+from core.search import index_transactions
+
+
+class Command(BaseCommand):
+    help = "Rebuild the blind search index over Transaction descriptions."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument(
+            "--user-id", type=int, action="append", dest="user_ids",
+            help="Limit to this user (repeatable). Defaults to every user.",
+        )
+
+    def handle(self, *args, **options):
+        qs = Transaction.objects.only("id", "user_id", "description").order_by("pk")
+        tokens = SearchToken.objects.all()
+        if options["user_ids"]:
+            qs = qs.filter(user_id__in=options["user_ids"])
+            tokens = tokens.filter(user_id__in=options["user_ids"])
+        tokens.delete()
+
+        rows = qs.iterator(chunk_size=options["chunk_size"])
+        indexed = written = 0
+        while True:
+            chunk = list(islice(rows, options["chunk_size"]))
+            if not chunk:
+                break
+            written += index_transactions(chunk)
+            indexed += len(chunk)
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} transactions ({written} tokens)."))
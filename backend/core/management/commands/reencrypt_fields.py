@@ -0,0 +1,92 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction as db_transaction
+
+from core.models import KeyRotationCheckpoint, Transaction
+from core.utils import KEY_ID_SEPARATOR, active_key_id, reencrypt_many
+
+# label -> (model, encrypted field)
+ENCRYPTED_FIELDS = {
+    "transaction.description": (Transaction, "description"),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-encrypt stored values onto settings.AES_ACTIVE_KEY in small chunks. "
+        "Progress is checkpointed, so the command can be stopped and re-run at any time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=500,
+                            help="Rows read and rewritten per transaction.")
+        parser.add_argument("--pause", type=float, default=0.0,
+                            help="Seconds to sleep between chunks to throttle write load.")
+        parser.add_argument("--max-chunks", type=int, default=None,
+                            help="Stop after this many chunks (resume later from the checkpoint).")
+        parser.add_argument("--field", choices=sorted(ENCRYPTED_FIELDS), action="append", dest="fields",
+                            help="Limit to this field (repeatable). Defaults to every encrypted field.")
+        parser.add_argument("--restart", action="store_true",
+                            help="Ignore the stored checkpoint and scan from the first row.")
+
+    def handle(self, *args, **options):
+        try:
+            active = active_key_id()
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        chunks_left = options["max_chunks"]
+        for label in options["fields"] or sorted(ENCRYPTED_FIELDS):
+            if chunks_left is not None and chunks_left <= 0:
+                break
+            chunks_left = self.rotate_field(label, active, options, chunks_left)
+
+    def rotate_field(self, label, active, options, chunks_left):
+        model, field = ENCRYPTED_FIELDS[label]
+        checkpoint, _ = KeyRotationCheckpoint.objects.get_or_create(name=f"{label}->{active or 'legacy'}")
+        if options["restart"]:
+            checkpoint.last_pk, checkpoint.rows_rewritten, checkpoint.finished = 0, 0, False
+            checkpoint.save()
+        if checkpoint.finished:
+            self.stdout.write(f"{label}: already on key {active!r}.")
+            return chunks_left
+
+        pending = model.objects.exclude(**{field: ""})
+        if active is not None:
+            pending = pending.exclude(**{f"{field}__startswith": f"{active}{KEY_ID_SEPARATOR}"})
+
+        while chunks_left is None or chunks_left > 0:
+            with db_transaction.atomic():
+                rows = list(
+                    pending.select_for_update()
+                    .filter(pk__gt=checkpoint.last_pk)
+                    .order_by("pk")
+                    .values_list("pk", field)[: options["chunk_size"]]
+                )
+                if not rows:
+                    checkpoint.finished = True
+                    checkpoint.save()
+                    break
+
+                rewritten = reencrypt_many([value for _, value in rows])
+                changed = [model(pk=pk, **{field: new}) for (pk, _), new in zip(rows, rewritten) if new]
+                model.objects.bulk_update(changed, [field])
+
+                checkpoint.last_pk = rows[-1][0]
+                checkpoint.rows_rewritten += len(changed)
+                checkpoint.save()
+
+            skipped = len(rows) - len(changed)
+            self.stdout.write(
+                f"{label}: up to pk {checkpoint.last_pk}, {checkpoint.rows_rewritten} rewritten"
+                + (f" ({skipped} undecryptable rows left as-is)" if skipped else "")
+            )
+            if chunks_left is not None:
+                chunks_left -= 1
+            if options["pause"]:
+                time.sleep(options["pause"])
+
+        if checkpoint.finished:
+            self.stdout.write(self.style.SUCCESS(f"{label}: done, {checkpoint.rows_rewritten} rows on key {active!r}."))
+        return chunks_left
@@ -0,0 +1,76 @@
+import os
+import time
+from collections import Counter
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from ml.engine import DEFAULT_FOLDS, DEFAULT_MODEL, min_selection_points, select_models
+from ml.series import load_tail_matrix
+
+from core.forecasting import FORECAST_SOURCES, forecast_kind
+from core.models import ForecastModelChoice
+from core.versioning import bump_data_version
+
+KINDS = sorted(forecast_kind(source, daily) for source in FORECAST_SOURCES for daily in (False, True))
+
+
+class Command(BaseCommand):
+    help = (
+        "Pick the forecasting model for every user with enough history by a "
+        "rolling-origin backtest (run across worker processes) and store the winner."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--kind", choices=KINDS, action="append", dest="kinds",
+                            help="Forecast kind to select for (repeatable). Defaults to all.")
+        parser.add_argument("--history", type=int, default=120,
+                            help="Most recent points of each series to backtest on.")
+        parser.add_argument("--folds", type=int, default=DEFAULT_FOLDS, help="Rolling origins per series.")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                            help="Worker processes for the backtests (1 = run inline).")
+
+    def handle(self, *args, **options):
+        needed = min_selection_points(options["folds"])
+        for kind in options["kinds"] or KINDS:
+            source, _, daily = kind.partition(":")
+            started = time.perf_counter()
+            user_ids, matrix = load_tail_matrix(
+                FORECAST_SOURCES[source](), window=max(options["history"], needed), daily=bool(daily),
+            )
+            items = {}
+            for user_id, row in zip(user_ids, matrix):
+                series = row[~np.isnan(row)]
+                if len(series) >= needed:
+                    items[user_id] = series.tolist()
+            loaded = time.perf_counter()
+
+            choices = [
+                ForecastModelChoice(
+                    user_id=user_id, kind=kind, model=model, points=len(items[user_id]),
+                    error=errors.get(model), baseline_error=errors.get(DEFAULT_MODEL),
+                )
+                for user_id, model, errors in select_models(items.items(), options["folds"], options["workers"])
+            ]
+            selected = time.perf_counter()
+
+            # a changed choice changes the forecast: bump the version so cached results are not served
+            current = dict(ForecastModelChoice.objects.filter(kind=kind).values_list("user_id", "model"))
+            stale = [user_id for user_id in current if user_id not in items]
+            changed = [c.user_id for c in choices if current.get(c.user_id, DEFAULT_MODEL) != c.model]
+            changed += [user_id for user_id in stale if current[user_id] != DEFAULT_MODEL]
+
+            ForecastModelChoice.objects.filter(kind=kind, user_id__in=stale).delete()
+            ForecastModelChoice.objects.bulk_create(
+                choices, batch_size=1000, update_conflicts=True, unique_fields=["user", "kind"],
+                update_fields=["model", "error", "baseline_error", "points", "updated_at"],
+            )
+            for user_id in changed:
+                bump_data_version(user_id)
+
+            wins = Counter(c.model for c in choices)
+            self.stdout.write(
+                f"{kind}: {len(items)} of {len(user_ids)} users backtested | load {loaded - started:.2f}s, "
+                f"select {selected - loaded:.2f}s | changed {len(changed)} | "
+                + (", ".join(f"{model} {count}" for model, count in wins.most_common()) or "no winners")
+            )
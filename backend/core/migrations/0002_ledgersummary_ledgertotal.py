@@ -0,0 +1,85 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def backfill_totals(apps, schema_editor):
+    LedgerTotal = apps.get_model('core', 'LedgerTotal')
+    LedgerSummary = apps.get_model('core', 'LedgerSummary')
+    sources = [
+        ('transaction', apps.get_model('core', 'Transaction'), 'category'),
+        ('expense', apps.get_model('core', 'Expense'), 'category'),
+        ('income', apps.get_model('core', 'Income'), 'source'),
+    ]
+
+    buckets = []
+    summaries = {}
+    for ledger, model, category_field in sources:
+        rows = (
+            model.objects.annotate(bucket=TruncMonth('date'))
+            .values('user_id', category_field, 'bucket')
+            .annotate(total=Sum('amount'), count=Count('id'))
+            .order_by()
+        )
+        for row in rows.iterator():
+            category = row[category_field] or ''
+            total = float(row['total'] or 0)
+            buckets.append(LedgerTotal(
+                user_id=row['user_id'], ledger=ledger, category=category,
+                month=row['bucket'].strftime('%Y-%m'), total=total, count=row['count'],
+            ))
+            if ledger == 'transaction':
+                field = {'income': 'transaction_income', 'expense': 'transaction_expense'}.get(category.lower())
+            else:
+                field = f'{ledger}_total'
+            if field:
+                fields = summaries.setdefault(row['user_id'], {})
+                fields[field] = fields.get(field, 0.0) + total
+
+    LedgerTotal.objects.bulk_create(buckets, batch_size=1000)
+    LedgerSummary.objects.bulk_create(
+        [LedgerSummary(user_id=user_id, **fields) for user_id, fields in summaries.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('transaction_income', models.FloatField(default=0)),
+                ('transaction_expense', models.FloatField(default=0)),
+                ('expense_total', models.FloatField(default=0)),
+                ('income_total', models.FloatField(default=0)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_summary', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LedgerTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ledger', models.CharField(choices=[('transaction', 'Transaction'), ('expense', 'Expense'), ('income', 'Income')], max_length=12)),
+                ('category', models.CharField(max_length=255)),
+                ('month', models.CharField(max_length=7)),
+                ('total', models.FloatField(default=0)),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_totals', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'ledger', 'category', 'month'), name='uniq_ledger_total_bucket')],
+            },
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
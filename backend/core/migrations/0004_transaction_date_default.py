@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:27
+
+import datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_ledger_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transaction',
+            name='date',
+            field=models.DateField(default=datetime.date.today),
+        ),
+    ]
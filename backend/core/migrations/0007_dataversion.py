@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_versions(apps, schema_editor):
+    # every existing user starts with a row, so deletes only ever need an UPDATE
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    DataVersion = apps.get_model('core', 'DataVersion')
+    DataVersion.objects.bulk_create(
+        [DataVersion(user_id=pk) for pk in User.objects.values_list('pk', flat=True).iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_searchtoken'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField(default=0)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='data_version', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_dataversion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ForecastState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=20)),
+                ('n', models.PositiveIntegerField(default=0)),
+                ('sum_x', models.FloatField(default=0)),
+                ('sum_xx', models.FloatField(default=0)),
+                ('sum_y', models.FloatField(default=0)),
+                ('sum_xy', models.FloatField(default=0)),
+                ('recent_sum', models.FloatField(default=0)),
+                ('recent_weighted', models.FloatField(default=0)),
+                ('recent_mean', models.FloatField(default=0)),
+                ('recent_m2', models.FloatField(default=0)),
+                ('window', models.JSONField(default=list)),
+                ('pushes', models.PositiveIntegerField(default=0)),
+                ('last_date', models.DateField(blank=True, null=True)),
+                ('last_pk', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='forecast_states', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'kind'), name='uniq_forecast_state')],
+            },
+        ),
+    ]
@@ -1,49 +1,42 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db import models
 
 from ml.finance_score import calculate_financial_score
-from ml.forecast_model import build_lstm_model
 
-from.models import Income
-from .models import Expense
+from .conditional import ConditionalGetMixin
+from .forecasting import expense_forecast
+from .ledger import get_summary
 
 
-class ForecastView(APIView):
+class ForecastView(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        expenses = Expense.objects.filter(user=request.user).order_by("date")
-        values = [float(e.amount) for e in expenses]
+        try:
+            daily = request.query_params.get("bucket") == "daily"
+            predictions = expense_forecast(request.user, daily=daily)
+        except Exception as e:
+            return Response({"error": str(e)}, status=500)
 
-        if len(values) < 7:
+        if predictions is None:
             return Response({
                 "error": "Not enough data. Need at least 7 expense entries."
             }, status=400)
 
-        try:
-            predictions = build_lstm_model(values)
-        except Exception as e:
-            return Response({"error": str(e)}, status=500)
-
         return Response({
             "next_7_days": predictions
         })
-        
 
-class FinancialScoreView(APIView):
+
+class FinancialScoreView(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        income_total = Income.objects.filter(user=request.user).aggregate(total=models.Sum("amount"))["total"] or 0
-        expense_total = Expense.objects.filter(user=request.user).aggregate(total=models.Sum("amount"))["total"] or 0
-
-        result = calculate_financial_score(
-            income=income_total,
-            expenses=expense_total,
-            savings=request.query_params.get("savings", 0),
-            debt=request.query_params.get("debt", 0),
-        )
+        summary = get_summary(request.user)
+        income_total = summary.income_total
+        expense_total = summary.expense_total
+
+        result = calculate_financial_score(income=income_total, expenses=expense_total)
 
         return Response(result)
@@ -1,4 +1,6 @@
 # core/models.py
+import datetime
+
 from django.db import models
 from django.contrib.auth.models import User
 
@@ -12,7 +14,17 @@ class Transaction(models.Model):
     category = models.CharField(max_length=10, choices=CATEGORY_CHOICES)
     amount = models.FloatField()
     description = models.TextField(blank=True)
-    date = models.DateField(auto_now_add=True)
+    # statement imports set historical dates; the API keeps it read-only
+    date = models.DateField(default=datetime.date.today)
+    # DataVersion.version of the last write (core.sync)
+    sync_version = models.BigIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "date"], name="txn_user_date_idx"),
+            models.Index(fields=["user", "category", "date"], name="txn_user_cat_date_idx"),
+            models.Index(fields=["user", "sync_version"], name="txn_user_sync_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.category} - {self.amount}"
@@ -28,11 +40,47 @@ class ChatMessage(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=["user", "created_at"], name="chat_user_created_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.username} @ {self.created_at:%Y-%m-%d %H:%M}"
 
 
+class ChatSummary(models.Model):
+    """Rolling summary of a user's chat turns that no longer fit the LLM context (core.chat_context)."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='chat_summary')
+    summary = models.TextField(blank=True, default='')
+    # newest ChatMessage folded into the summary so far
+    last_message_id = models.BigIntegerField(default=0)
+    turns = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.username} ({self.turns} turns)"
+
+
+class ChatArchive(models.Model):
+    """A batch of ChatMessage rows moved out of the hot table (core.chat_archive), as gzip'd NDJSON."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chat_archives')
+    first_message_id = models.BigIntegerField()
+    last_message_id = models.BigIntegerField()
+    first_created_at = models.DateTimeField()
+    last_created_at = models.DateTimeField()
+    count = models.PositiveIntegerField()
+    data = models.BinaryField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "first_created_at"], name="chat_archive_user_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username}: {self.count} messages up to {self.last_created_at:%Y-%m-%d}"
+
+
 # -------------------- CATEGORY --------------------
 class Category(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -71,6 +119,15 @@ class Expense(models.Model):
     date = models.DateField()
     note = models.CharField(max_length=255, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # DataVersion.version of the last write (core.sync)
+    sync_version = models.BigIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "date"], name="expense_user_date_idx"),
+            models.Index(fields=["user", "category", "date"], name="expense_user_cat_date_idx"),
+            models.Index(fields=["user", "sync_version"], name="expense_user_sync_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.category} - {self.amount}"
@@ -81,6 +138,14 @@ class Goal(models.Model):
     deadline = models.DateField()
     note = models.CharField(max_length=255, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # DataVersion.version of the last write (core.sync)
+    sync_version = models.BigIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "deadline"], name="goal_user_deadline_idx"),
+            models.Index(fields=["user", "sync_version"], name="goal_user_sync_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.title}"
@@ -91,7 +156,183 @@ class Income(models.Model):
     date = models.DateField()
     note = models.CharField(max_length=255, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # DataVersion.version of the last write (core.sync)
+    sync_version = models.BigIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "date"], name="income_user_date_idx"),
+            models.Index(fields=["user", "source", "date"], name="income_user_src_date_idx"),
+            models.Index(fields=["user", "sync_version"], name="income_user_sync_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.source} - {self.amount}"
 
+
+
+# -------------------- LEDGER TOTALS --------------------
+class LedgerSummary(models.Model):
+    """Running per-user totals, kept in sync by core.ledger signal handlers."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="ledger_summary")
+    transaction_income = models.FloatField(default=0)
+    transaction_expense = models.FloatField(default=0)
+    expense_total = models.FloatField(default=0)
+    income_total = models.FloatField(default=0)
+
+    def __str__(self):
+        return f"{self.user.username} - ledger summary"
+
+
+class LedgerTotal(models.Model):
+    LEDGER_CHOICES = [
+        ('transaction', 'Transaction'),
+        ('expense', 'Expense'),
+        ('income', 'Income'),
+    ]
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="ledger_totals")
+    ledger = models.CharField(max_length=12, choices=LEDGER_CHOICES)
+    category = models.CharField(max_length=255)  # Transaction.category / Expense.category / Income.source
+    month = models.CharField(max_length=7)  # "2024-11"
+    total = models.FloatField(default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "ledger", "category", "month"],
+                name="uniq_ledger_total_bucket",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.ledger} - {self.category} - {self.month}"
+
+
+# -------------------- KEY ROTATION --------------------
+class KeyRotationCheckpoint(models.Model):
+    """Progress marker for `manage.py reencrypt_fields`, one row per (field, target key)."""
+    name = models.CharField(max_length=100, unique=True)
+    last_pk = models.BigIntegerField(default=0)
+    rows_rewritten = models.BigIntegerField(default=0)
+    finished = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_pk}"
+
+
+# -------------------- ENCRYPTED SEARCH --------------------
+class SearchToken(models.Model):
+    """Keyed-HMAC blind index over the words of a Transaction's (encrypted) description."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="search_tokens")
+    transaction = models.ForeignKey(Transaction, on_delete=models.CASCADE, related_name="search_tokens")
+    token = models.CharField(max_length=32)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["transaction", "token"], name="uniq_search_token"),
+        ]
+        indexes = [
+            # covering index for the token -> transaction lookup
+            models.Index(fields=["user", "token", "transaction"], name="search_user_token_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.token}"
+
+
+# -------------------- DATA VERSION --------------------
+class DataVersion(models.Model):
+    """Per-user counter bumped on every ledger write; cached results are keyed on it."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="data_version")
+    version = models.BigIntegerField(default=0)
+    # sync tokens older than this may have missed purged tombstones (core.sync)
+    sync_horizon = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user.username} v{self.version}"
+
+
+class SyncTombstone(models.Model):
+    """A deleted ledger row, kept until purged so delta sync can report the delete (core.sync)."""
+    # plain ids: tombstones outlive their rows and may outlive the user (purged later)
+    user_id = models.BigIntegerField()
+    kind = models.CharField(max_length=16)
+    object_id = models.BigIntegerField()
+    version = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user_id", "version"], name="tombstone_user_version_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} (user {self.user_id}) v{self.version}"
+
+
+class IdempotencyKey(models.Model):
+    """Client key of an applied batch item and its result, replayed on retries (core.batch)."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="idempotency_keys")
+    key = models.CharField(max_length=64)
+    result = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "key"], name="uniq_idempotency_key"),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username}: {self.key}"
+
+
+# -------------------- FORECAST STATE --------------------
+class ForecastState(models.Model):
+    """Sliding-window statistics of one forecast series (ml.online.OnlineForecast), updated per write."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="forecast_states")
+    kind = models.CharField(max_length=20)
+    n = models.PositiveIntegerField(default=0)
+    sum_x = models.FloatField(default=0)
+    sum_xx = models.FloatField(default=0)
+    sum_y = models.FloatField(default=0)
+    sum_xy = models.FloatField(default=0)
+    recent_sum = models.FloatField(default=0)
+    recent_weighted = models.FloatField(default=0)
+    recent_mean = models.FloatField(default=0)
+    recent_m2 = models.FloatField(default=0)
+    window = models.JSONField(default=list)
+    pushes = models.PositiveIntegerField(default=0)
+    # (date, pk) of the newest row folded in; anything older means a rebuild
+    last_date = models.DateField(null=True, blank=True)
+    last_pk = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "kind"], name="uniq_forecast_state"),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.kind} ({self.n} points)"
+
+
+class ForecastModelChoice(models.Model):
+    """Model picked for one (user, forecast kind) by `manage.py select_forecast_models`."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="forecast_model_choices")
+    kind = models.CharField(max_length=20)
+    model = models.CharField(max_length=30)
+    # backtest mean absolute error of the winner and of the default blend
+    error = models.FloatField(null=True, blank=True)
+    baseline_error = models.FloatField(null=True, blank=True)
+    points = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "kind"], name="uniq_forecast_model_choice"),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.kind}: {self.model}"
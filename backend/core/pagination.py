@@ -0,0 +1,123 @@
+# core/pagination.py
+"""
+Keyset (cursor) pagination for the ledger list endpoints.
+
+Pages are ordered by (<keyset field>, id) and the cursor carries the last
+row's (value, id), so fetching page N is an indexed range scan of `limit`
+rows instead of an OFFSET that re-reads every earlier page.
+
+Pagination is opt-in: a request without `limit` or `cursor` still gets the
+plain list the mobile client has always received.
+"""
+
+import base64
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def parse_fields(request, serializer_class):
+    """
+    Read the `fields=a,b,c` projection from the query string.
+
+    Returns None when no projection was asked for.
+    """
+    raw = request.query_params.get("fields")
+    if not raw:
+        return None
+    fields = [f.strip() for f in raw.split(",") if f.strip()]
+    unknown = set(fields) - set(serializer_class().fields)
+    if unknown:
+        raise ValidationError({"fields": f"Unknown fields: {', '.join(sorted(unknown))}"})
+    return fields
+
+
+class KeysetPagination(BasePagination):
+    cursor_query_param = "cursor"
+    limit_query_param = "limit"
+    default_limit = 50
+    max_limit = 500
+
+    def __init__(self, keyset_field="date", descending=True):
+        self.keyset_field = keyset_field
+        self.descending = descending
+
+    def is_requested(self, request):
+        params = request.query_params
+        return self.cursor_query_param in params or self.limit_query_param in params
+
+    def get_limit(self, request):
+        raw = request.query_params.get(self.limit_query_param)
+        if raw is None:
+            return self.default_limit
+        try:
+            limit = int(raw)
+        except ValueError:
+            raise ValidationError({self.limit_query_param: "Must be an integer."})
+        if limit < 1:
+            raise ValidationError({self.limit_query_param: "Must be at least 1."})
+        return min(limit, self.max_limit)
+
+    def encode_cursor(self, instance):
+        # model instances, or .values() dicts on the fast render path
+        if isinstance(instance, dict):
+            value, pk = instance[self.keyset_field], instance["id"]
+        else:
+            value, pk = getattr(instance, self.keyset_field), instance.pk
+        payload = json.dumps([str(value), pk])
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, queryset, token):
+        try:
+            value, pk = json.loads(base64.urlsafe_b64decode(token.encode()))
+            field = queryset.model._meta.get_field(self.keyset_field)
+            return field.to_python(value), int(pk)
+        except Exception:
+            raise NotFound("Invalid cursor")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_requested(request):
+            return None
+
+        self.request = request
+        self.limit = self.get_limit(request)
+
+        prefix = "-" if self.descending else ""
+        queryset = queryset.order_by(f"{prefix}{self.keyset_field}", f"{prefix}id")
+
+        token = request.query_params.get(self.cursor_query_param)
+        if token:
+            value, pk = self.decode_cursor(queryset, token)
+            op = "lt" if self.descending else "gt"
+            queryset = queryset.filter(
+                Q(**{f"{self.keyset_field}__{op}": value})
+                | Q(**{self.keyset_field: value, f"id__{op}": pk})
+            )
+
+        # fetch one extra row to learn whether another page exists
+        page = list(queryset[: self.limit + 1])
+        self.has_next = len(page) > self.limit
+        page = page[: self.limit]
+        self.next_cursor = self.encode_cursor(page[-1]) if self.has_next else None
+        return page
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_data(self, data):
+        return {
+            "next": self.get_next_link(),
+            "next_cursor": self.next_cursor,
+            "results": data,
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
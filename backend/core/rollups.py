@@ -0,0 +1,92 @@
+# core/rollups.py
+"""
+Per-month and per-category totals of the Expense and Income ledgers.
+
+Each ledger is grouped in the database with one query --
+TruncMonth("date") x category, Sum("amount") and Count -- over the
+(user, date) index; the month and category totals are both folded from
+those cells, so the client gets a small summary instead of every row.
+Results are cached per (user, data version, date range).
+"""
+
+import datetime
+from collections import defaultdict
+
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+from .forecasting import cached_for_user
+from .models import Expense, Income
+
+# ledger -> (model, field holding the category)
+ROLLUPS = {
+    "expense": (Expense, "category"),
+    "income": (Income, "source"),
+}
+
+
+class RollupError(ValueError):
+    pass
+
+
+def parse_range(params):
+    """(start, end) dates from the query params, both optional and inclusive."""
+    dates = []
+    for name in ("start", "end"):
+        raw = params.get(name)
+        try:
+            dates.append(datetime.date.fromisoformat(raw) if raw else None)
+        except ValueError:
+            raise RollupError(f"'{name}' must be a date in YYYY-MM-DD format.")
+    start, end = dates
+    if start and end and start > end:
+        raise RollupError("'start' must not be after 'end'.")
+    return start, end
+
+
+def ledger_rollup(user, ledger, start=None, end=None):
+    model, category_field = ROLLUPS[ledger]
+    qs = model.objects.filter(user=user)
+    if start:
+        qs = qs.filter(date__gte=start)
+    if end:
+        qs = qs.filter(date__lte=end)
+    cells = (
+        qs.annotate(month=TruncMonth("date"))
+        .values("month", category_field)
+        .annotate(total=Sum("amount"), count=Count("id"))
+        .order_by()
+    )
+
+    months = defaultdict(lambda: [0.0, 0])
+    categories = defaultdict(lambda: [0.0, 0])
+    for cell in cells:
+        total = float(cell["total"] or 0)
+        for bucket in (months[cell["month"].strftime("%Y-%m")], categories[cell[category_field] or ""]):
+            bucket[0] += total
+            bucket[1] += cell["count"]
+
+    return {
+        "total": round(sum(total for total, _ in months.values()), 2),
+        "count": sum(count for _, count in months.values()),
+        "months": [
+            {"month": month, "total": round(total, 2), "count": count}
+            for month, (total, count) in sorted(months.items())
+        ],
+        "categories": [
+            {"category": category, "total": round(total, 2), "count": count}
+            for category, (total, count) in sorted(categories.items())
+        ],
+    }
+
+
+def rollup(user, start=None, end=None):
+    """Expense and income rollups of `user` over [start, end], cached until their data changes."""
+    def compute():
+        return {
+            "start": start.isoformat() if start else None,
+            "end": end.isoformat() if end else None,
+            **{ledger: ledger_rollup(user, ledger, start, end) for ledger in ROLLUPS},
+        }
+
+    return cached_for_user(user, f"rollup:{start or ''}:{end or ''}", compute)
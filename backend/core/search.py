@@ -0,0 +1,115 @@
+# core/search.py
+"""
+Blind index for searching encrypted Transaction descriptions.
+
+Each normalized word of a description is stored as
+HMAC-SHA256(index key, "<user id>:<word>") truncated to 128 bits, so a query
+is tokenized the same way and answered by an indexed SearchToken lookup
+without decrypting anything. Mixing in the user id keeps equal words from
+producing equal tokens across users.
+
+The index key is settings.BLIND_INDEX_KEY (falls back to SECRET_KEY) and is
+independent of the AES keys, so key rotation does not invalidate it.
+"""
+
+import functools
+import hashlib
+import hmac
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models import Count
+from django.db.models.signals import post_save
+
+from .models import SearchToken, Transaction
+from .utils import decrypt_many
+
+_WORD = re.compile(r"\w+")
+MIN_WORD_LENGTH = 2
+MAX_QUERY_WORDS = 8
+
+
+@functools.lru_cache(maxsize=4)
+def _derive_index_key(secret):
+    return hmac.new(secret.encode(), b"core.search.blind-index", hashlib.sha256).digest()
+
+
+def _index_key():
+    return _derive_index_key(getattr(settings, "BLIND_INDEX_KEY", None) or settings.SECRET_KEY)
+
+
+def normalize_words(text):
+    """Distinct lower-cased words of `text`, in order of first appearance."""
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    seen = {}
+    for word in _WORD.findall(text):
+        if len(word) >= MIN_WORD_LENGTH:
+            seen.setdefault(word, None)
+    return list(seen)
+
+
+def tokens_for(user_id, text, key=None):
+    key = key or _index_key()
+    return [
+        hmac.new(key, f"{user_id}:{word}".encode(), hashlib.sha256).hexdigest()[:32]
+        for word in normalize_words(text)
+    ]
+
+
+def index_transactions(transactions, plaintexts=None, replace=False):
+    """
+    (Re)build the tokens of `transactions`.
+
+    `plaintexts` can be passed when the caller still has the descriptions in
+    the clear; otherwise they are decrypted in one batch.
+    """
+    transactions = list(transactions)
+    if not transactions:
+        return 0
+    if plaintexts is None:
+        plaintexts = decrypt_many([t.description for t in transactions], strict=False)
+
+    key = _index_key()
+    rows = [
+        SearchToken(user_id=t.user_id, transaction_id=t.pk, token=token)
+        for t, text in zip(transactions, plaintexts)
+        for token in tokens_for(t.user_id, text, key)
+    ]
+    with db_transaction.atomic():
+        if replace:
+            SearchToken.objects.filter(transaction__in=[t.pk for t in transactions]).delete()
+        SearchToken.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+    return len(rows)
+
+
+def search_transactions(user, query):
+    """Transactions of `user` whose description contains every word of `query`."""
+    tokens = tokens_for(user.pk, query)[:MAX_QUERY_WORDS]
+    if not tokens:
+        return Transaction.objects.none()
+    matches = (
+        SearchToken.objects.filter(user=user, token__in=tokens)
+        .values("transaction_id")
+        .annotate(hits=Count("token"))
+        .filter(hits=len(tokens))
+        .values("transaction_id")
+    )
+    return Transaction.objects.filter(user=user, pk__in=matches)
+
+
+# -------------------------
+# Signal handlers
+# -------------------------
+def _on_save(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and "description" not in update_fields:
+        return
+    index_transactions([instance], replace=not created)
+
+
+def connect_signals():
+    # deletes cascade through the SearchToken.transaction foreign key
+    post_save.connect(_on_save, sender=Transaction, dispatch_uid="search_post_save_transaction")
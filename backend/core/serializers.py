@@ -2,11 +2,21 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from .models import Transaction
-from .utils import encrypt_data, decrypt_data
+from .utils import encrypt_data, decrypt_data, decrypt_many
 from .models import Transaction, ChatMessage, Category, Budget, Goal,Expense,Income
 from django.contrib.auth.hashers import make_password
 
 
+class FieldsProjectionMixin:
+    """Serializer mixin accepting `fields=[...]` to render only a subset of the declared fields."""
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -44,13 +54,30 @@ class RegisterSerializer(serializers.ModelSerializer):
         return User.objects.create(**validated_data)
 
 
-class TransactionSerializer(serializers.ModelSerializer):
+class TransactionListSerializer(serializers.ListSerializer):
+    """Decrypts the descriptions of a whole page in one decrypt_many() pass."""
+
+    def to_representation(self, data):
+        return self.decrypt_rows(super().to_representation(data))
+
+    @staticmethod
+    def decrypt_rows(rows):
+        """Decrypt the description of already rendered rows in place (also used by core.fast_render)."""
+        if rows and "description" in rows[0]:
+            plain = decrypt_many([row["description"] or "" for row in rows], strict=False)
+            for row, desc in zip(rows, plain):
+                row["description"] = desc
+        return rows
+
+
+class TransactionSerializer(FieldsProjectionMixin, serializers.ModelSerializer):
     description = serializers.CharField(allow_blank=True, required=False)
 
     class Meta:
         model = Transaction
         fields = ['id', 'user', 'category', 'amount', 'description', 'date']
-        read_only_fields = ['user']
+        read_only_fields = ['user', 'date']
+        list_serializer_class = TransactionListSerializer
 
     def create(self, validated_data):
         desc = validated_data.get('description', '')
@@ -60,11 +87,14 @@ class TransactionSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         ret = super().to_representation(instance)
+        if isinstance(self.parent, TransactionListSerializer):
+            # the list serializer decrypts the page in one batch
+            return ret
         enc_desc = ret.get('description') or ''
         if enc_desc:
             try:
                 ret['description'] = decrypt_data(enc_desc)
-            except Exception:
+            except ValueError:
                 # if it wasn't encrypted, leave as-is
                 pass
         return ret
@@ -93,7 +123,7 @@ class GoalSerializer(serializers.ModelSerializer):
         fields = "__all__"
         read_only_fields = ["user"]
         
-class ExpenseSerializer(serializers.ModelSerializer):
+class ExpenseSerializer(FieldsProjectionMixin, serializers.ModelSerializer):
     class Meta:
         model = Expense
         fields = [
@@ -107,7 +137,7 @@ class ExpenseSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["id", "created_at", "user"]
 
-class GoalSerializer(serializers.ModelSerializer):
+class GoalSerializer(FieldsProjectionMixin, serializers.ModelSerializer):
     class Meta:
         model = Goal
         fields = [
@@ -119,7 +149,7 @@ class GoalSerializer(serializers.ModelSerializer):
             "created_at",
         ]
         read_only_fields = ["id", "created_at"]
-class IncomeSerializer(serializers.ModelSerializer):
+class IncomeSerializer(FieldsProjectionMixin, serializers.ModelSerializer):
     class Meta:
         model = Income
         fields = [
@@ -0,0 +1,247 @@
+# core/statements.py
+"""
+Bank statement import (CSV / OFX).
+
+The uploaded file is parsed as a stream, each row is validated on its own
+and valid rows are inserted with chunked bulk_create inside one database
+transaction. Invalid rows don't abort the import; they come back in a
+per-row error report.
+
+CSV files need a header row. Recognised columns (case-insensitive):
+    date, amount, description (or memo / narration / note / name),
+    category, source,
+    debit / credit (instead of a signed amount column)
+
+OFX files are read <STMTTRN> by <STMTTRN>, using DTPOSTED, TRNAMT and
+NAME / MEMO.
+"""
+
+import csv
+import datetime
+import io
+import re
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction as db_transaction
+
+from .forecasting import FORECAST_SOURCES, rebuild_forecast_state
+from .ledger import apply_entries
+from .models import Transaction, Expense, Income
+from .search import index_transactions
+from .sync import mark_changed
+from .versioning import bump_data_version
+from .utils import encrypt_many
+
+BATCH_SIZE = 1000
+
+LEDGERS = ("transaction", "expense", "income")
+
+DATE_FORMATS = ["%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%Y%m%d"]
+
+DESCRIPTION_COLUMNS = ["description", "memo", "narration", "note", "name", "details"]
+
+_AMOUNT_JUNK = re.compile(r"[,\s₹$€£]")
+_OFX_TAG = re.compile(r"<(\w+)>([^<\r\n]*)")
+_OFX_START = re.compile(r"<STMTTRN>", re.IGNORECASE)
+_OFX_BLOCK = re.compile(r"<STMTTRN>(.*?)</STMTTRN>", re.IGNORECASE | re.DOTALL)
+
+
+class StatementError(ValueError):
+    pass
+
+
+class RowError(ValueError):
+    pass
+
+
+# -------------------------
+# Parsing
+# -------------------------
+def _parse_date(raw):
+    raw = (raw or "").strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(raw, fmt).date()
+        except ValueError:
+            continue
+    raise RowError(f"Unrecognised date '{raw}'.")
+
+
+def _parse_amount(raw):
+    raw = _AMOUNT_JUNK.sub("", raw or "")
+    negative = raw.startswith("(") and raw.endswith(")")  # accounting style (12.00)
+    try:
+        value = Decimal(raw.strip("()"))
+    except InvalidOperation:
+        raise RowError(f"Unrecognised amount '{raw}'.")
+    if not value.is_finite():
+        raise RowError(f"Unrecognised amount '{raw}'.")
+    return -value if negative else value
+
+
+def iter_csv_rows(stream):
+    """Yield (row_number, raw_dict) for each data row of a CSV statement."""
+    reader = csv.reader(stream)
+    try:
+        header = [h.strip().lower() for h in next(reader)]
+    except StopIteration:
+        raise StatementError("The file is empty.")
+    if "date" not in header or not ({"amount", "debit", "credit"} & set(header)):
+        raise StatementError("CSV header needs a 'date' column and an 'amount' (or 'debit'/'credit') column.")
+
+    for number, values in enumerate(reader, start=2):
+        if not any(v.strip() for v in values):
+            continue
+        yield number, dict(zip(header, values))
+
+
+def iter_ofx_rows(stream, read_size=64 * 1024):
+    """Yield (transaction_number, raw_dict) for each <STMTTRN> block of an OFX statement."""
+    buffer = ""
+    number = 0
+    while True:
+        chunk = stream.read(read_size)
+        buffer += chunk
+        pos = 0
+        while True:
+            match = _OFX_BLOCK.search(buffer, pos)
+            if match is None:
+                break
+            pos = match.end()
+            number += 1
+            tags = {name.lower(): value.strip() for name, value in _OFX_TAG.findall(match.group(1))}
+            yield number, {
+                "date": tags.get("dtposted", "")[:8],
+                "amount": tags.get("trnamt", ""),
+                "description": tags.get("name") or tags.get("memo", ""),
+                "memo": tags.get("memo", ""),
+            }
+        if not chunk:
+            return
+        # keep only what might be the start of an unfinished block
+        start = _OFX_START.search(buffer, pos)
+        buffer = buffer[start.start():] if start else buffer[max(pos, len(buffer) - len("<STMTTRN>")):]
+
+
+def detect_format(upload, requested=None):
+    fmt = (requested or "").lower()
+    if not fmt:
+        name = (upload.name or "").lower()
+        fmt = "ofx" if name.endswith((".ofx", ".qfx")) else "csv"
+    if fmt not in ("csv", "ofx"):
+        raise StatementError("'statement_format' must be 'csv' or 'ofx'.")
+    return fmt
+
+
+# -------------------------
+# Row -> model instance
+# -------------------------
+def _signed_amount(raw):
+    if raw.get("amount", "").strip():
+        return _parse_amount(raw["amount"])
+    debit = _parse_amount(raw["debit"]) if raw.get("debit", "").strip() else Decimal(0)
+    credit = _parse_amount(raw["credit"]) if raw.get("credit", "").strip() else Decimal(0)
+    return credit - abs(debit)
+
+
+def _description(raw):
+    for column in DESCRIPTION_COLUMNS:
+        value = (raw.get(column) or "").strip()
+        if value:
+            return value
+    return ""
+
+
+def build_entry(user, ledger, raw):
+    """Validate one raw row and return an unsaved model instance."""
+    date = _parse_date(raw.get("date"))
+    amount = _signed_amount(raw)
+    if amount == 0:
+        raise RowError("Amount is zero.")
+    description = _description(raw)
+
+    if ledger == "transaction":
+        category = (raw.get("category") or "").strip().lower()
+        if category not in ("income", "expense"):
+            category = "income" if amount > 0 else "expense"
+        return Transaction(user=user, category=category, amount=float(abs(amount)),
+                           description=description, date=date)
+
+    if ledger == "expense":
+        category = (raw.get("category") or "").strip() or "Uncategorized"
+        return Expense(user=user, category=category[:255], amount=abs(amount).quantize(Decimal("0.01")),
+                       date=date, note=description[:255] or None)
+
+    source = (raw.get("source") or "").strip() or description or "Imported"
+    return Income(user=user, source=source[:255], amount=abs(amount).quantize(Decimal("0.01")),
+                  date=date, note=(description if description != source else "")[:255] or None)
+
+
+def _encrypt_batch(entries):
+    pending = [entry for entry in entries if entry.description]
+    for entry, enc in zip(pending, encrypt_many([entry.description for entry in pending])):
+        entry.description = enc
+
+
+def bulk_insert(model, batch):
+    """bulk_create ledger rows, doing what their post_save handlers would: encryption, totals, search index."""
+    plaintexts = None
+    if model is Transaction:
+        plaintexts = [entry.description for entry in batch]
+        _encrypt_batch(batch)
+    created = model.objects.bulk_create(batch, batch_size=BATCH_SIZE)
+    # bulk_create skips the post_save signal, so fold the rows in directly
+    apply_entries(created)
+    if model is Transaction:
+        index_transactions(created, plaintexts)
+    return created
+
+
+def import_statement(user, upload, ledger="transaction", statement_format=None, batch_size=BATCH_SIZE):
+    """
+    Import every valid row of `upload` into `ledger`.
+
+    Returns {"created": int, "errors": [{"row": n, "error": "..."}]}.
+    """
+    if ledger not in LEDGERS:
+        raise StatementError(f"'ledger' must be one of: {', '.join(LEDGERS)}.")
+    fmt = detect_format(upload, statement_format)
+    model = {"transaction": Transaction, "expense": Expense, "income": Income}[ledger]
+
+    stream = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+    rows = iter_ofx_rows(stream) if fmt == "ofx" else iter_csv_rows(stream)
+
+    created = 0
+    first_pk = None
+    errors = []
+    batch = []
+    try:
+        with db_transaction.atomic():
+            for number, raw in rows:
+                try:
+                    batch.append(build_entry(user, ledger, raw))
+                except RowError as e:
+                    errors.append({"row": number, "error": str(e)})
+                    continue
+                if len(batch) >= batch_size:
+                    inserted = bulk_insert(model, batch)
+                    first_pk = first_pk or inserted[0].pk
+                    created += len(inserted)
+                    batch = []
+            if batch:
+                inserted = bulk_insert(model, batch)
+                first_pk = first_pk or inserted[0].pk
+                created += len(inserted)
+            if created:
+                # derived state before the version bump (see core.versioning)
+                if ledger in FORECAST_SOURCES:
+                    rebuild_forecast_state(user.pk, ledger)
+                version = bump_data_version(user.pk)
+                # the transaction holds the write lock: every row of this user from first_pk on is ours
+                mark_changed(model.objects.filter(user=user, pk__gte=first_pk), version)
+    except UnicodeDecodeError:
+        raise StatementError("The file is not valid UTF-8 text.")
+    finally:
+        stream.detach()
+
+    return {"created": created, "errors": errors}
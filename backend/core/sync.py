@@ -0,0 +1,134 @@
+# core/sync.py
+"""
+Delta sync for offline-first clients.
+
+The sync token is the user's DataVersion (core.versioning), which every
+write and delete of a ledger row already bumps. Each row carries the
+version of its last write in `sync_version`, and every delete leaves a
+SyncTombstone (kind, object id, version). Both are stamped with the exact
+version that write bumped to, in the same transaction as the bump, while
+the DataVersion row is locked (core.versioning.version_bumped). So once a
+version is visible, every write at or below it is visible with its stamp.
+
+changes(since=T) reads the current version V first and returns rows with
+T < sync_version <= V plus tombstones in the same range, one indexed
+query per model, with V as the next token. A write that lands while the
+sync runs gets a version above V and is picked up by the next sync.
+
+Tombstones older than SYNC["TOMBSTONE_TTL_DAYS"] are purged
+(purge_tombstones, `manage.py purge_sync_tombstones`). The highest version
+purged for a user is kept as DataVersion.sync_horizon; a client whose
+token is older than that gets a full snapshot with "reset": true.
+"""
+
+import datetime
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models import F, Max, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import DataVersion, Expense, Goal, Income, SyncTombstone, Transaction
+from .serializers import ExpenseSerializer, GoalSerializer, IncomeSerializer, TransactionSerializer
+from .versioning import version_bumped
+
+DEFAULT_CONFIG = {
+    "TOMBSTONE_TTL_DAYS": 30,
+}
+
+# kind -> (model, serializer); kinds are also the response keys
+SYNC_MODELS = {
+    "transactions": (Transaction, TransactionSerializer),
+    "expenses": (Expense, ExpenseSerializer),
+    "income": (Income, IncomeSerializer),
+    "goals": (Goal, GoalSerializer),
+}
+_KINDS = {model: kind for kind, (model, _) in SYNC_MODELS.items()}
+
+
+class SyncError(ValueError):
+    pass
+
+
+def _config():
+    return {**DEFAULT_CONFIG, **getattr(settings, "SYNC", {})}
+
+
+def parse_token(raw):
+    if raw in (None, ""):
+        return 0
+    try:
+        token = int(raw)
+    except (TypeError, ValueError):
+        token = -1
+    if token < 0:
+        raise SyncError("'since' must be a token returned by a previous sync.")
+    return token
+
+
+def mark_changed(queryset, version):
+    """Stamp rows written without model signals (bulk paths) with the version their bump returned."""
+    return queryset.update(sync_version=version)
+
+
+def changes(user, since=0):
+    """Rows written and deleted after token `since`, per kind, plus the next token."""
+    # read first: every write up to this version is already visible with its stamp
+    version, horizon = DataVersion.objects.filter(user=user).values_list("version", "sync_horizon").first() or (0, 0)
+    reset = 0 < since < horizon
+    if reset:
+        since = 0
+
+    result = {}
+    for kind, (model, serializer_class) in SYNC_MODELS.items():
+        rows = model.objects.filter(user=user, sync_version__lte=version)
+        if since:
+            rows = rows.filter(sync_version__gt=since)
+        rows = rows.order_by("sync_version", "pk")
+        result[kind] = {"upserted": serializer_class(rows, many=True).data, "deleted": []}
+
+    if since:
+        tombstones = (
+            SyncTombstone.objects.filter(user_id=user.pk, version__gt=since, version__lte=version)
+            .order_by("version").values_list("kind", "object_id")
+        )
+        for kind, object_id in tombstones:
+            if kind in result:
+                result[kind]["deleted"].append(object_id)
+
+    return {"token": str(version), "reset": reset, "changes": result}
+
+
+def purge_tombstones(older_than_days=None, now=None):
+    """Delete expired tombstones, raising each user's sync horizon past them. Returns rows deleted."""
+    if older_than_days is None:
+        older_than_days = _config()["TOMBSTONE_TTL_DAYS"]
+    cutoff = (now or timezone.now()) - datetime.timedelta(days=older_than_days)
+    expired = SyncTombstone.objects.filter(deleted_at__lt=cutoff)
+
+    with db_transaction.atomic():
+        horizons = expired.order_by().values("user_id").annotate(horizon=Max("version"))
+        for row in horizons:
+            DataVersion.objects.filter(user_id=row["user_id"]).update(
+                sync_horizon=Greatest(F("sync_horizon"), Value(row["horizon"])),
+            )
+        deleted, _ = expired.delete()
+    return deleted
+
+
+# -------------------------
+# Signal handlers
+# -------------------------
+def _on_version_bumped(sender, instance, version, deleted, **kwargs):
+    if sender not in _KINDS:
+        return
+    if deleted:
+        SyncTombstone.objects.create(user_id=instance.user_id, kind=_KINDS[sender],
+                                     object_id=instance.pk, version=version)
+    else:
+        mark_changed(sender.objects.filter(pk=instance.pk), version)
+
+
+def connect_signals():
+    version_bumped.connect(_on_version_bumped, dispatch_uid="sync_version_bumped")
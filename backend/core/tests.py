@@ -1,3 +1,1431 @@
-from django.test import TestCase
+import asyncio
+import base64
+import datetime
+import io
+import json
+import re
+import threading
+import time
+import unittest
+from unittest import mock
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+import numpy as np
+from Crypto.Cipher import AES
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from asgiref.sync import sync_to_async
+from django.test import AsyncClient
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from ml.engine import FORECASTERS, forecast as run_model, select_model, select_models
+from ml.forecast_model import build_batch_forecast, build_lstm_model
+from ml.online import STATE_FIELDS, OnlineForecast
+from ml.series import load_daily_tail, load_tail, load_tail_matrix
+
+from .async_http import close_client
+from .chat_context import build_context, message_tokens
+from .chatbot import chatbot_reply, fact_snapshot, route
+from .chat_archive import archivable, unpack
+from . import fast_render
+from .serializers import ExpenseSerializer, IncomeSerializer, TransactionSerializer
+from .llm_cache import ReplyCache, get_reply_cache, normalize_prompt, reply_cache_key
+from .forecasting import LRUCache, expense_forecast, get_forecast_cache
+from .ledger import check_totals, get_summary
+from .search import search_transactions, tokens_for
+from .statements import iter_ofx_rows
+from .models import Transaction, Expense, Income, Goal, ChatMessage, LedgerTotal, KeyRotationCheckpoint, SearchToken, DataVersion, ForecastState, ForecastModelChoice, ChatSummary, ChatArchive, SyncTombstone, IdempotencyKey
+from .utils import _get_secret, decrypt_data, decrypt_many, encrypt_data, encrypt_many, key_id_of
+from .versioning import get_data_version
+
+
+class LedgerTotalsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("alice", password="secret123")
+
+    def test_create_and_delete_keep_totals_in_sync(self):
+        Transaction.objects.create(user=self.user, category="income", amount=1000)
+        spent = Transaction.objects.create(user=self.user, category="expense", amount=250.5)
+        Expense.objects.create(user=self.user, category="food", amount="40.25", date="2025-01-03")
+        Expense.objects.create(user=self.user, category="food", amount="9.75", date="2025-01-20")
+        Income.objects.create(user=self.user, source="salary", amount="3000", date="2025-01-01")
+
+        summary = get_summary(self.user)
+        self.assertEqual(summary.transaction_income, 1000)
+        self.assertEqual(summary.transaction_expense, 250.5)
+        self.assertEqual(summary.expense_total, 50)
+        self.assertEqual(summary.income_total, 3000)
+
+        food = LedgerTotal.objects.get(user=self.user, ledger="expense", category="food", month="2025-01")
+        self.assertEqual((food.total, food.count), (50, 2))
+
+        spent.delete()
+        self.assertEqual(get_summary(self.user).transaction_expense, 0)
+        self.assertEqual(check_totals(), [])
+
+    def test_update_moves_amount_between_buckets(self):
+        expense = Expense.objects.create(user=self.user, category="food", amount="10", date="2025-01-03")
+        expense.category = "rent"
+        expense.amount = "15"
+        expense.save()
+
+        self.assertFalse(LedgerTotal.objects.filter(category="food").exists())
+        self.assertEqual(LedgerTotal.objects.get(category="rent").total, 15)
+        self.assertEqual(get_summary(self.user).expense_total, 15)
+
+    def test_rebuild_command_repairs_drift(self):
+        Expense.objects.create(user=self.user, category="food", amount="10", date="2025-01-03")
+        # bypasses the signals, so the totals drift
+        Expense.objects.update(amount="99")
+
+        with self.assertRaises(CommandError):
+            call_command("rebuild_ledger_totals", "--check", stdout=StringIO(), stderr=StringIO())
+
+        call_command("rebuild_ledger_totals", stdout=StringIO())
+        self.assertEqual(get_summary(self.user).expense_total, 99)
+
+
+@unittest.skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN output is SQLite specific")
+class QueryPlanTests(TestCase):
+    """Every ledger read must be served by an index: no full scans, no temp sorts."""
+
+    FULL_SCAN = re.compile(r"^SCAN core_\w+")
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("bob", password="secret123")
+        other = User.objects.create_user("carol", password="secret123")
+        for owner in (cls.user, other):
+            for day in range(1, 10):
+                Transaction.objects.create(user=owner, category="expense", amount=day)
+                Expense.objects.create(user=owner, category="food", amount=day, date=f"2025-01-{day:02d}")
+                Income.objects.create(user=owner, source="salary", amount=day, date=f"2025-01-{day:02d}")
+                Goal.objects.create(user=owner, title="car", target_amount=day, deadline=f"2026-01-{day:02d}")
+                ChatMessage.objects.create(user=owner, message="hi", reply="hello")
+
+    def setUp(self):
+        get_forecast_cache().clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assert_indexed(self, queries):
+        checked = 0
+        for query in queries:
+            sql = query["sql"]
+            if not sql.startswith("SELECT") or "core_" not in sql:
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute("EXPLAIN QUERY PLAN " + sql)
+                plan = [row[-1] for row in cursor.fetchall()]
+            checked += 1
+            for step in plan:
+                self.assertIsNone(self.FULL_SCAN.match(step), f"full table scan in {plan} for {sql}")
+                self.assertNotIn("USE TEMP B-TREE FOR ORDER BY", step, f"unindexed sort in {plan} for {sql}")
+        self.assertGreater(checked, 0)
+
+    def assert_view_indexed(self, method, url, data=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(url, data, format="json")
+        self.assertLess(response.status_code, 500)
+        self.assert_indexed(ctx.captured_queries)
+
+    def test_list_endpoints(self):
+        for url in ["/api/transactions/", "/api/expenses/", "/api/income/", "/api/goals/"]:
+            with self.subTest(url=url):
+                self.assert_view_indexed("get", url)
+            page = self.client.get(url + "?limit=3").json()
+            with self.subTest(url=page["next"]):
+                self.assert_view_indexed("get", page["next"])
+
+    def test_forecast_endpoints(self):
+        for url in ["/api/forecast/", "/api/forecast-v2/", "/api/forecast/?bucket=daily", "/api/forecast-v2/?bucket=daily"]:
+            with self.subTest(url=url):
+                self.assert_view_indexed("get", url)
+
+    def test_score_and_chatbot(self):
+        self.assert_view_indexed("get", "/api/score/")
+        self.assert_view_indexed("post", "/api/chatbot/", {"message": "forecast please"})
+        self.assert_view_indexed("post", "/api/chatbot/", {"message": "my last transaction this month"})
+        self.assert_view_indexed("post", "/api/chatbot/", {"message": "how much is left?"})
+
+    def test_search(self):
+        self.assert_view_indexed("get", "/api/transactions/search/?q=rent")
+
+    def test_rollups(self):
+        self.assert_view_indexed("get", "/api/rollups/?start=2025-01-02&end=2025-01-05")
+
+    def test_dashboard(self):
+        self.assert_view_indexed("get", "/api/dashboard/")
+
+    def test_sync_changes(self):
+        Expense.objects.filter(user=self.user).first().delete()
+        self.assert_view_indexed("get", "/api/changes/?since=1")
+
+    @override_settings(LLM_CONTEXT={"MAX_TURNS": 4})
+    def test_chat_history(self):
+        # newest turns, then folding the older ones into the summary
+        with CaptureQueriesContext(connection) as ctx:
+            messages = build_context(self.user, "what now?")
+        self.assertEqual(messages[0]["role"], "system")
+        self.assertTrue(ChatSummary.objects.get(user=self.user).turns)
+        self.assert_indexed(ctx.captured_queries)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("dave", password="secret123")
+        for day in range(1, 8):
+            # two entries per day so pages have to break ties on id
+            Expense.objects.create(user=self.user, category="food", amount=day, date=f"2025-01-{day:02d}")
+            Expense.objects.create(user=self.user, category="rent", amount=day, date=f"2025-01-{day:02d}")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_walks_every_row_once_in_order(self):
+        seen = []
+        url = "/api/expenses/?limit=3"
+        while url:
+            data = self.client.get(url).json()
+            self.assertLessEqual(len(data["results"]), 3)
+            seen.extend((row["date"], row["id"]) for row in data["results"])
+            url = data["next"]
+        self.assertEqual(len(seen), 14)
+        self.assertEqual(seen, sorted(seen, reverse=True))
+
+    def test_unpaginated_request_keeps_plain_list(self):
+        data = self.client.get("/api/expenses/").json()
+        self.assertIsInstance(data, list)
+        self.assertEqual(len(data), 14)
+
+    def test_fields_projection(self):
+        data = self.client.get("/api/expenses/?limit=2&fields=id,amount").json()
+        self.assertEqual([set(row) for row in data["results"]], [{"id", "amount"}] * 2)
+        self.assertEqual(self.client.get("/api/expenses/?fields=bogus").status_code, 400)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get("/api/expenses/?cursor=nonsense").status_code, 404)
+
+
+@override_settings(AES_SECRET="test-secret")
+class ExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("erin", password="secret123")
+        Transaction.objects.create(user=self.user, category="expense", amount=12.5, description=encrypt_data("Netflix"))
+        Transaction.objects.create(user=self.user, category="income", amount=900, description="plain text")
+        Expense.objects.create(user=self.user, category="food", amount="4.20", date="2025-02-01", note="lunch")
+        Expense.objects.create(user=self.user, category="rent", amount="800", date="2025-03-01")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def read(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv_decrypts_descriptions(self):
+        lines = self.read("/api/export/").splitlines()
+        self.assertEqual(lines[0], "Date,Category,Amount,Description")
+        self.assertTrue(lines[1].endswith(",expense,12.5,Netflix"))
+        self.assertTrue(lines[2].endswith(",income,900.0,plain text"))
+
+    def test_ndjson_with_filters(self):
+        body = self.read("/api/export/?ledger=expense&output=ndjson&start=2025-02-15")
+        self.assertEqual(
+            [json.loads(line) for line in body.splitlines()],
+            [{"date": "2025-03-01", "category": "rent", "amount": "800.00", "note": ""}],
+        )
+        body = self.read("/api/export/?ledger=expense&category=food")
+        self.assertEqual(body.splitlines()[1:], ["2025-02-01,food,4.20,lunch"])
+
+    def test_bad_params(self):
+        self.assertEqual(self.client.get("/api/export/?ledger=budget").status_code, 400)
+        self.assertEqual(self.client.get("/api/export/?start=yesterday").status_code, 400)
+
+
+@override_settings(AES_SECRET="test-secret")
+class StatementImportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("frank", password="secret123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, name, content, **fields):
+        return self.client.post(
+            "/api/import/",
+            {"file": SimpleUploadedFile(name, content.encode()), **fields},
+            format="multipart",
+        )
+
+    def test_csv_import_with_error_report(self):
+        content = (
+            "Date,Description,Amount\n"
+            "2025-01-02,Salary,\"50,000.00\"\n"
+            "03/01/2025,Netflix,-649\n"
+            "not a date,Broken,10\n"
+            "2025-01-04,Nothing,0\n"
+        )
+        response = self.upload("bank.csv", content)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual([e["row"] for e in response.data["errors"]], [4, 5])
+
+        netflix = Transaction.objects.get(category="expense")
+        self.assertEqual((netflix.amount, str(netflix.date)), (649.0, "2025-01-03"))
+        self.assertEqual(decrypt_data(netflix.description), "Netflix")
+        self.assertEqual(get_summary(self.user).transaction_income, 50000)
+
+    def test_ofx_import_into_expenses(self):
+        content = (
+            "OFXHEADER:100\n<OFX><BANKTRANLIST>\n"
+            "<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20250105120000<TRNAMT>-120.50<NAME>Grocer</STMTTRN>\n"
+            "<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20250106<TRNAMT>-30<NAME>Cafe</STMTTRN>\n"
+            "</BANKTRANLIST></OFX>\n"
+        )
+        response = self.upload("bank.ofx", content, ledger="expense")
+        self.assertEqual(response.data, {"created": 2, "errors": []})
+        self.assertEqual(
+            list(Expense.objects.order_by("date").values_list("note", "amount")),
+            [("Grocer", Decimal("120.50")), ("Cafe", Decimal("30.00"))],
+        )
+        self.assertEqual(check_totals(), [])
+
+    def test_ofx_blocks_split_across_reads(self):
+        content = "<OFX>" + "".join(
+            f"<stmttrn><DTPOSTED>2025010{n}<TRNAMT>-{n}<NAME>Shop {n}</StmtTrn>\n" for n in range(1, 6)
+        )
+        for read_size in (3, 17, 64 * 1024):
+            rows = list(iter_ofx_rows(io.StringIO(content), read_size=read_size))
+            self.assertEqual([(n, raw["description"]) for n, raw in rows], [(n, f"Shop {n}") for n in range(1, 6)])
+
+    def test_rejects_bad_header(self):
+        response = self.upload("bank.csv", "when,what\n2025-01-01,x\n")
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(AES_SECRET="test-secret")
+class BatchCryptoTests(TestCase):
+    VALUES = ["", "a", "x" * 16, "Netflix subscription ₹649", "rent " * 40]
+
+    def test_matches_pycryptodome_eax(self):
+        for value, enc in zip(self.VALUES, encrypt_many(self.VALUES)):
+            data = base64.b64decode(enc)
+            cipher = AES.new(_get_secret(), AES.MODE_EAX, data[:16])
+            self.assertEqual(cipher.decrypt_and_verify(data[32:], data[16:32]).decode(), value)
+
+        legacy = []
+        for value in self.VALUES:
+            cipher = AES.new(_get_secret(), AES.MODE_EAX)
+            ciphertext, tag = cipher.encrypt_and_digest(value.encode())
+            legacy.append(base64.b64encode(cipher.nonce + tag + ciphertext).decode())
+        self.assertEqual(decrypt_many(legacy), ["", *self.VALUES[1:]])
+
+    def test_tampering_and_lenient_mode(self):
+        enc = encrypt_data("salary")
+        tampered = base64.b64encode(base64.b64decode(enc)[:-1] + b"!").decode()
+        with self.assertRaises(ValueError):
+            decrypt_data(tampered)
+        self.assertEqual(decrypt_many([enc, "not encrypted"], strict=False), ["salary", "not encrypted"])
+
+    def test_missing_key_is_not_swallowed(self):
+        enc = encrypt_data("salary")
+        with self.settings(AES_SECRET=None):
+            with self.assertRaises(RuntimeError):
+                decrypt_many([enc], strict=False)
+
+    def test_list_serializer_decrypts_page(self):
+        user = User.objects.create_user("gina", password="secret123")
+        Transaction.objects.create(user=user, category="expense", amount=5, description=encrypt_data("coffee"))
+        Transaction.objects.create(user=user, category="expense", amount=6, description="legacy plain")
+        client = APIClient()
+        client.force_authenticate(user)
+        rows = client.get("/api/transactions/").json()
+        self.assertEqual(sorted(row["description"] for row in rows), ["coffee", "legacy plain"])
+
+
+class KeyRotationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("hank", password="secret123")
+        with self.settings(AES_SECRET="old-secret"):
+            for i in range(7):
+                Transaction.objects.create(user=self.user, category="expense", amount=i, description=encrypt_data(f"row {i}"))
+            Transaction.objects.create(user=self.user, category="expense", amount=1, description="never encrypted")
+
+    def descriptions(self):
+        return list(Transaction.objects.order_by("pk").values_list("description", flat=True))
+
+    def test_old_and_new_keys_decrypt_side_by_side(self):
+        with self.settings(AES_SECRET="old-secret", AES_KEYS={"k2": "new-secret"}, AES_ACTIVE_KEY="k2"):
+            fresh = encrypt_data("fresh")
+            self.assertEqual(key_id_of(fresh), "k2")
+            self.assertEqual(decrypt_many([self.descriptions()[0], fresh]), ["row 0", "fresh"])
+        with self.settings(AES_SECRET="old-secret", AES_KEYS={}, AES_ACTIVE_KEY=None):
+            with self.assertRaises(ValueError):
+                decrypt_data(fresh)
+
+    def test_resumable_reencryption(self):
+        keys = {"AES_SECRET": "old-secret", "AES_KEYS": {"k2": "new-secret"}, "AES_ACTIVE_KEY": "k2"}
+        with self.settings(**keys):
+            call_command("reencrypt_fields", "--chunk-size", "3", "--max-chunks", "1", stdout=StringIO())
+            self.assertEqual([key_id_of(d) for d in self.descriptions()[:4]], ["k2", "k2", "k2", None])
+            self.assertFalse(KeyRotationCheckpoint.objects.get().finished)
+
+            call_command("reencrypt_fields", "--chunk-size", "3", stdout=StringIO())
+            checkpoint = KeyRotationCheckpoint.objects.get()
+            self.assertTrue(checkpoint.finished)
+            self.assertEqual(checkpoint.rows_rewritten, 7)
+
+        # the old secret is no longer needed
+        with self.settings(AES_SECRET=None, AES_KEYS={"k2": "new-secret"}, AES_ACTIVE_KEY="k2"):
+            self.assertEqual(
+                decrypt_many(self.descriptions(), strict=False),
+                [f"row {i}" for i in range(7)] + ["never encrypted"],
+            )
+
+
+@override_settings(AES_SECRET="test-secret")
+class BlindIndexSearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("iris", password="secret123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for desc in ["Rent for March", "NETFLIX.COM monthly", "Groceries", "rent deposit refund"]:
+            self.client.post("/api/transactions/", {"category": "expense", "amount": 10, "description": desc})
+
+    def search(self, q):
+        response = self.client.get("/api/transactions/search/", {"q": q})
+        self.assertEqual(response.status_code, 200)
+        return sorted(row["description"] for row in response.json())
+
+    def test_word_search(self):
+        self.assertEqual(self.search("rent"), ["Rent for March", "rent deposit refund"])
+        self.assertEqual(self.search("netflix"), ["NETFLIX.COM monthly"])
+        self.assertEqual(self.search("rent march"), ["Rent for March"])
+        self.assertEqual(self.search("mortgage"), [])
+
+    def test_tokens_are_per_user_and_opaque(self):
+        other = User.objects.create_user("jack", password="secret123")
+        self.assertNotEqual(tokens_for(self.user.pk, "rent"), tokens_for(other.pk, "rent"))
+        self.assertFalse(SearchToken.objects.filter(token__icontains="rent").exists())
+
+    def test_search_is_scoped_to_user_and_rebuildable(self):
+        other = User.objects.create_user("jack", password="secret123")
+        Transaction.objects.create(user=other, category="expense", amount=1, description=encrypt_data("rent"))
+        self.assertEqual(len(self.search("rent")), 2)
+
+        SearchToken.objects.all().delete()
+        call_command("rebuild_search_index", stdout=StringIO())
+        self.assertEqual(len(self.search("rent")), 2)
+
+
+class ForecastCacheTests(TestCase):
+    def setUp(self):
+        get_forecast_cache().clear()
+        self.user = User.objects.create_user("kate", password="secret123")
+        for day in range(1, 9):
+            Expense.objects.create(user=self.user, category="food", amount=day * 10, date=f"2025-01-{day:02d}")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_repeat_request_is_a_cache_hit(self):
+        first = self.client.get("/api/forecast-v2/").json()
+        with CaptureQueriesContext(connection) as ctx:
+            second = self.client.get("/api/forecast-v2/").json()
+        self.assertEqual(first, second)
+        self.assertFalse([q for q in ctx.captured_queries if "core_expense" in q["sql"]])
+
+    def test_writes_and_deletes_invalidate(self):
+        before = self.client.get("/api/forecast-v2/").json()["next_7_days"]
+        expense = Expense.objects.create(user=self.user, category="food", amount=5000, date="2025-01-09")
+        bumped = self.client.get("/api/forecast-v2/").json()["next_7_days"]
+        self.assertNotEqual(before, bumped)
+
+        version = DataVersion.objects.get(user=self.user).version
+        expense.delete()
+        self.assertEqual(DataVersion.objects.get(user=self.user).version, version + 1)
+        self.assertEqual(self.client.get("/api/forecast-v2/").json()["next_7_days"], before)
+
+    def test_forecast_state_is_updated_before_the_version_bump(self):
+        from . import forecasting
+
+        version = DataVersion.objects.get(user=self.user).version
+        seen = []
+        push = forecasting._push
+
+        def record(*args):
+            seen.append(DataVersion.objects.get(user=self.user).version)
+            return push(*args)
+
+        with mock.patch.object(forecasting, "_push", side_effect=record):
+            Expense.objects.create(user=self.user, category="food", amount=5, date="2025-01-09")
+        self.assertEqual(seen, [version])
+        self.assertEqual(DataVersion.objects.get(user=self.user).version, version + 1)
+
+    def test_lru_eviction_and_ttl(self):
+        cache = LRUCache(max_entries=2, ttl=0.05)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual((cache.get("a"), cache.get("b"), cache.get("c")), (1, None, 3))
+        time.sleep(0.06)
+        self.assertIsNone(cache.get("a"))
+
+    @override_settings(FORECAST_CACHE={"BACKEND": "django"})
+    def test_django_cache_backend(self):
+        first = self.client.get("/api/forecast-v2/").json()
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get("/api/forecast-v2/").json(), first)
+        self.assertFalse([q for q in ctx.captured_queries if "core_expense" in q["sql"]])
+
+
+class SeriesLoaderTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("liam", password="secret123")
+        for day in range(1, 29):
+            for amount in (day, 100):
+                Expense.objects.create(user=self.user, category="food", amount=amount, date=f"2025-02-{day:02d}")
+        self.qs = Expense.objects.filter(user=self.user)
+
+    def test_tail_window_only(self):
+        with CaptureQueriesContext(connection) as ctx:
+            series = load_tail(self.qs, window=30)
+        self.assertIn("LIMIT 30", ctx.captured_queries[0]["sql"])
+        full = [float(a) for a in self.qs.order_by("date", "id").values_list("amount", flat=True)]
+        self.assertEqual(list(series), full[-30:])
+        self.assertEqual(build_lstm_model(series), build_lstm_model(full))
+
+    def test_daily_buckets(self):
+        series = load_daily_tail(self.qs, window=5)
+        self.assertEqual(list(series), [124.0, 125.0, 126.0, 127.0, 128.0])
+
+
+class BatchForecastTests(TestCase):
+    def test_matches_per_user_model(self):
+        rng = np.random.default_rng(7)
+        series = [list(rng.gamma(2, 50, size=n)) for n in [3, 7, 8, 15, 30, 45]]
+        series.append([100.0] * 10)
+        matrix = np.full((len(series), 30), np.nan)
+        for i, values in enumerate(series):
+            tail = values[-30:]
+            matrix[i, 30 - len(tail):] = tail
+
+        out = build_batch_forecast(matrix)
+        self.assertTrue(np.isnan(out[0]).all())
+        for values, row in zip(series[1:], out[1:]):
+            np.testing.assert_allclose(row, build_lstm_model(values), atol=0.011)
+
+    @override_settings(FORECAST_CACHE={"BACKEND": "django"})
+    def test_precompute_fills_cache(self):
+        get_forecast_cache().clear()
+        users = [User.objects.create_user(f"user{i}", password="secret123") for i in range(3)]
+        for i, user in enumerate(users):
+            for day in range(1, 6 + i * 3):
+                Expense.objects.create(user=user, category="food", amount=day * (i + 1), date=f"2025-03-{day:02d}")
+
+        ids, matrix = load_tail_matrix(Expense.objects.all(), window=30)
+        self.assertEqual(sorted(ids), [u.pk for u in users])
+
+        call_command("precompute_forecasts", "--kind", "expense", stdout=StringIO())
+        with CaptureQueriesContext(connection) as ctx:
+            results = [expense_forecast(user) for user in users]
+        self.assertFalse([q for q in ctx.captured_queries if "core_expense" in q["sql"]])
+        self.assertIsNone(results[0])
+        for user, result in zip(users[1:], results[1:]):
+            values = Expense.objects.filter(user=user).order_by("date").values_list("amount", flat=True)
+            np.testing.assert_allclose(result, build_lstm_model([float(v) for v in values]), atol=0.011)
+
+
+class IncrementalForecastTests(TestCase):
+    def setUp(self):
+        get_forecast_cache().clear()
+        self.user = User.objects.create_user("mona", password="secret123")
+
+    def series(self):
+        values = Expense.objects.filter(user=self.user).order_by("date", "id").values_list("amount", flat=True)
+        return [float(v) for v in values]
+
+    def state_forecast(self):
+        state = ForecastState.objects.get(user=self.user, kind="expense")
+        return OnlineForecast(**{name: getattr(state, name) for name in STATE_FIELDS}).predict()
+
+    def test_matches_batch_implementation(self):
+        rng = np.random.default_rng(11)
+        values = list(rng.gamma(2, 50, size=2500)) + [100.0] * 40
+        online = OnlineForecast()
+        for i, value in enumerate(values):
+            online.push(value)
+            if i < 6:
+                self.assertIsNone(online.predict())
+            elif i % 7 == 0 or i > len(values) - 45:
+                np.testing.assert_allclose(online.predict(), build_lstm_model(values[:i + 1]), atol=0.011)
+        matrix = np.array([values[-30:]])
+        np.testing.assert_allclose(online.predict(), build_batch_forecast(matrix)[0], atol=0.011)
+
+    def test_signals_keep_state_consistent(self):
+        for day in range(1, 21):
+            Expense.objects.create(user=self.user, category="food", amount=day * 3 + day % 4, date=f"2025-04-{day:02d}")
+        np.testing.assert_allclose(self.state_forecast(), build_lstm_model(self.series()), atol=0.011)
+
+        # an in-order write is folded in without reading the series
+        with CaptureQueriesContext(connection) as ctx:
+            Expense.objects.create(user=self.user, category="food", amount=400, date="2025-04-21")
+        self.assertFalse([q for q in ctx.captured_queries if "FROM \"core_expense\"" in q["sql"]])
+        np.testing.assert_allclose(self.state_forecast(), build_lstm_model(self.series()), atol=0.011)
+
+        # backdated insert, update and delete fall back to a rebuild
+        Expense.objects.create(user=self.user, category="food", amount=900, date="2025-04-10")
+        np.testing.assert_allclose(self.state_forecast(), build_lstm_model(self.series()), atol=0.011)
+        latest = Expense.objects.filter(user=self.user).latest("date")
+        latest.amount = 5
+        latest.save()
+        np.testing.assert_allclose(self.state_forecast(), build_lstm_model(self.series()), atol=0.011)
+        latest.delete()
+        np.testing.assert_allclose(self.state_forecast(), build_lstm_model(self.series()), atol=0.011)
+        self.assertEqual(expense_forecast(self.user), self.state_forecast())
+
+    def test_short_series_and_missing_state(self):
+        for day in range(1, 8):
+            Expense.objects.create(user=self.user, category="food", amount=day, date=f"2025-05-{day:02d}")
+        ForecastState.objects.all().delete()
+        self.assertEqual(expense_forecast(self.user), build_lstm_model(self.series()))
+        self.assertTrue(ForecastState.objects.filter(user=self.user, kind="expense").exists())
+
+        Expense.objects.filter(user=self.user).first().delete()
+        self.assertIsNone(expense_forecast(self.user))
+
+
+class ForecastEngineTests(TestCase):
+    # strong weekend spikes: a weekly pattern the blend can't follow
+    WEEKLY = [100 + 80 * (d % 7 == 5) + 60 * (d % 7 == 6) + d % 3 for d in range(90)]
+
+    def test_registry_models(self):
+        self.assertEqual(set(FORECASTERS), {"blend", "ses", "holt_winters", "seasonal_naive"})
+        for name, forecaster in FORECASTERS.items():
+            preds = forecaster.predict(self.WEEKLY[-forecaster.window:])
+            self.assertEqual(len(preds), 7, name)
+            self.assertTrue(all(p >= 0 for p in preds), name)
+        self.assertEqual(run_model("seasonal_naive", self.WEEKLY), [float(v) for v in self.WEEKLY[-7:]])
+        self.assertEqual(run_model("holt_winters", self.WEEKLY[:10]), build_lstm_model(self.WEEKLY[:10]))
+        self.assertIsNone(run_model("ses", self.WEEKLY[:6]))
+
+    def test_rolling_origin_selection(self):
+        name, errors = select_model(self.WEEKLY)
+        self.assertIn(name, {"holt_winters", "seasonal_naive"})
+        self.assertLess(errors[name], errors["blend"])
+        self.assertEqual(select_model(self.WEEKLY[:20]), ("blend", {}))
+
+        rng = np.random.default_rng(3)
+        items = [(i, list(rng.gamma(2, 50, size=60))) for i in range(6)] + [("weekly", self.WEEKLY)]
+        serial = list(select_models(items, max_workers=1))
+        self.assertEqual(list(select_models(items, max_workers=2, chunksize=2)), serial)
+
+    def test_command_stores_choice_and_forecast_uses_it(self):
+        get_forecast_cache().clear()
+        user = User.objects.create_user("nina", password="secret123")
+        start = datetime.date(2025, 1, 6)
+        Expense.objects.bulk_create([
+            Expense(user=user, category="food", amount=amount, date=start + datetime.timedelta(days=d))
+            for d, amount in enumerate(self.WEEKLY)
+        ])
+        before = expense_forecast(user)
+        version = get_data_version(user)
+
+        call_command("select_forecast_models", "--kind", "expense", "--workers", "1", stdout=StringIO())
+        choice = ForecastModelChoice.objects.get(user=user, kind="expense")
+        self.assertIn(choice.model, {"holt_winters", "seasonal_naive"})
+        self.assertLess(choice.error, choice.baseline_error)
+        self.assertEqual(get_data_version(user), version + 1)
+
+        after = expense_forecast(user)
+        self.assertNotEqual(after, before)
+        self.assertEqual(after, run_model(choice.model, self.WEEKLY))
+
+        # unchanged choice: no bump
+        call_command("select_forecast_models", "--kind", "expense", "--workers", "1", stdout=StringIO())
+        self.assertEqual(get_data_version(user), version + 1)
+
+        # one entry per day: the daily series is the same
+        call_command("select_forecast_models", "--kind", "expense:daily", "--workers", "1", stdout=StringIO())
+        self.assertEqual(ForecastModelChoice.objects.get(user=user, kind="expense:daily").model, choice.model)
+        self.assertEqual(expense_forecast(user, daily=True), after)
+
+
+class StartupImportTests(TestCase):
+    def test_heavy_modules_stay_lazy(self):
+        out = StringIO()
+        call_command("bench_startup", "--repeat", "1", "--check-budget-ms", "60000",
+                     "--worker-budget-ms", "60000", stdout=out)
+        self.assertIn("worker:", out.getvalue())
+
+    def test_lazy_views_resolve(self):
+        client = APIClient()
+        self.assertEqual(client.post("/api/token/", {"username": "x", "password": "y"}).status_code, 401)
+        self.assertEqual(client.get("/api/forecast-v2/").status_code, 401)
+
+
+class StubOpenRouter:
+    """Local stand-in for the OpenRouter API: keep-alive HTTP/1.1, chunked SSE replies."""
+
+    def __init__(self, tokens=("Hel", "lo"), status=200, stall=0):
+        self.tokens, self.status, self.stall = tokens, status, stall
+        self.connections = 0
+        self.requests = []
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        self.url = f"http://127.0.0.1:{self.server.sockets[0].getsockname()[1]}/api/v1/chat/completions"
+        return self
+
+    async def __aexit__(self, *exc):
+        await close_client()
+        self.server.close()
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while request_line := await reader.readline():
+                headers = {}
+                while (line := (await reader.readline()).decode().strip()):
+                    name, _, value = line.partition(":")
+                    headers[name.lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                self.requests.append((request_line.decode(), headers, json.loads(body)))
+                await asyncio.sleep(self.stall)
+
+                if self.status != 200:
+                    payload = json.dumps({"error": {"message": "Invalid API key"}}).encode()
+                    writer.write(f"HTTP/1.1 {self.status} Error\r\nContent-Length: {len(payload)}\r\n\r\n".encode() + payload)
+                    continue
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nTransfer-Encoding: chunked\r\n\r\n")
+                events = [": OPENROUTER PROCESSING\n\n"]
+                events += [f"data: {json.dumps({'choices': [{'delta': {'content': t}}]})}\n\n" for t in self.tokens]
+                events.append("data: [DONE]\n\n")
+                for event in events:
+                    data = event.encode()
+                    writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                    await writer.drain()
+                writer.write(b"0\r\n\r\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # CancelledError: the test's event loop shut down with the connection still open
+            pass
+        finally:
+            writer.close()
+
+
+@mock.patch.dict("os.environ", {"OPENROUTER_API_KEY": "test-key"})
+class LLMStreamTests(TestCase):
+    def setUp(self):
+        self.auth = self.make_user("omar")
+        self.user = User.objects.get(username="omar")
+        get_reply_cache().clear()
+
+    def make_user(self, name):
+        user = User.objects.create_user(name, password="secret123")
+        ChatMessage.objects.create(user=user, message="hi", reply="hello", source="local")
+        return {"Authorization": f"Bearer {RefreshToken.for_user(user).access_token}"}
+
+    async def chat(self, message="how am I doing?", auth=None):
+        response = await AsyncClient().post("/api/chatbot/llm/stream/", {"message": message},
+                                            content_type="application/json", headers=auth or self.auth)
+        if response.status_code != 200:
+            return response, []
+        body = b"".join([chunk async for chunk in response.streaming_content]).decode()
+        events = []
+        for frame in body.strip().split("\n\n"):
+            fields = dict(line.split(": ", 1) for line in frame.splitlines())
+            events.append((fields.get("event", "message"), json.loads(fields["data"])))
+        return response, events
+
+    async def test_streams_tokens_and_reuses_connection(self):
+        async with StubOpenRouter(tokens=("Your ", "savings ", "look good.")) as stub:
+            with self.settings(OPENROUTER_URL=stub.url):
+                response, events = await self.chat()
+                _, again = await self.chat("and now?")
+
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertEqual([data["token"] for kind, data in events[:-1]], ["Your ", "savings ", "look good."])
+        self.assertEqual(events[-1][0], "done")
+        self.assertEqual(events[-1][1]["reply"], "Your savings look good.")
+        self.assertEqual(again[-1][0], "done")
+        self.assertEqual(stub.connections, 1)
+
+        _, headers, payload = stub.requests[0]
+        self.assertEqual(headers["authorization"], "Bearer test-key")
+        self.assertTrue(payload["stream"])
+        self.assertEqual(payload["messages"][:2], [{"role": "user", "content": "hi"},
+                                                   {"role": "assistant", "content": "hello"}])
+        self.assertEqual(await ChatMessage.objects.filter(user=self.user, source="openrouter").acount(), 2)
+
+    async def test_read_timeout_and_upstream_errors(self):
+        async with StubOpenRouter(stall=1) as stub:
+            with self.settings(OPENROUTER_URL=stub.url, LLM_HTTP={"READ_TIMEOUT": 0.2}):
+                _, events = await self.chat()
+        self.assertEqual(events[0][0], "error")
+        self.assertIn("upstream", events[0][1]["detail"])
+
+        async with StubOpenRouter(status=401) as stub:
+            with self.settings(OPENROUTER_URL=stub.url):
+                _, events = await self.chat()
+        self.assertEqual(events, [("error", {"detail": "Invalid API key"})])
+        self.assertFalse(await ChatMessage.objects.filter(source="openrouter").aexists())
+
+    async def test_auth_and_validation(self):
+        response = await AsyncClient().post("/api/chatbot/llm/stream/", {"message": "hi"},
+                                            content_type="application/json")
+        self.assertEqual(response.status_code, 401)
+        response, _ = await self.chat("   ")
+        self.assertEqual(response.status_code, 400)
+
+    async def test_concurrent_identical_requests_share_one_call(self):
+        async with StubOpenRouter(tokens=("Spent ", "₹120."), stall=0.3) as stub:
+            with self.settings(OPENROUTER_URL=stub.url):
+                results = await asyncio.gather(self.chat("How much did I spend?"), self.chat("how much did i spend"))
+                # same history and prompt from another user: a cache hit
+                other = await sync_to_async(self.make_user)("pete")
+                _, cached = await self.chat("How much did I spend", auth=other)
+
+        self.assertEqual(len(stub.requests), 1)
+        for events in [results[0][1], results[1][1], cached]:
+            self.assertEqual(events[-1][1]["reply"], "Spent ₹120.")
+        self.assertEqual(cached[0], ("message", {"token": "Spent ₹120."}))
+        metrics = get_reply_cache().metrics()
+        self.assertEqual((metrics["hits"], metrics["coalesced"], metrics["upstream"]), (1, 1, 1))
+
+
+class LLMReplyCacheTests(TestCase):
+    def setUp(self):
+        get_reply_cache().clear()
+
+    def test_prompt_normalization(self):
+        self.assertEqual(normalize_prompt("  How much   did I SPEND?? "), "how much did i spend")
+
+    def test_coalesces_concurrent_fetches(self):
+        cache = ReplyCache(max_entries=10, ttl=60)
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            time.sleep(0.2)
+            return "reply"
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_fetch("k", fetch))) for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual((len(calls), results), (1, ["reply"] * 5))
+        self.assertEqual(cache.get_or_fetch("k", fetch), "reply")
+        metrics = cache.metrics()
+        self.assertEqual((metrics["hits"], metrics["coalesced"], metrics["upstream"]), (1, 4, 1))
+
+        # errors reach every waiter and are not cached
+        with self.assertRaises(ValueError):
+            cache.get_or_fetch("bad", lambda: (_ for _ in ()).throw(ValueError("boom")))
+        self.assertEqual(cache.get_or_fetch("bad", lambda: "ok"), "ok")
+
+    def test_key_depends_on_recent_turns_only(self):
+        def chat(*turns, summary=None):
+            messages = [{"role": "system", "content": summary}] if summary else []
+            for question, answer in turns:
+                messages += [{"role": "user", "content": question}, {"role": "assistant", "content": answer}]
+            return messages + [{"role": "user", "content": "How much did I spend?"}]
+
+        latest = ("hi", "hello")
+        key = reply_cache_key("m", chat(("rent?", "₹9000"), latest), 1)
+        # older turns and the rolling summary don't split the user's own entries
+        self.assertEqual(reply_cache_key("m", chat(("salary?", "₹50000"), latest, summary="Q: x -> A: y"), 1), key)
+        self.assertNotEqual(reply_cache_key("m", chat(("rent?", "₹9000"), ("HI", "hey")), 1), key)
+        # the reply may use that older history: not shared with other users
+        self.assertNotEqual(reply_cache_key("m", chat(("rent?", "₹9000"), latest), 2), key)
+        # nothing beyond the fingerprint: shared
+        self.assertEqual(reply_cache_key("m", chat(latest), 1), reply_cache_key("m", chat(latest), 2))
+        with self.settings(LLM_CACHE={"CONTEXT_TURNS": 0}):
+            self.assertEqual(reply_cache_key("m", chat(("rent?", "₹9000"), latest), 1),
+                             reply_cache_key("m", chat(("HI", "hey")), 1))
+
+    def test_leader_double_check_is_not_counted_upstream(self):
+        cache = ReplyCache(max_entries=10, ttl=60)
+        self.assertIsNone(cache.get("k"))
+        cache.replies.set("k", "reply")
+        future, leader = cache.claim("k")
+        self.assertEqual((leader, future.result()), (False, "reply"))
+        self.assertEqual(cache.metrics()["upstream"], 0)
+
+    @mock.patch.dict("os.environ", {"OPENROUTER_API_KEY": "test-key"})
+    def test_sync_view_serves_repeats_from_cache(self):
+        upstream = mock.Mock()
+        upstream.return_value.json.return_value = {"choices": [{"message": {"content": "You spent ₹50."}}]}
+        admin = User.objects.create_superuser("root", password="secret123")
+        client = APIClient()
+        with mock.patch("requests.post", upstream):
+            for name, prompt in [("pia", "How much did I spend?"), ("quin", "how much did I spend")]:
+                client.force_authenticate(User.objects.create_user(name, password="secret123"))
+                response = client.post("/api/chatbot/llm/", {"message": prompt}, format="json")
+                self.assertEqual(response.json()["reply"], "You spent ₹50.")
+        self.assertEqual(upstream.call_count, 1)
+        self.assertEqual(upstream.call_args.kwargs["timeout"], (5.0, 60.0))
+
+        client.force_authenticate(admin)
+        self.assertEqual(client.get("/api/chatbot/llm/stats/").json()["hits"], 1)
+
+    @mock.patch.dict("os.environ", {"OPENROUTER_API_KEY": "test-key"})
+    def test_sync_view_hides_upstream_errors(self):
+        upstream = mock.Mock()
+        upstream.return_value.json.return_value = {"error": "Invalid API key sk-or-123"}
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user("rex", password="secret123"))
+        with mock.patch("requests.post", upstream), self.assertLogs("core.views", "ERROR") as logs:
+            response = client.post("/api/chatbot/llm/", {"message": "hello?"}, format="json")
+        self.assertEqual(response.status_code, 500)
+        self.assertNotIn("sk-or-123", response.content.decode())
+        self.assertIn("sk-or-123", "\n".join(logs.output))
+
+
+@override_settings(LLM_CONTEXT={"TOKEN_BUDGET": 600, "MAX_TURNS": 6, "MAX_TURN_TOKENS": 60, "SUMMARY_TOKENS": 120})
+class ChatContextTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("rhea", password="secret123")
+
+    def say(self, n, reply_words=10):
+        return ChatMessage.objects.create(user=self.user, message=f"question {n}?",
+                                          reply=f"Answer {n}. " + "detail " * reply_words, source="local")
+
+    def test_stays_within_budget_and_summarizes_older_turns(self):
+        for n in range(10):
+            self.say(n, reply_words=200)
+        messages = build_context(self.user, "what now?")
+
+        self.assertLessEqual(sum(message_tokens(m) for m in messages), 600)
+        self.assertEqual(messages[0]["role"], "system")
+        self.assertEqual(messages[-1], {"role": "user", "content": "what now?"})
+        kept = [m["content"] for m in messages[1:-1] if m["role"] == "user"]
+        self.assertEqual(kept, [f"question {n}?" for n in range(10 - len(kept), 10)])
+        # every turn is either sent or summarized; the summary keeps the newest folded ones
+        summary = ChatSummary.objects.get(user=self.user)
+        self.assertEqual(summary.turns, 10 - len(kept))
+        self.assertIn(f"Q: question {9 - len(kept)}? -> A: Answer {9 - len(kept)}.", summary.summary)
+        self.assertLessEqual(len(summary.summary) / 4, 120)
+
+    def test_summary_is_updated_incrementally(self):
+        for n in range(8):
+            self.say(n)
+        build_context(self.user, "hi")
+        summary = ChatSummary.objects.get(user=self.user)
+        self.assertEqual(summary.turns, 2)
+
+        ChatSummary.objects.filter(pk=summary.pk).update(summary="- earlier note")
+        self.say(8)
+        with CaptureQueriesContext(connection) as ctx:
+            messages = build_context(self.user, "hi")
+        self.assertEqual(messages[0]["content"].splitlines()[1:], ["- earlier note", "- Q: question 2? -> A: Answer 2."])
+        self.assertEqual(ChatSummary.objects.get(pk=summary.pk).turns, 3)
+        self.assertLessEqual(len(ctx.captured_queries), 4)
+
+    def test_short_history_is_sent_verbatim(self):
+        self.say(1)
+        self.assertEqual(build_context(self.user, "next"), [
+            {"role": "user", "content": "question 1?"},
+            {"role": "assistant", "content": "Answer 1. " + " ".join(["detail"] * 10)},
+            {"role": "user", "content": "next"},
+        ])
+
+
+class ChatbotRouterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("ivan", password="secret123")
+
+    def test_route(self):
+        cases = {
+            "Hey there": "greeting",
+            "what did I spend this month?": "month",
+            "what is my income": "income",
+            "how much have I spent": "expense",
+            "how much is left": "balance",
+            "show my last transaction": "last_transaction",
+            "my health score": "score",
+            "predict next week": "forecast",
+            "Forecast my expenses": "forecast",
+            "predict my spending": "forecast",
+            "whats my expense forecast": "forecast",
+            "forecast this month's income": "forecast",
+            "how can I save?": "advice",
+            "what is emi": "emi",
+            "what's the weather": None,
+        }
+        for message, intent in cases.items():
+            with self.subTest(message=message):
+                self.assertEqual(route(message), intent)
+
+    def test_fact_snapshot_is_one_query(self):
+        today = datetime.date(2025, 3, 15)
+        Transaction.objects.create(user=self.user, category="income", amount=1000, date=today)
+        Transaction.objects.create(user=self.user, category="expense", amount=40, date=today)
+        Transaction.objects.create(user=self.user, category="expense", amount=60, date=datetime.date(2024, 3, 1))
+
+        with self.assertNumQueries(1):
+            facts = fact_snapshot(self.user, today=today)
+        self.assertEqual((facts.income, facts.expense), (1000, 100))
+        # same month of the previous year does not count
+        self.assertEqual((facts.month_income, facts.month_expense), (1000, 40))
+        self.assertEqual((facts.last_category, facts.last_amount, facts.last_date), ("expense", 40, today))
+
+        other = User.objects.create_user("judy", password="secret123")
+        self.assertEqual(fact_snapshot(other), (0.0, 0.0, 0.0, 0.0, None, None, None))
+        self.assertEqual(chatbot_reply(other, "last transaction"), "You have no transactions yet.")
+
+    def test_view_reply(self):
+        Transaction.objects.create(user=self.user, category="income", amount=500)
+        Transaction.objects.create(user=self.user, category="expense", amount=120.5)
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        response = client.post("/api/chatbot/", {"message": "How much is LEFT?"}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["reply"], "You currently have ₹379.50 left after expenses.")
+        self.assertEqual(client.post("/api/chatbot/", {"message": " "}, format="json").status_code, 400)
+
+
+class ChatArchiveTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("kate", password="secret123")
+        self.other = User.objects.create_user("liam", password="secret123")
+        now = datetime.datetime.now(datetime.timezone.utc)
+        for owner in (self.user, self.other):
+            for n in range(12):
+                msg = ChatMessage.objects.create(user=owner, message=f"q{n} ₹", reply=f"a{n}")
+                # one message per day, the newest today
+                ChatMessage.objects.filter(pk=msg.pk).update(created_at=now - datetime.timedelta(days=11 - n))
+
+    def archive(self, *args):
+        call_command("archive_chat_messages", *args, stdout=StringIO())
+
+    def test_archives_by_age_and_count_in_batches(self):
+        self.archive("--max-age-days", "8", "--keep-latest", "5", "--batch-size", "3", "--user-id", str(self.user.pk))
+        kept = list(ChatMessage.objects.filter(user=self.user).order_by("created_at").values_list("message", flat=True))
+        self.assertEqual(kept, [f"q{n} ₹" for n in range(7, 12)])
+        self.assertEqual(ChatMessage.objects.filter(user=self.other).count(), 12)
+
+        archives = ChatArchive.objects.filter(user=self.user).order_by("first_created_at")
+        self.assertEqual([a.count for a in archives], [3, 3, 1])
+        rows = [row for archive in archives for row in unpack(archive.data)]
+        self.assertEqual([row["message"] for row in rows], [f"q{n} ₹" for n in range(7)])
+
+        # a second run has nothing left to do
+        self.archive("--max-age-days", "8", "--keep-latest", "5")
+        self.assertFalse(archivable(self.user.pk, 8, 5).exists())
+        self.assertEqual(ChatArchive.objects.filter(user=self.user).count(), 3)
+
+    def test_restore_endpoint(self):
+        before = list(ChatMessage.objects.filter(user=self.user).values_list("pk", "message", "reply", "created_at"))
+        self.archive("--keep-latest", "2", "--batch-size", "4")
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        archives = client.get("/api/chatbot/archive/").json()
+        self.assertEqual([a["count"] for a in archives], [4, 4, 2])
+        response = client.post("/api/chatbot/archive/restore/", {"archive_ids": [archives[0]["id"]]}, format="json")
+        self.assertEqual(response.json(), {"restored": 4})
+        self.assertEqual(ChatMessage.objects.filter(user=self.user).count(), 6)
+
+        self.assertEqual(client.post("/api/chatbot/archive/restore/", {}, format="json").json(), {"restored": 6})
+        after = list(ChatMessage.objects.filter(user=self.user).values_list("pk", "message", "reply", "created_at"))
+        self.assertEqual(after, before)
+        self.assertFalse(ChatArchive.objects.filter(user=self.user).exists())
+        self.assertEqual(client.post("/api/chatbot/archive/restore/", {"archive_ids": "all"}, format="json").status_code, 400)
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        get_forecast_cache().clear()
+        self.user = User.objects.create_user("mona", password="secret123")
+        for date, category, amount in [("2025-01-05", "food", "10.50"), ("2025-01-20", "rent", "500"),
+                                       ("2025-02-03", "food", "4.25"), ("2025-03-01", "food", "7")]:
+            Expense.objects.create(user=self.user, category=category, amount=Decimal(amount), date=date)
+        Income.objects.create(user=self.user, source="salary", amount=1000, date="2025-01-31")
+        Expense.objects.create(user=User.objects.create_user("nick", password="secret123"),
+                               category="food", amount=99, date="2025-01-05")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_month_and_category_totals(self):
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.client.get("/api/rollups/?start=2025-01-01&end=2025-02-28").json()
+        self.assertEqual(len([q for q in ctx.captured_queries if "GROUP BY" in q["sql"]]), 2)
+        self.assertEqual(data["expense"], {
+            "total": 514.75, "count": 3,
+            "months": [{"month": "2025-01", "total": 510.5, "count": 2},
+                       {"month": "2025-02", "total": 4.25, "count": 1}],
+            "categories": [{"category": "food", "total": 14.75, "count": 2},
+                           {"category": "rent", "total": 500.0, "count": 1}],
+        })
+        self.assertEqual(data["income"]["categories"], [{"category": "salary", "total": 1000.0, "count": 1}])
+        self.assertEqual((data["start"], data["end"]), ("2025-01-01", "2025-02-28"))
+
+    def test_cached_per_data_version(self):
+        first = self.client.get("/api/rollups/").json()
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get("/api/rollups/").json(), first)
+        self.assertFalse([q for q in ctx.captured_queries if "GROUP BY" in q["sql"]])
+
+        Expense.objects.create(user=self.user, category="fun", amount=1, date="2025-03-02")
+        self.assertEqual(self.client.get("/api/rollups/").json()["expense"]["count"], first["expense"]["count"] + 1)
+
+    def test_bad_range(self):
+        for query in ["start=2025-13-01", "start=2025-02-01&end=2025-01-01"]:
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f"/api/rollups/?{query}").status_code, 400)
+
+
+class DashboardTests(TestCase):
+    def setUp(self):
+        get_forecast_cache().clear()
+        self.user = User.objects.create_user("olga", password="secret123", email="olga@example.com")
+        today = datetime.date.today()
+        for day in range(1, 10):
+            Expense.objects.create(user=self.user, category="food", amount=day * 10,
+                                   date=today - datetime.timedelta(days=day))
+        Income.objects.create(user=self.user, source="salary", amount=1000, date=today)
+        Transaction.objects.create(user=self.user, category="income", amount=300)
+        Goal.objects.create(user=self.user, title="old", target_amount=5, deadline=today - datetime.timedelta(days=1))
+        for n in range(7):
+            Goal.objects.create(user=self.user, title=f"goal {n}", target_amount=100,
+                                deadline=today + datetime.timedelta(days=7 - n))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_matches_the_single_endpoints(self):
+        data = self.client.get("/api/dashboard/").json()
+        self.assertEqual(list(data), ["profile", "totals", "score", "financial_score", "forecast", "goals", "recent"])
+        self.assertEqual(data["profile"], self.client.get("/api/me/").json())
+        self.assertEqual(data["score"], self.client.get("/api/score/").json())
+        self.assertEqual(data["financial_score"], self.client.get("/api/financial-score/").json())
+        self.assertEqual(data["forecast"], self.client.get("/api/forecast-v2/").json())
+        self.assertEqual(data["totals"]["expense_total"], 450)
+        self.assertEqual([g["title"] for g in data["goals"]], [f"goal {n}" for n in range(6, 1, -1)])
+        self.assertEqual(data["recent"]["expenses"], self.client.get("/api/expenses/?limit=5").json()["results"])
+        self.assertEqual(len(data["recent"]["income"]), 1)
+
+    def test_include_and_repeat_cost(self):
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.client.get("/api/dashboard/?include=goals,profile").json()
+        self.assertEqual(list(data), ["profile", "goals"])
+        # ETag version, cache key version, goals
+        self.assertLessEqual(len(ctx.captured_queries), 3)
+
+        etag = self.client.get("/api/dashboard/")["ETag"]
+        # version lookups for the ETag and the cached sections
+        with self.assertNumQueries(2):
+            self.client.get("/api/dashboard/")
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get("/api/dashboard/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get("/api/dashboard/?include=score,nope").status_code, 400)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        get_forecast_cache().clear()
+        self.user = User.objects.create_user("pete", password="secret123")
+        for day in range(1, 9):
+            Expense.objects.create(user=self.user, category="food", amount=day, date=f"2025-01-{day:02d}")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_not_modified_before_any_payload_work(self):
+        for url in ["/api/expenses/", "/api/expenses/?limit=2", "/api/forecast-v2/", "/api/financial-score/",
+                    "/api/rollups/", "/api/me/", "/api/categories/"]:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response["Cache-Control"], "private, no-cache")
+                with CaptureQueriesContext(connection) as ctx, \
+                        mock.patch("rest_framework.serializers.Serializer.to_representation") as serialize:
+                    again = self.client.get(url, HTTP_IF_NONE_MATCH=f'"other", {response["ETag"]}')
+                self.assertEqual((again.status_code, again.content), (304, b""))
+                self.assertEqual(again["ETag"], response["ETag"])
+                self.assertEqual(len(ctx.captured_queries), 1)
+                serialize.assert_not_called()
+
+        self.assertNotEqual(self.client.get("/api/expenses/")["ETag"], self.client.get("/api/expenses/?limit=2")["ETag"])
+
+    def test_etag_is_per_user_and_media_type(self):
+        other = User.objects.create_user("rory", password="secret123")
+        for day in range(1, 9):
+            Expense.objects.create(user=other, category="food", amount=day, date=f"2025-01-{day:02d}")
+        self.assertEqual(get_data_version(other), get_data_version(self.user))
+
+        etag = self.client.get("/api/expenses/")["ETag"]
+        client = APIClient()
+        client.force_authenticate(other)
+        self.assertNotEqual(client.get("/api/expenses/")["ETag"], etag)
+        self.assertEqual(client.get("/api/expenses/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        html = self.client.get("/api/expenses/", HTTP_ACCEPT="text/html")
+        self.assertEqual(html["Content-Type"].split(";")[0], "text/html")
+        self.assertNotEqual(html["ETag"], etag)
+
+    def test_writes_change_the_etag(self):
+        expenses = self.client.get("/api/expenses/")["ETag"]
+        categories = self.client.get("/api/categories/")["ETag"]
+        self.client.post("/api/categories/", {"name": "travel"}, format="json")
+        self.assertNotEqual(self.client.get("/api/categories/")["ETag"], categories)
+
+        etag = self.client.get("/api/expenses/")["ETag"]
+        self.assertNotEqual(etag, expenses)
+        Expense.objects.filter(user=self.user).first().delete()
+        response = self.client.get("/api/expenses/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+        # other users' writes don't
+        other = User.objects.create_user("quinn", password="secret123")
+        Expense.objects.create(user=other, category="food", amount=1, date="2025-01-01")
+        self.assertEqual(self.client.get("/api/expenses/", HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+
+@override_settings(AES_SECRET="test-secret")
+class DeltaSyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("rosa", password="secret123")
+        self.expense = Expense.objects.create(user=self.user, category="food", amount=10, date="2025-01-01")
+        self.goal = Goal.objects.create(user=self.user, title="bike", target_amount=300, deadline="2026-01-01")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def sync(self, since=None):
+        response = self.client.get("/api/changes/", {"since": since} if since is not None else {})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def ids(self, data, kind):
+        return [row["id"] for row in data["changes"][kind]["upserted"]], data["changes"][kind]["deleted"]
+
+    def test_full_then_incremental(self):
+        full = self.sync()
+        self.assertEqual(self.ids(full, "expenses"), ([self.expense.pk], []))
+        self.assertEqual(self.ids(full, "goals"), ([self.goal.pk], []))
+
+        added = Expense.objects.create(user=self.user, category="rent", amount=500, date="2025-01-02")
+        self.goal.title = "e-bike"
+        self.goal.save()
+        deleted_pk = self.expense.pk
+        self.expense.delete()
+        Income.objects.create(user=User.objects.create_user("sam", password="secret123"),
+                              source="salary", amount=1, date="2025-01-01")
+
+        delta = self.sync(full["token"])
+        self.assertEqual(self.ids(delta, "expenses"), ([added.pk], [deleted_pk]))
+        self.assertEqual(delta["changes"]["goals"]["upserted"][0]["title"], "e-bike")
+        self.assertEqual(self.ids(delta, "income"), ([], []))
+        self.assertEqual(self.ids(delta, "transactions"), ([], []))
+        self.assertFalse(delta["reset"])
+        self.assertGreater(int(delta["token"]), int(full["token"]))
+
+        again = self.sync(delta["token"])
+        self.assertEqual(again["token"], delta["token"])
+        self.assertFalse(any(c["upserted"] or c["deleted"] for c in again["changes"].values()))
+        self.assertEqual(self.client.get("/api/changes/?since=abc").status_code, 400)
+
+    def test_interleaved_writers_keep_their_own_versions(self):
+        from . import sync
+
+        token = int(self.sync()["token"])
+        stamp = sync.mark_changed
+        writers = []
+
+        def stamp_after_second_writer(queryset, version):
+            # W2 bumps and stamps between W1's bump and W1's stamp
+            if not writers:
+                writers.append("w2")
+                Expense.objects.create(user=self.user, category="w2", amount=2, date="2025-01-03")
+            return stamp(queryset, version)
+
+        with mock.patch.object(sync, "mark_changed", side_effect=stamp_after_second_writer):
+            first = Expense.objects.create(user=self.user, category="w1", amount=1, date="2025-01-02")
+        first.refresh_from_db()
+        second = Expense.objects.get(category="w2")
+        self.assertEqual((first.sync_version, second.sync_version), (token + 1, token + 2))
+
+        # a client that synced up to W1's version still gets W2, and nothing is skipped from the start
+        self.assertEqual(self.ids(self.sync(token + 1), "expenses"), ([second.pk], []))
+        delta = self.sync(token)
+        self.assertEqual(self.ids(delta, "expenses"), ([first.pk, second.pk], []))
+        self.assertEqual(delta["token"], str(token + 2))
+
+    def test_token_never_passes_the_version_read_first(self):
+        token = self.sync()["token"]
+        # a write whose version was taken after the sync read the counter
+        Expense.objects.filter(pk=self.expense.pk).update(sync_version=int(token) + 1)
+        self.assertEqual(self.ids(self.sync(token), "expenses"), ([], []))
+
+    def test_statement_import_is_synced(self):
+        token = self.sync()["token"]
+        self.client.post("/api/import/", {
+            "file": SimpleUploadedFile("bank.csv", b"Date,Description,Amount\n2025-01-02,Salary,100\n"),
+        }, format="multipart")
+        delta = self.sync(token)
+        self.assertEqual(len(delta["changes"]["transactions"]["upserted"]), 1)
+        self.assertEqual(delta["changes"]["transactions"]["upserted"][0]["description"], "Salary")
+
+    def test_tombstones_are_purged(self):
+        token = self.sync()["token"]
+        self.expense.delete()
+        recent = self.sync()["token"]
+        SyncTombstone.objects.update(deleted_at=datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc))
+        call_command("purge_sync_tombstones", stdout=StringIO())
+        self.assertFalse(SyncTombstone.objects.exists())
+
+        stale = self.sync(token)
+        self.assertTrue(stale["reset"])
+        self.assertEqual(self.ids(stale, "goals"), ([self.goal.pk], []))
+        self.assertFalse(self.sync(recent)["reset"])
+
+
+@override_settings(AES_SECRET="test-secret")
+class BatchMutationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("tina", password="secret123")
+        self.goal = Goal.objects.create(user=self.user, title="old", target_amount=10, deadline="2026-01-01")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def batch(self, items):
+        return self.client.post("/api/batch/", {"items": items}, format="json")
+
+    def items(self):
+        return [
+            {"key": "e1", "op": "create", "kind": "expense",
+             "data": {"amount": "12.50", "category": "food", "date": "2025-01-03"}},
+            {"key": "e2", "op": "create", "kind": "expense",
+             "data": {"amount": "7.50", "category": "food", "date": "2025-01-04"}},
+            {"key": "t1", "op": "create", "kind": "transaction",
+             "data": {"amount": 40, "category": "income", "description": "refund"}},
+            {"key": "g1", "op": "delete", "kind": "goal", "id": self.goal.pk},
+            {"key": "g2", "op": "delete", "kind": "goal", "id": 999999},
+        ]
+
+    def test_applies_once_and_replays(self):
+        token = self.client.get("/api/changes/").json()["token"]
+        response = self.batch(self.items())
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual([r["status"] for r in results], [201, 201, 201, 200, 404])
+
+        self.assertEqual(Expense.objects.filter(user=self.user).count(), 2)
+        self.assertFalse(Goal.objects.filter(pk=self.goal.pk).exists())
+        self.assertEqual(get_summary(self.user).expense_total, 20)
+        self.assertEqual(get_summary(self.user).transaction_income, 40)
+        self.assertEqual(search_transactions(self.user, "refund").count(), 1)
+        delta = self.client.get("/api/changes/", {"since": token}).json()["changes"]
+        self.assertEqual(len(delta["expenses"]["upserted"]), 2)
+        self.assertEqual(delta["goals"]["deleted"], [self.goal.pk])
+
+        # a retry of the whole batch (plus one new item) creates nothing twice
+        retry = self.batch(self.items() + [{"key": "i1", "op": "create", "kind": "income",
+                                            "data": {"amount": "100", "source": "gift", "date": "2025-01-05"}}])
+        self.assertEqual(retry.status_code, 200)
+        retried = retry.json()["results"]
+        self.assertEqual(retried[:5], [{**r, "replayed": True} for r in results])
+        self.assertEqual(retried[5]["status"], 201)
+        self.assertEqual(Expense.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(IdempotencyKey.objects.filter(user=self.user).count(), 6)
+
+    def test_invalid_item_rejects_the_batch(self):
+        items = self.items()
+        items[1]["data"]["amount"] = "lots"
+        items.append({"key": "x", "op": "update", "kind": "expense"})
+        response = self.batch(items)
+        self.assertEqual(response.status_code, 400)
+        statuses = [r["status"] for r in response.json()["results"]]
+        self.assertEqual(statuses, [424, 400, 424, 424, 424, 400])
+        self.assertIn("amount", response.json()["results"][1]["errors"])
+        self.assertFalse(Expense.objects.exists())
+        self.assertTrue(Goal.objects.filter(pk=self.goal.pk).exists())
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(self.batch([]).status_code, 400)
+
+
+@override_settings(AES_SECRET="test-secret")
+class FastRenderTests(TestCase):
+    URLS = [
+        "/api/expenses/", "/api/expenses/?limit=2", "/api/expenses/?fields=amount,note&limit=3",
+        "/api/income/", "/api/goals/?limit=2", "/api/transactions/", "/api/transactions/?limit=1",
+        "/api/transactions/search/?q=caf%C3%A9",
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("uma", password="secret123")
+        for n, note in enumerate(["plain", None, "line\u2028sep \u00e9 \x01 \"q\"", ""]):
+            Expense.objects.create(user=cls.user, category=f"food {n}", amount=Decimal("12.5") + n,
+                                   date=f"2025-01-0{n % 2 + 1}", note=note)
+            Income.objects.create(user=cls.user, source="₹ salary", amount=1000 + n, date="2025-01-01", note=note)
+            Goal.objects.create(user=cls.user, title=f"goal {n}", target_amount="99.99", deadline="2026-01-01")
+        for amount in [0.1 + 0.2, 100.0, 1e-05, 12345678.9]:
+            Transaction.objects.create(user=cls.user, category="expense", amount=amount,
+                                       description=encrypt_data("Café au lait"))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, url, fast):
+        with self.settings(FAST_LIST_RENDER=fast):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_byte_compatible_with_the_serializers(self):
+        for url in self.URLS:
+            with self.subTest(url=url):
+                fast, slow = self.get(url, True), self.get(url, False)
+                self.assertEqual(fast.content, slow.content)
+                self.assertEqual(fast["Content-Type"], slow["Content-Type"])
+                if "limit" in url:
+                    cursor_url = fast.json()["next"]
+                    self.assertEqual(self.get(cursor_url, True).content, self.get(cursor_url, False).content)
+
+    def test_datetimes_follow_the_active_timezone(self):
+        with self.settings(TIME_ZONE="Asia/Kolkata"):
+            fast, slow = self.get("/api/income/", True), self.get("/api/income/", False)
+        self.assertEqual(fast.content, slow.content)
+        self.assertTrue(fast.json()[0]["created_at"].endswith("+05:30"))
+
+    def test_dumps_matches_json_renderer(self):
+        data = {"a": [0.30000000000000004, 1e-05, 1e16, None, True, "\u2028\u2029 ✓ \x1f/\\"], "b": {}}
+        expected = JSONRenderer().render(data)
+        self.assertEqual(fast_render.dumps(data, allow_orjson=False), expected)
+        with mock.patch.object(fast_render, "load_orjson", return_value=None):
+            self.assertEqual(fast_render.dumps(data), expected)
+        # orjson, when installed, is only handed floats it formats like json.dumps
+        safe = {**data, "a": data["a"][:1] + data["a"][3:]}
+        self.assertEqual(fast_render.dumps(safe), JSONRenderer().render(safe))
+
+    def test_falls_back_for_unsupported_serializers(self):
+        class Computed(serializers.ModelSerializer):
+            total = serializers.SerializerMethodField()
+
+            class Meta:
+                model = Expense
+                fields = ["id", "total"]
+
+            def __init__(self, *args, fields=None, **kwargs):
+                super().__init__(*args, **kwargs)
+
+            def get_total(self, obj):
+                return 1
+
+        request = mock.Mock(accepted_renderer=JSONRenderer(), accepted_media_type="application/json")
+        self.assertIsNone(fast_render.fast_renderer(request, Computed))
+        for serializer_class in (ExpenseSerializer, IncomeSerializer, TransactionSerializer):
+            self.assertIsNotNone(fast_render.fast_renderer(request, serializer_class))
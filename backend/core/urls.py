@@ -1,61 +1,91 @@
+from importlib import import_module
+
 from django.urls import path
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-
-from .views import (
-    RegisterView,
-    TransactionListCreate,
-    ExpenseForecastView,
-    FinancialHealthView,
-    ChatbotView,
-    ChatbotLLMView,
-    CategoryListCreate,
-    BudgetListCreate,
-    GoalListCreateView,
-    GoalDeleteView,
-    ExpenseListCreateView,
-    ExpenseDeleteView,
-    IncomeListCreateView,
-    IncomeDeleteView,
-    UserProfileView,
-)
-
-from .ml_views import ForecastView, FinancialScoreView
+
+
+def lazy_view(dotted_path, is_async=False, **initkwargs):
+    """
+    Class-based view imported on its first request instead of when the
+    URLconf loads, so `manage.py` commands and worker boot don't pay for
+    every view module (and what they import). Async views need
+    is_async=True so Django runs them on the event loop.
+    """
+    module_name, _, class_name = dotted_path.rpartition(".")
+    view = None
+
+    def load():
+        nonlocal view
+        if view is None:
+            view = getattr(import_module(module_name), class_name).as_view(**initkwargs)
+        return view
+
+    if is_async:
+        async def dispatch(request, *args, **kwargs):
+            return await load()(request, *args, **kwargs)
+    else:
+        def dispatch(request, *args, **kwargs):
+            return load()(request, *args, **kwargs)
+
+    # core_view("APIView") is csrf_exempt as well; DRF enforces CSRF itself for session auth
+    dispatch.csrf_exempt = True
+    dispatch.__name__ = class_name
+    return dispatch
+
+
+def core_view(name):
+    return lazy_view(f"core.views.{name}")
+
 
 urlpatterns = [
     # Auth
-    path("register/", RegisterView.as_view(), name="register"),
-    path("token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
-    path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
+    path("register/", core_view("RegisterView"), name="register"),
+    path("token/", lazy_view("rest_framework_simplejwt.views.TokenObtainPairView"), name="token_obtain_pair"),
+    path("token/refresh/", lazy_view("rest_framework_simplejwt.views.TokenRefreshView"), name="token_refresh"),
 
     # User Profile
-    path("me/", UserProfileView.as_view(), name="user-profile"),
+    path("me/", core_view("UserProfileView"), name="user-profile"),
 
     # Transactions
-    path("transactions/", TransactionListCreate.as_view(), name="transactions"),
+    path("transactions/", core_view("TransactionListCreate"), name="transactions"),
+    path("transactions/search/", core_view("TransactionSearchView"), name="transactions-search"),
+
+
+    # Export / Import
+    path("export/", core_view("ExportCSVView"), name="export"),
+    path("import/", core_view("StatementImportView"), name="statement-import"),
 
     # Categories & Budgets
-    path("categories/", CategoryListCreate.as_view(), name="categories"),
-    path("budgets/", BudgetListCreate.as_view(), name="budgets"),
+    path("categories/", core_view("CategoryListCreate"), name="categories"),
+    path("budgets/", core_view("BudgetListCreate"), name="budgets"),
 
     # Goals
-    path("goals/", GoalListCreateView.as_view(), name="goals-list-create"),
-    path("goals/<int:pk>/", GoalDeleteView.as_view(), name="goals-delete"),
+    path("goals/", core_view("GoalListCreateView"), name="goals-list-create"),
+    path("goals/<int:pk>/", core_view("GoalDeleteView"), name="goals-delete"),
 
     # Expenses
-    path("expenses/", ExpenseListCreateView.as_view(), name="expenses-list-create"),
-    path("expenses/<int:pk>/", ExpenseDeleteView.as_view(), name="expenses-delete"),
+    path("expenses/", core_view("ExpenseListCreateView"), name="expenses-list-create"),
+    path("expenses/<int:pk>/", core_view("ExpenseDeleteView"), name="expenses-delete"),
 
     # Income
-    path("income/", IncomeListCreateView.as_view(), name="income-list-create"),
-    path("income/<int:pk>/", IncomeDeleteView.as_view(), name="income-delete"),
+    path("income/", core_view("IncomeListCreateView"), name="income-list-create"),
+    path("income/<int:pk>/", core_view("IncomeDeleteView"), name="income-delete"),
 
     # ML + Chatbot
-    path("forecast/", ExpenseForecastView.as_view(), name="forecast"),
-    path("score/", FinancialHealthView.as_view(), name="score"),
-    path("chatbot/", ChatbotView.as_view(), name="chatbot"),
-    path("chatbot/llm/", ChatbotLLMView.as_view(), name="chatbot-llm"),
+    path("forecast/", core_view("ExpenseForecastView"), name="forecast"),
+    path("score/", core_view("FinancialHealthView"), name="score"),
+    path("rollups/", core_view("RollupView"), name="rollups"),
+    path("dashboard/", core_view("DashboardView"), name="dashboard"),
+    path("changes/", core_view("SyncChangesView"), name="sync-changes"),
+    path("batch/", core_view("BatchView"), name="batch"),
+    path("chatbot/", core_view("ChatbotView"), name="chatbot"),
+    path("chatbot/llm/", core_view("ChatbotLLMView"), name="chatbot-llm"),
+    path("chatbot/llm/stats/", core_view("LLMCacheStatsView"), name="chatbot-llm-stats"),
+    path("chatbot/llm/stream/", lazy_view("core.async_views.ChatbotLLMStreamView", is_async=True),
+         name="chatbot-llm-stream"),
+    path("chatbot/archive/", core_view("ChatArchiveView"), name="chatbot-archive"),
+    path("chatbot/archive/restore/", core_view("ChatArchiveRestoreView"), name="chatbot-archive-restore"),
 
     # ML Views v2
-    path("forecast-v2/", ForecastView.as_view(), name="forecast-v2"),
-    path("financial-score/", FinancialScoreView.as_view(), name="financial-score"),
+    path("forecast-v2/", lazy_view("core.ml_views.ForecastView"), name="forecast-v2"),
+    path("financial-score/", lazy_view("core.ml_views.FinancialScoreView"), name="financial-score"),
 ]
@@ -1,28 +1,194 @@
 # core/utils.py
-from Crypto.Cipher import AES
+"""
+AES-256-EAX helpers for encrypted fields.
+
+Payload format: [<key id>:]base64(nonce(16) + tag(16) + ciphertext)
+
+Keys are versioned for online rotation:
+ - settings.AES_KEYS maps key id -> secret, settings.AES_ACTIVE_KEY names the
+   one new values are written with
+ - values without a key id are legacy payloads under settings.AES_SECRET
+   (and are still what gets written when no AES_KEYS are configured)
+Old and new keys decrypt side by side; `manage.py reencrypt_fields` moves
+existing rows onto the active key.
+
+encrypt_many/decrypt_many resolve the configured keys once per call and
+run each value through its own `AES.new(key, AES.MODE_EAX, nonce=...)`.
+They are a convenience for whole pages and columns, not a speed-up: the
+per-value cost is pycryptodome's EAX setup, the same as encrypt_data.
+"""
+
 import base64
+import functools
+import os
+
 from django.conf import settings
 
-def _get_secret():
-    secret = getattr(settings, 'AES_SECRET', None)
-    if not secret:
-        raise RuntimeError("AES_SECRET not set in settings")
+NONCE_SIZE = 16
+TAG_SIZE = 16
+
+KEY_ID_SEPARATOR = ':'  # never appears in base64 output
+
+
+@functools.lru_cache(maxsize=16)
+def _derive_key(secret):
     b = secret.encode() if isinstance(secret, str) else secret
     # pad/truncate to 32 bytes for AES-256
     if len(b) < 32:
         b = b.ljust(32, b'\0')
     return b[:32]
 
+
+def _get_secret():
+    secret = getattr(settings, 'AES_SECRET', None)
+    if not secret:
+        raise RuntimeError("AES_SECRET not set in settings")
+    return _derive_key(secret)
+
+
+def _configured_keys():
+    """{key id: key bytes}; the legacy AES_SECRET is stored under the id None."""
+    keys = {}
+    if getattr(settings, 'AES_SECRET', None):
+        keys[None] = _get_secret()
+    for key_id, secret in (getattr(settings, 'AES_KEYS', None) or {}).items():
+        if not key_id or KEY_ID_SEPARATOR in key_id:
+            raise RuntimeError(f"Invalid AES key id {key_id!r}")
+        keys[key_id] = _derive_key(secret)
+    return keys
+
+
+def active_key_id():
+    """Key id new values are encrypted with (None = legacy AES_SECRET)."""
+    active = getattr(settings, 'AES_ACTIVE_KEY', None)
+    if active is None and getattr(settings, 'AES_KEYS', None):
+        raise RuntimeError("AES_ACTIVE_KEY must name one of AES_KEYS")
+    return active
+
+
+def key_id_of(enc):
+    """Key id a payload was written with (None for legacy payloads)."""
+    if KEY_ID_SEPARATOR in enc:
+        return enc.split(KEY_ID_SEPARATOR, 1)[0]
+    return None
+
+
+@functools.cache
+def _aes():
+    # imported on first use: pycryptodome's cipher modules are slow to load
+    from Crypto.Cipher import AES
+    return AES
+
+
+class _Keyring:
+    """Key bytes for every configured key plus the active key id (immutable, shared by threads)."""
+
+    def __init__(self, keys, active):
+        self.keys = keys
+        self.active = active
+
+    def key(self, key_id):
+        try:
+            return self.keys[key_id]
+        except KeyError:
+            raise ValueError(f"Unknown encryption key id {key_id!r}")
+
+    def seal(self, plaintext):
+        AES = _aes()
+        cipher = AES.new(self.key(self.active), AES.MODE_EAX, nonce=os.urandom(NONCE_SIZE))
+        ciphertext, tag = cipher.encrypt_and_digest(plaintext)
+        return cipher.nonce + tag + ciphertext
+
+    def open(self, key_id, payload):
+        nonce, tag, ciphertext = payload[:NONCE_SIZE], payload[NONCE_SIZE:NONCE_SIZE + TAG_SIZE], payload[NONCE_SIZE + TAG_SIZE:]
+        if len(nonce) != NONCE_SIZE or len(tag) != TAG_SIZE:
+            raise ValueError("Encrypted payload too short")
+        AES = _aes()
+        return AES.new(self.key(key_id), AES.MODE_EAX, nonce=nonce).decrypt_and_verify(ciphertext, tag)
+
+
+def _keyring():
+    keys = _configured_keys()
+    active = active_key_id()
+    if active not in keys:
+        if active is None:
+            raise RuntimeError("AES_SECRET not set in settings")
+        raise RuntimeError(f"AES_ACTIVE_KEY {active!r} is not in AES_KEYS")
+    return _Keyring(keys, active)
+
+
+def _seal(keyring, raw):
+    enc = base64.b64encode(keyring.seal(raw.encode('utf-8'))).decode('utf-8')
+    if keyring.active is None:
+        return enc
+    return f"{keyring.active}{KEY_ID_SEPARATOR}{enc}"
+
+
+def _open(keyring, enc):
+    key_id, _, payload = enc.rpartition(KEY_ID_SEPARATOR)
+    return keyring.open(key_id or None, base64.b64decode(payload.encode('utf-8'))).decode('utf-8')
+
+
+def _decrypt_all(keyring, values, strict):
+    out = []
+    for value in values:
+        if not value:
+            out.append(value)
+            continue
+        try:
+            out.append(_open(keyring, value))
+        except ValueError:
+            # bad base64, unknown key id, MAC mismatch, not UTF-8
+            if strict:
+                raise
+            # if it wasn't encrypted, leave as-is
+            out.append(value)
+    return out
+
+
+def encrypt_many(values):
+    """Encrypt a list of strings, resolving the keys once."""
+    keyring = _keyring()
+    return [_seal(keyring, v) for v in values]
+
+
+def decrypt_many(values, strict=True):
+    """
+    Decrypt a list of payloads, resolving the keys once.
+
+    Empty values pass through. With strict=False a value that fails to
+    decrypt is returned unchanged instead of raising; a missing or invalid
+    key configuration (RuntimeError) always raises.
+    """
+    values = list(values)
+    if not any(values):
+        return values
+    return _decrypt_all(_keyring(), values, strict)
+
+
+def reencrypt_many(values):
+    """
+    Move payloads onto the active key.
+
+    Returns a list of (new value or None); None means the value is empty,
+    already on the active key, or could not be decrypted (left untouched).
+    """
+    keyring = _keyring()
+    out = []
+    for value in values:
+        if not value or key_id_of(value) == keyring.active:
+            out.append(None)
+            continue
+        try:
+            out.append(_seal(keyring, _open(keyring, value)))
+        except ValueError:
+            out.append(None)
+    return out
+
+
 def encrypt_data(raw: str) -> str:
-    secret = _get_secret()
-    cipher = AES.new(secret, AES.MODE_EAX)
-    ciphertext, tag = cipher.encrypt_and_digest(raw.encode('utf-8'))
-    payload = cipher.nonce + tag + ciphertext
-    return base64.b64encode(payload).decode('utf-8')
+    return encrypt_many([raw])[0]
+
 
 def decrypt_data(enc: str) -> str:
-    secret = _get_secret()
-    data = base64.b64decode(enc.encode('utf-8'))
-    nonce, tag, ciphertext = data[:16], data[16:32], data[32:]
-    cipher = AES.new(secret, AES.MODE_EAX, nonce)
-    return cipher.decrypt_and_verify(ciphertext, tag).decode('utf-8')
+    return _open(_keyring(), enc)
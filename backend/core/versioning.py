@@ -0,0 +1,81 @@
+# core/versioning.py
+"""
+Per-user data version.
+
+DataVersion.version goes up on every create/update/delete of the user's
+ledger rows (Transaction, Expense, Income, Goal) and of their categories
+and budgets. Anything derived from those rows can be cached under a key
+that includes the version: a write makes the old entries unreachable, so
+there is nothing to invalidate. The read endpoints also derive their
+ETags from it (core.conditional).
+
+Bulk paths that skip model signals (bulk_create, QuerySet.update) must call
+bump_data_version() themselves, after updating derived state. Receivers that
+maintain derived state are connected before these (CoreConfig.ready) for
+the same reason: a read that runs between the bump and the state update
+would cache the old state under the new version.
+"""
+
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal
+
+from .models import DataVersion, Transaction, Expense, Income, Goal, Category, Budget
+
+VERSIONED_MODELS = [Transaction, Expense, Income, Goal, Category, Budget]
+
+# sent with (instance, version, deleted) inside the transaction that took `version`
+# for a save/delete of `instance` (core.sync stamps rows and tombstones with it)
+version_bumped = Signal()
+
+
+def get_data_version(user):
+    return DataVersion.objects.filter(user=user).values_list("version", flat=True).first() or 0
+
+
+def _read_version(user_id):
+    return DataVersion.objects.filter(user_id=user_id).values_list("version", flat=True).get()
+
+
+def bump_data_version(user_id, create=True):
+    """
+    Increment the user's version and return the new value (None when there
+    is no row and `create` is False). Inside a transaction the DataVersion
+    row stays write-locked until commit, so whatever the caller writes
+    under the returned version in the same transaction becomes visible
+    together with the bump, before any later version can be taken.
+    """
+    if DataVersion.objects.filter(user_id=user_id).update(version=F("version") + 1):
+        return _read_version(user_id)
+    if not create:
+        return None
+    try:
+        with db_transaction.atomic():
+            DataVersion.objects.create(user_id=user_id, version=1)
+        return 1
+    except IntegrityError:
+        # another request created the row first
+        DataVersion.objects.filter(user_id=user_id).update(version=F("version") + 1)
+        return _read_version(user_id)
+
+
+def _on_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        with db_transaction.atomic():
+            version = bump_data_version(instance.user_id)
+            version_bumped.send(sender=sender, instance=instance, version=version, deleted=False)
+
+
+def _on_delete(sender, instance, **kwargs):
+    # never create here: during a user delete cascade the user row is going away
+    with db_transaction.atomic():
+        version = bump_data_version(instance.user_id, create=False)
+        if version is not None:
+            version_bumped.send(sender=sender, instance=instance, version=version, deleted=True)
+
+
+def connect_signals():
+    for model in VERSIONED_MODELS:
+        post_save.connect(_on_save, sender=model, dispatch_uid=f"version_post_save_{model.__name__}")
+        post_delete.connect(_on_delete, sender=model, dispatch_uid=f"version_post_delete_{model.__name__}")
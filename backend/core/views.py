@@ -3,12 +3,28 @@ from rest_framework import generics, permissions
 from django.contrib.auth.models import User
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated, AllowAny   # ✅ ADD THIS
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser   # ✅ ADD THIS
 from rest_framework import status
 from django.shortcuts import get_object_or_404
 from .models import ChatMessage
 from .serializers import ChatMessageSerializer
-from .models import Transaction, ChatMessage, Category, Budget, Goal,Expense,Income
+from .models import Transaction, ChatMessage, Category, Budget, Goal,Expense,Income, ChatArchive
+from .ledger import get_summary
+from .pagination import KeysetPagination, parse_fields
+from .conditional import ConditionalGetMixin
+from .fast_render import fast_renderer, json_response as fast_json_response
+from .export import CONTENT_TYPES, FILENAMES, ExportError, build_export_queryset, stream_export
+from .statements import StatementError, import_statement
+from .search import search_transactions
+from .rollups import RollupError, parse_range, rollup
+from .dashboard import DashboardError, build_dashboard, parse_include
+from .sync import SyncError, changes as sync_changes, parse_token as parse_sync_token
+from .batch import BatchError, apply_batch
+from .async_http import http_config
+from .llm_cache import get_reply_cache, reply_cache_key
+from .chat_context import build_context
+from .chatbot import chatbot_reply
+from .chat_archive import restore as restore_chat_archive
 from .serializers import (
     UserSerializer, TransactionSerializer,
     ChatMessageSerializer, CategorySerializer,
@@ -16,13 +32,16 @@ from .serializers import (
 )
 
 # ML helpers
-from ml.forecast_model import build_lstm_model
 from ml.finance_score import calculate_financial_score
+from .forecasting import transaction_forecast
 
-import requests
+import datetime
+import logging
 import os
-import csv
-from django.http import HttpResponse
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+logger = logging.getLogger(__name__)
 
 # -------------------------
 # Register
@@ -33,77 +52,182 @@ from django.http import HttpResponse
 #     permission_classes = [permissions.AllowAny]
 
 
+# -------------------------
+# List helper (keyset pagination + fields= projection)
+# -------------------------
+class KeysetListMixin:
+    keyset_field = "date"
+    keyset_descending = True
+
+    def list_response(self, request, queryset, serializer_class):
+        fields = parse_fields(request, serializer_class)
+        renderer = fast_renderer(request, serializer_class, fields)
+        if renderer is not None:
+            return self.fast_list_response(request, queryset, renderer)
+
+        if fields is not None:
+            columns = {f.name for f in queryset.model._meta.concrete_fields}
+            queryset = queryset.only("id", self.keyset_field, *columns.intersection(fields))
+
+        paginator = KeysetPagination(self.keyset_field, self.keyset_descending)
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        if page is None:
+            serializer = serializer_class(queryset, many=True, fields=fields)
+            return Response(serializer.data, status=status.HTTP_200_OK)
+        serializer = serializer_class(page, many=True, fields=fields)
+        return paginator.get_paginated_response(serializer.data)
+
+    def fast_list_response(self, request, queryset, renderer):
+        """Same body as the serializer path, rendered from .values() rows (core.fast_render)."""
+        rows = queryset.values(*{"id", self.keyset_field, *renderer.value_names})
+        paginator = KeysetPagination(self.keyset_field, self.keyset_descending)
+        page = paginator.paginate_queryset(rows, request, view=self)
+        if page is None:
+            data, plain = renderer.render(rows.iterator(chunk_size=2000))
+            return fast_json_response(data, allow_orjson=plain)
+        data, plain = renderer.render(page)
+        return fast_json_response(paginator.get_paginated_data(data), allow_orjson=plain)
+
+
 # -------------------------
 # Transactions
 # -------------------------
-class TransactionListCreate(generics.ListCreateAPIView):
+class TransactionListCreate(ConditionalGetMixin, KeysetListMixin, generics.ListCreateAPIView):
     serializer_class = TransactionSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         return Transaction.objects.filter(user=self.request.user).order_by('-date')
 
+    def list(self, request, *args, **kwargs):
+        return self.list_response(request, self.get_queryset(), TransactionSerializer)
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
 
-# -------------------------
-# Forecast
-# -------------------------
-class ExpenseForecastView(APIView):
+class TransactionSearchView(ConditionalGetMixin, KeysetListMixin, APIView):
+    """Word search over encrypted descriptions through the blind index (?q=netflix)."""
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        user = request.user
-        expenses = Transaction.objects.filter(
-            user=user, category="expense"
-        ).order_by("date")
+        query = (request.query_params.get("q") or "").strip()
+        if not query:
+            return Response({"error": "Query parameter 'q' is required."}, status=400)
+        transactions = search_transactions(request.user, query).order_by("-date")
+        return self.list_response(request, transactions, TransactionSerializer)
 
-        data = [float(t.amount) for t in expenses]
 
-        if len(data) < 7:
-            return Response({"error": "Need at least 7 expense records."}, status=400)
+# -------------------------
+# Forecast
+# -------------------------
+class ExpenseForecastView(ConditionalGetMixin, APIView):
+    permission_classes = [IsAuthenticated]
 
+    def get(self, request):
         try:
-            predictions = build_lstm_model(data)
-            return Response({"next_7_days": predictions})
+            daily = request.query_params.get("bucket") == "daily"
+            predictions = transaction_forecast(request.user, daily=daily)
         except Exception as e:
             return Response({"error": str(e)}, status=500)
 
+        if predictions is None:
+            return Response({"error": "Need at least 7 expense records."}, status=400)
+        return Response({"next_7_days": predictions})
+
 
 # -------------------------
 # Financial Health Score
 # -------------------------
-class FinancialHealthView(APIView):
+class FinancialHealthView(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        user = request.user
-        print("🔥 ALL USER TRANSACTIONS:", 
-                    list(Transaction.objects.filter(user=user)
-                        .values("id", "category", "amount")))
-        income_total = sum(
-            Transaction.objects.filter(
-                user=user, category__iexact="income"
-            ).values_list("amount", flat=True)
-        )
-
-        expense_total = sum(
-            Transaction.objects.filter(
-                user=user, category__iexact="expense"
-            ).values_list("amount", flat=True)
-        )
+        summary = get_summary(request.user)
+        income_total = summary.transaction_income
+        expense_total = summary.transaction_expense
 
         score_data = calculate_financial_score(income_total, expense_total)
         return Response(score_data)
 
 
 # -------------------------
-# Helper for chat history
+# Dashboard (one round trip for the home screen)
 # -------------------------
-def get_last_n_messages(user, n=6):
-    qs = ChatMessage.objects.filter(user=user).order_by("-created_at")[:n]
-    return list(reversed(qs))
+class DashboardView(ConditionalGetMixin, APIView):
+    """
+    Profile, totals, scores, forecast, upcoming goals and recent entries in one response.
+
+    Query params: include=profile,totals,score,financial_score,forecast,goals,recent (default all).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def etag_variant(self, request):
+        # upcoming goals roll over at midnight; the profile is not versioned
+        return f"{datetime.date.today().isoformat()}|{profile_fingerprint(request.user)}"
+
+    def get(self, request):
+        try:
+            sections = parse_include(request.query_params)
+        except DashboardError as e:
+            return Response({"error": str(e)}, status=400)
+        return Response(build_dashboard(request.user, sections))
+
+
+# -------------------------
+# Delta sync
+# -------------------------
+class SyncChangesView(ConditionalGetMixin, APIView):
+    """
+    Transactions, expenses, income and goals written or deleted since a sync token.
+
+    Query params: since=<token from the previous response> (omit for a full snapshot).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            since = parse_sync_token(request.query_params.get("since"))
+        except SyncError as e:
+            return Response({"error": str(e)}, status=400)
+        return Response(sync_changes(request.user, since))
+
+
+class BatchView(APIView):
+    """
+    Idempotent batch of creates and deletes (core.batch), for replaying an offline queue.
+
+    Body: {"items": [{"key", "op": "create"|"delete", "kind", "data" | "id"}, ...]}.
+    200 with one result per item when applied; 400 with the per-item errors when nothing was.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        try:
+            items = request.data.get("items") if isinstance(request.data, dict) else None
+            applied, results = apply_batch(request.user, items)
+        except BatchError as e:
+            return Response({"error": str(e)}, status=400)
+        return Response({"results": results}, status=200 if applied else 400)
+
+
+# -------------------------
+# Monthly / category rollups
+# -------------------------
+class RollupView(ConditionalGetMixin, APIView):
+    """
+    Expense and income totals per month and per category.
+
+    Query params: start / end (YYYY-MM-DD, inclusive, both optional).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            start, end = parse_range(request.query_params)
+        except RollupError as e:
+            return Response({"error": str(e)}, status=400)
+        return Response(rollup(request.user, start, end))
 
 
 # -------------------------
@@ -119,36 +243,7 @@ class ChatbotView(APIView):
         if not user_msg:
             return Response({"reply": "Please type a message."}, status=400)
 
-        reply = None
-
-        # Greetings
-        if any(g in user_msg for g in ["hello", "hi", "hey"]):
-            reply = f"Hello {user.username}! How can I assist you today?"
-        elif "income" in user_msg:
-            inc = sum(Transaction.objects.filter(user=user, category="income").values_list("amount", flat=True))
-            reply = f"Your total income is ₹{inc:.2f}."
-        elif "expense" in user_msg or "spent" in user_msg:
-            exp = sum(Transaction.objects.filter(user=user, category="expense").values_list("amount", flat=True))
-            reply = f"You have spent a total of ₹{exp:.2f}."
-        elif "score" in user_msg or "health" in user_msg:
-            inc = sum(Transaction.objects.filter(user=user, category="income").values_list("amount", flat=True))
-            exp = sum(Transaction.objects.filter(user=user, category="expense").values_list("amount", flat=True))
-            score_data = calculate_financial_score(inc, exp)
-            reply = f"Your financial health score is {score_data['financial_score']}. Status: {score_data['status']}."
-        elif "forecast" in user_msg or "predict" in user_msg:
-            expenses = Transaction.objects.filter(user=user, category="expense").order_by("date")
-            data = [float(t.amount) for t in expenses]
-            if len(data) < 7:
-                reply = "I need at least 7 expense records to generate a forecast."
-            else:
-                preds = build_lstm_model(data)
-                reply = f"Your next 7-day predicted expenses are: {preds}"
-        elif "save" in user_msg or "advice" in user_msg:
-            reply = "Tip: Use the 50-30-20 rule — 50% needs, 30% wants, 20% savings."
-        elif "emi" in user_msg:
-            reply = "EMI = Equated Monthly Installment — fixed monthly loan repayment."
-        else:
-            reply = "I'm not sure how to respond to that. Try asking about income, expenses, score, or forecast."
+        reply = chatbot_reply(user, user_msg)
 
         # Save message
         msg_obj = ChatMessage.objects.create(
@@ -164,6 +259,30 @@ class ChatbotView(APIView):
 # -------------------------
 # OpenAI LLM Proxy (Optional)
 # -------------------------
+def llm_history(user, user_msg):
+    """
+    Chat history for OpenRouter: rolling summary of older turns, the newest
+    turns that fit the token budget, then the new message (core.chat_context).
+    """
+    return build_context(user, user_msg)
+
+
+def openrouter_request(history, api_key, stream=False):
+    """(url, headers, payload) of an OpenRouter chat completion call."""
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+    }
+    payload = {
+        "model": settings.OPENROUTER_MODEL,
+        "messages": history,
+    }
+    if stream:
+        payload["stream"] = True
+        headers["Accept"] = "text/event-stream"
+    return settings.OPENROUTER_URL, headers, payload
+
+
 class ChatbotLLMView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -179,26 +298,18 @@ class ChatbotLLMView(APIView):
             return Response({"detail": "OpenRouter API key missing"}, status=503)
 
         # Build chat history for OpenRouter
-        history = []
-        for c in get_last_n_messages(user, 6):
-            history.append({"role": "user", "content": c.message})
-            history.append({"role": "assistant", "content": c.reply})
+        endpoint, headers, payload = openrouter_request(llm_history(user, user_msg), api_key)
+        timeouts = http_config()
 
-        history.append({"role": "user", "content": user_msg})
-
-        try:
-            endpoint = "https://openrouter.ai/api/v1/chat/completions"
+        def fetch():
+            # imported here: `requests` is slow to load and only this view needs it
+            import requests
 
             resp = requests.post(
                 endpoint,
-                headers={
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": "openai/gpt-4o-mini",  # free/cheap fast model
-                    "messages": history,
-                },
+                headers=headers,
+                json=payload,
+                timeout=(timeouts["CONNECT_TIMEOUT"], timeouts["READ_TIMEOUT"]),
             )
 
             data = resp.json()
@@ -206,11 +317,17 @@ class ChatbotLLMView(APIView):
             if "choices" not in data:
                 raise Exception(data.get("error", "Unknown OpenRouter response"))
 
-            reply = data["choices"][0]["message"]["content"]
+            return data["choices"][0]["message"]["content"]
 
-        except Exception as e:
-            print("🔥 ERROR:", str(e))
-            return Response({"detail": str(e)}, status=500)
+        try:
+            # same prompt after the same recent turns: served from cache, or shares a call already in flight
+            key = reply_cache_key(payload["model"], payload["messages"], user.pk)
+            reply = get_reply_cache().get_or_fetch(key, fetch, timeout=timeouts["READ_TIMEOUT"])
+
+        except Exception:
+            # upstream error text can carry account details: log it, don't return it
+            logger.exception("OpenRouter chat completion failed for user %s", user.pk)
+            return Response({"detail": "The assistant is unavailable right now. Please try again."}, status=500)
 
         msg = ChatMessage.objects.create(
             user=user,
@@ -220,8 +337,42 @@ class ChatbotLLMView(APIView):
         )
 
         return Response(ChatMessageSerializer(msg).data)
+
+
+class LLMCacheStatsView(APIView):
+    """Hit / miss / coalescing counters of this worker's LLM reply cache."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_reply_cache().metrics())
+
+
+class ChatArchiveView(APIView):
+    """The user's archived chat batches (core.chat_archive), oldest first."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        archives = (
+            ChatArchive.objects.filter(user=request.user)
+            .order_by("first_created_at", "pk")
+            .values("id", "count", "first_created_at", "last_created_at", "archived_at")
+        )
+        return Response(list(archives))
+
+
+class ChatArchiveRestoreView(APIView):
+    """Move archived chat history back into the live table: every batch, or just `archive_ids`."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        archive_ids = request.data.get("archive_ids")
+        if archive_ids is not None and (
+            not isinstance(archive_ids, list) or not all(isinstance(i, int) for i in archive_ids)
+        ):
+            return Response({"detail": "archive_ids must be a list of ids."}, status=400)
+        return Response({"restored": restore_chat_archive(request.user, archive_ids)})
 # ---------- CATEGORY ----------
-class CategoryListCreate(APIView):
+class CategoryListCreate(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
@@ -236,7 +387,7 @@ class CategoryListCreate(APIView):
         return Response(serializer.errors, status=400)
 
 # ---------- BUDGET ----------
-class BudgetListCreate(APIView):
+class BudgetListCreate(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
@@ -251,7 +402,7 @@ class BudgetListCreate(APIView):
         return Response(serializer.errors, status=400)
 
 # ---------- GOALS ----------
-class GoalListCreate(APIView):
+class GoalListCreate(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
@@ -267,31 +418,67 @@ class GoalListCreate(APIView):
 
 
 # -------------------------
-# CSV Export
+# CSV / NDJSON Export
 # -------------------------
-class ExportCSVView(APIView):
+class ExportCSVView(ConditionalGetMixin, APIView):
+    """
+    Streams the user's ledger as CSV (default) or NDJSON.
+
+    Query params: ledger=transaction|expense|income, output=csv|ndjson,
+    start / end (YYYY-MM-DD, inclusive), category (income: source).
+    """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        transactions = Transaction.objects.filter(user=request.user)
+        try:
+            ledger, output, qs = build_export_queryset(request.user, request.query_params)
+        except ExportError as e:
+            return Response({"error": str(e)}, status=400)
+
+        response = StreamingHttpResponse(
+            stream_export(ledger, output, qs),
+            content_type=CONTENT_TYPES[output],
+        )
+        response['Content-Disposition'] = f'attachment; filename="{FILENAMES[ledger]}.{output}"'
+        return response
 
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="transactions.csv"'
 
-        writer = csv.writer(response)
-        writer.writerow(["Date", "Category", "Amount", "Description"])
+# -------------------------
+# Bank statement import
+# -------------------------
+class StatementImportView(APIView):
+    """
+    Bulk import of a CSV / OFX bank statement (multipart field `file`).
 
-        for t in transactions:
-            writer.writerow([t.date, t.category, t.amount, t.description])
+    Form fields: ledger=transaction|expense|income (default transaction),
+    statement_format=csv|ofx (default: from the file extension).
+    """
+    permission_classes = [IsAuthenticated]
 
-        return response
-class ExpenseListCreateView(APIView):
+    def post(self, request):
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"error": "Upload a statement in the 'file' field."}, status=400)
+
+        try:
+            report = import_statement(
+                request.user,
+                upload,
+                ledger=request.data.get("ledger", "transaction"),
+                statement_format=request.data.get("statement_format"),
+            )
+        except StatementError as e:
+            return Response({"error": str(e)}, status=400)
+
+        return Response(report, status=status.HTTP_201_CREATED if report["created"] else status.HTTP_200_OK)
+
+
+class ExpenseListCreateView(ConditionalGetMixin, KeysetListMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         expenses = Expense.objects.filter(user=request.user).order_by("-date")
-        serializer = ExpenseSerializer(expenses, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return self.list_response(request, expenses, ExpenseSerializer)
 
     def post(self, request):
         serializer = ExpenseSerializer(data=request.data)
@@ -308,13 +495,14 @@ class ExpenseDeleteView(APIView):
         expense = get_object_or_404(Expense, pk=pk, user=request.user)
         expense.delete()
         return Response({"message": "Expense deleted"}, status=status.HTTP_200_OK)
-class GoalListCreateView(APIView):
+class GoalListCreateView(ConditionalGetMixin, KeysetListMixin, APIView):
     permission_classes = [IsAuthenticated]
+    keyset_field = "deadline"
+    keyset_descending = False
 
     def get(self, request):
         goals = Goal.objects.filter(user=request.user).order_by("deadline")
-        serializer = GoalSerializer(goals, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return self.list_response(request, goals, GoalSerializer)
 
     def post(self, request):
         serializer = GoalSerializer(data=request.data)
@@ -331,13 +519,12 @@ class GoalDeleteView(APIView):
         goal = get_object_or_404(Goal, pk=pk, user=request.user)
         goal.delete()
         return Response({"message": "Goal deleted"}, status=status.HTTP_200_OK)
-class IncomeListCreateView(APIView):
+class IncomeListCreateView(ConditionalGetMixin, KeysetListMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         incomes = Income.objects.filter(user=request.user).order_by("-date")
-        serializer = IncomeSerializer(incomes, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return self.list_response(request, incomes, IncomeSerializer)
 
     def post(self, request):
         serializer = IncomeSerializer(data=request.data)
@@ -370,9 +557,17 @@ class RegisterView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class UserProfileView(APIView):
+def profile_fingerprint(user):
+    """The profile fields, for ETags: User rows are not covered by the data version."""
+    return "|".join(str(getattr(user, name)) for name in UserSerializer.Meta.fields)
+
+
+class UserProfileView(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated]
 
+    def etag_variant(self, request):
+        return profile_fingerprint(request.user)
+
     def get(self, request):
         serializer = UserSerializer(request.user)
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -2,6 +2,9 @@
 ASGI config for finance_ai project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server (e.g. ``uvicorn finance_ai.asgi:application``) so
+async views such as the streaming LLM proxy (/api/chatbot/llm/stream/) run on
+the event loop instead of holding a worker thread per request.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
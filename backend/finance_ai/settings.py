@@ -180,3 +180,83 @@ CORS_ALLOW_HEADERS = list(
         ],
     )
 )
+
+
+# ------------------------
+# Field encryption (core/utils.py)
+# ------------------------
+AES_SECRET = os.environ.get("AES_SECRET")
+
+# Versioned keys for rotation: AES_KEYS="k2:secret,k3:secret" + AES_ACTIVE_KEY=k3.
+# Values written before key ids existed keep decrypting with AES_SECRET.
+AES_KEYS = dict(
+    item.split(":", 1) for item in os.environ.get("AES_KEYS", "").split(",") if ":" in item
+)
+AES_ACTIVE_KEY = os.environ.get("AES_ACTIVE_KEY") or None
+
+
+# ------------------------
+# Forecast result cache (core/forecasting.py)
+# ------------------------
+FORECAST_CACHE = {
+    "BACKEND": os.environ.get("FORECAST_CACHE_BACKEND", "lru"),  # "lru" (per process) or "django"
+    "TTL": 6 * 60 * 60,
+    "MAX_ENTRIES": 10000,
+    "CACHE_ALIAS": "default",
+}
+
+
+# ------------------------
+# LLM proxy (core/views.py, core/async_views.py)
+# ------------------------
+OPENROUTER_URL = os.environ.get("OPENROUTER_URL", "https://openrouter.ai/api/v1/chat/completions")
+OPENROUTER_MODEL = os.environ.get("OPENROUTER_MODEL", "openai/gpt-4o-mini")  # free/cheap fast model
+
+# httpx client used by the streaming view (core/async_http.py); timeouts in seconds
+LLM_HTTP = {
+    "CONNECT_TIMEOUT": 5.0,
+    "READ_TIMEOUT": 60.0,
+    "MAX_CONNECTIONS": 20,
+}
+
+# LLM reply cache + in-flight coalescing (core/llm_cache.py); TTL in seconds,
+# CONTEXT_TURNS = how many of the latest turns the key depends on besides the prompt
+LLM_CACHE = {
+    "TTL": 10 * 60,
+    "MAX_ENTRIES": 5000,
+    "CONTEXT_TURNS": 1,
+}
+
+# Token-budgeted chat context with a rolling summary (core/chat_context.py); sizes in estimated tokens
+LLM_CONTEXT = {
+    "TOKEN_BUDGET": 1200,
+    "MAX_TURNS": 6,
+    "MAX_TURN_TOKENS": 200,
+    "SUMMARY_TOKENS": 300,
+}
+
+
+# ------------------------
+# Chat history retention (core/chat_archive.py, manage.py archive_chat_messages)
+# ------------------------
+# None disables a limit; BATCH_SIZE messages per archive row and per transaction
+CHAT_RETENTION = {
+    "MAX_AGE_DAYS": 90,
+    "KEEP_LATEST": 200,
+    "BATCH_SIZE": 500,
+}
+
+
+# ------------------------
+# Delta sync (core/sync.py, manage.py purge_sync_tombstones)
+# ------------------------
+SYNC = {
+    # delete tombstones older than this are purged; clients syncing from before then get a full reset
+    "TOMBSTONE_TTL_DAYS": 30,
+}
+
+
+# ------------------------
+# Fast list rendering: .values() rows + orjson when installed (core/fast_render.py)
+# ------------------------
+FAST_LIST_RENDER = True
@@ -1,13 +1,11 @@
 from django.contrib import admin
 from django.urls import path, include
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-)
+
+from core.urls import lazy_view
 
 urlpatterns = [
     path("admin/", admin.site.urls),
-    path("api/token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
-    path("api/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
+    path("api/token/", lazy_view("rest_framework_simplejwt.views.TokenObtainPairView"), name="token_obtain_pair"),
+    path("api/token/refresh/", lazy_view("rest_framework_simplejwt.views.TokenRefreshView"), name="token_refresh"),
     path("api/", include("core.urls")),
 ]
@@ -0,0 +1,167 @@
+# backend/ml/engine.py
+"""
+Forecasting engine: a registry of models plus per-series model selection.
+
+Every model takes a series (oldest -> newest) and returns the next 7 values,
+like build_lstm_model. Registered models:
+ - "blend":          the trend / WMA blend of ml.forecast_model (default)
+ - "ses":            simple exponential smoothing
+ - "holt_winters":   additive Holt-Winters, weekly (period 7) seasonality
+ - "seasonal_naive": repeats the last 7 values
+
+select_model() runs a rolling-origin backtest (fit on everything before the
+origin, score MAE on the next HORIZON values, move the origin forward by
+HORIZON) and returns the model with the lowest error. select_models() does
+that for many series across a ProcessPoolExecutor. Series too short to
+backtest stay on "blend".
+
+Pure Python / NumPy only, so the functions can be shipped to worker
+processes; loading series from the database is the caller's job.
+"""
+
+import math
+from collections import namedtuple
+
+from .forecast_model import FORECAST_WINDOW, build_lstm_model
+
+HORIZON = 7
+SEASON = 7
+DEFAULT_MODEL = "blend"
+DEFAULT_FOLDS = 4
+
+Forecaster = namedtuple("Forecaster", ["name", "predict", "min_points", "window"])
+
+FORECASTERS = {}
+
+
+def register(name, min_points=7, window=FORECAST_WINDOW):
+    """Decorator adding a predict(series) -> 7 values function to the registry."""
+    def decorator(fn):
+        FORECASTERS[name] = Forecaster(name, fn, min_points, window)
+        return fn
+    return decorator
+
+
+def _finish(preds):
+    return [float(round(max(0.0, p), 2)) for p in preds]
+
+
+register("blend")(build_lstm_model)
+
+
+@register("ses", min_points=7)
+def simple_exponential_smoothing(data):
+    """Flat forecast at the smoothed level; alpha picked by one-step-ahead SSE."""
+    series = [float(v) for v in data[-FORECAST_WINDOW:]]
+    best = None
+    for alpha in (0.1, 0.2, 0.3, 0.5, 0.7, 0.9):
+        level, sse = series[0], 0.0
+        for y in series[1:]:
+            sse += (y - level) ** 2
+            level += alpha * (y - level)
+        if best is None or sse < best[0]:
+            best = (sse, level)
+    return _finish([best[1]] * HORIZON)
+
+
+def _holt_winters(series, alpha, beta, gamma):
+    first, second = series[:SEASON], series[SEASON:2 * SEASON]
+    level = sum(first) / SEASON
+    trend = (sum(second) - sum(first)) / (SEASON * SEASON)
+    seasonal = [y - level for y in first]
+    sse = 0.0
+    for t in range(SEASON, len(series)):
+        y = series[t]
+        s = seasonal[t % SEASON]
+        sse += (y - (level + trend + s)) ** 2
+        previous = level
+        level = alpha * (y - s) + (1 - alpha) * (level + trend)
+        trend = beta * (level - previous) + (1 - beta) * trend
+        seasonal[t % SEASON] = gamma * (y - level) + (1 - gamma) * s
+    n = len(series)
+    preds = [level + h * trend + seasonal[(n + h - 1) % SEASON] for h in range(1, HORIZON + 1)]
+    return sse, preds
+
+
+@register("holt_winters", min_points=2 * SEASON, window=8 * SEASON)
+def holt_winters(data):
+    """Additive Holt-Winters with period 7; smoothing constants picked by in-sample SSE."""
+    series = [float(v) for v in data[-8 * SEASON:]]
+    best = None
+    for alpha in (0.2, 0.5):
+        for beta in (0.05, 0.2):
+            for gamma in (0.1, 0.3):
+                sse, preds = _holt_winters(series, alpha, beta, gamma)
+                if best is None or sse < best[0]:
+                    best = (sse, preds)
+    return _finish(best[1])
+
+
+@register("seasonal_naive", min_points=SEASON, window=SEASON)
+def seasonal_naive(data):
+    """Next week repeats the last one."""
+    return _finish([float(v) for v in data[-SEASON:]])
+
+
+def min_selection_points(folds=DEFAULT_FOLDS):
+    """Shortest series select_model() will backtest (the most demanding model needs a full fit before the first origin)."""
+    return max(f.min_points for f in FORECASTERS.values()) + folds * HORIZON
+
+
+def backtest(name, series, folds=DEFAULT_FOLDS):
+    """Mean absolute error of model `name` over `folds` rolling origins (inf if it can't be scored)."""
+    forecaster = FORECASTERS[name]
+    series = [float(v) for v in series]
+    errors = []
+    for k in range(folds, 0, -1):
+        origin = len(series) - k * HORIZON
+        train = series[:origin]
+        if len(train) < forecaster.min_points:
+            continue
+        actual = series[origin:origin + HORIZON]
+        predicted = forecaster.predict(train[-forecaster.window:])
+        errors.append(sum(abs(p - a) for p, a in zip(predicted, actual)) / len(actual))
+    return sum(errors) / len(errors) if errors else math.inf
+
+
+def select_model(series, folds=DEFAULT_FOLDS):
+    """(best model name, {name: MAE}); DEFAULT_MODEL when the series is too short to compare."""
+    if len(series) < min_selection_points(folds):
+        return DEFAULT_MODEL, {}
+    errors = {name: backtest(name, series, folds) for name in FORECASTERS}
+    # ties go to the default model
+    best = min(errors, key=lambda name: (errors[name], name != DEFAULT_MODEL))
+    return best, errors
+
+
+def _select_one(item):
+    key, series, folds = item
+    name, errors = select_model(series, folds)
+    return key, name, errors
+
+
+def select_models(items, folds=DEFAULT_FOLDS, max_workers=None, chunksize=64):
+    """
+    Run select_model over [(key, series), ...] and yield (key, name, errors).
+
+    With max_workers > 1 the backtests are spread over worker processes.
+    """
+    work = [(key, list(series), folds) for key, series in items]
+    if not max_workers or max_workers < 2 or len(work) < 2:
+        yield from map(_select_one, work)
+        return
+    # imported here: concurrent.futures.process pulls in multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        yield from pool.map(_select_one, work, chunksize=chunksize)
+
+
+def forecast(name, series):
+    """Run model `name` on `series` (falls back to the default model); None with fewer than 7 points."""
+    forecaster = FORECASTERS.get(name)
+    if forecaster is None or len(series) < forecaster.min_points:
+        forecaster = FORECASTERS[DEFAULT_MODEL]
+    if len(series) < forecaster.min_points:
+        return None
+    return forecaster.predict(series[-forecaster.window:])
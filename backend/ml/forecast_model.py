@@ -12,16 +12,35 @@ TensorFlow. It returns 7 predicted amounts based on recent history using:
 import math
 from typing import List
 
-try:
-    import numpy as np
-except Exception:
-    # tiny fallback if numpy not installed (but recommend installing numpy)
-    def _to_np(x):
+# number of most recent points the predictor looks at
+FORECAST_WINDOW = 30
+
+
+def load_numpy():
+    """numpy, imported on first use so importing ml/ stays cheap (None if not installed)."""
+    try:
+        import numpy
+    except Exception:
+        # tiny fallback if numpy not installed (but recommend installing numpy)
+        return None
+    return numpy
+
+
+def _to_np(x, np):
+    if np is None:
         return [float(v) for v in x]
-    np = None
-else:
-    def _to_np(x):
-        return np.array(x, dtype=float)
+    return np.array(x, dtype=float)
+
+
+def blend_alpha(volatility: float) -> float:
+    """Map volatility in [0, inf) to the trend weight of the blend."""
+    if volatility < 0.05:
+        return 0.75
+    if volatility < 0.2:
+        return 0.6
+    if volatility < 0.5:
+        return 0.5
+    return 0.4
 
 
 def build_lstm_model(data: List[float]) -> List[float]:
@@ -29,20 +48,23 @@ def build_lstm_model(data: List[float]) -> List[float]:
     Lightweight predictor that returns next 7-day forecasts.
 
     Args:
-        data: list of floats (expense amounts) ordered oldest -> newest
+        data: list (or 1-D array) of floats (expense amounts) ordered oldest -> newest.
+              Only the last FORECAST_WINDOW points are used.
 
     Returns:
         List[7] of floats (next 7 predicted amounts)
     """
-    if not data or len(data) < 7:
+    if data is None or len(data) < 7:
         raise ValueError("Need at least 7 data points for forecast")
 
+    np = load_numpy()
+
     # Use last N points for fitting/trend, prefer last 30 if available
-    n_points = min(len(data), 30)
+    n_points = min(len(data), FORECAST_WINDOW)
     window = data[-n_points:]
 
     # Convert to numpy if available
-    arr = _to_np(window)
+    arr = _to_np(window, np)
 
     # 1) Linear trend fit on available points
     try:
@@ -86,16 +108,7 @@ def build_lstm_model(data: List[float]) -> List[float]:
     except Exception:
         volatility = 0.5
 
-    # volatility in [0, inf). map to blend factor alpha in [0.25, 0.75]
-    alpha = 0.5
-    if volatility < 0.05:
-        alpha = 0.75
-    elif volatility < 0.2:
-        alpha = 0.6
-    elif volatility < 0.5:
-        alpha = 0.5
-    else:
-        alpha = 0.4
+    alpha = blend_alpha(volatility)
 
     # Predict next 7 days using trend + blend with moving average baseline
     preds = []
@@ -109,3 +122,69 @@ def build_lstm_model(data: List[float]) -> List[float]:
         preds.append(pred)
 
     return preds
+
+
+def build_batch_forecast(windows):
+    """
+    Vectorized build_lstm_model over many series at once.
+
+    Args:
+        windows: 2-D array (users x window), each row right-aligned (newest value
+                 in the last column) with NaN padding on the left for series
+                 shorter than the window. Only the last FORECAST_WINDOW columns are used.
+
+    Returns:
+        (users x 7) array of predictions; rows with fewer than 7 points are NaN.
+        Matches build_lstm_model row by row up to float rounding.
+    """
+    np = load_numpy()
+    if np is None:
+        raise RuntimeError("build_batch_forecast requires numpy")
+
+    X = np.asarray(windows, dtype=float)
+    if X.ndim != 2:
+        raise ValueError("windows must be a 2-D array")
+    X = X[:, -FORECAST_WINDOW:]
+    users, width = X.shape
+    out = np.full((users, 7), np.nan)
+    if width < 7 or users == 0:
+        return out
+
+    valid = ~np.isnan(X)
+    n = valid.sum(axis=1).astype(float)
+    ok = n >= 7
+    Y = np.where(valid, X, 0.0)
+
+    # 1) Linear trend: closed-form least squares with x = 0..n-1 per row
+    x = np.arange(width)[None, :] - (width - n)[:, None]
+    sx = n * (n - 1) / 2
+    sxx = (n - 1) * n * (2 * n - 1) / 6
+    sy = Y.sum(axis=1)
+    sxy = (Y * np.where(valid, x, 0.0)).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        denom = n * sxx - sx * sx
+        m = np.where(denom != 0, (n * sxy - sx * sy) / denom, 0.0)
+        b = (sy - m * sx) / n
+
+    # 2) Weighted moving average of the last 7 points
+    last = Y[:, -7:]
+    weights = np.arange(1, 8, dtype=float)
+    wma = last @ weights / weights.sum()
+
+    # 3) Volatility -> blend factor
+    mean_recent = last.mean(axis=1)
+    std = last.std(axis=1)
+    volatility = std / np.where(mean_recent != 0, mean_recent, 1.0)
+    alpha = np.select(
+        [volatility < 0.05, volatility < 0.2, volatility < 0.5],
+        [0.75, 0.6, 0.5],
+        default=0.4,
+    )
+
+    steps = (n - 1)[:, None] + np.arange(1, 8)[None, :]
+    trend = m[:, None] * steps + b[:, None]
+    preds = alpha[:, None] * trend + (1 - alpha)[:, None] * wma[:, None]
+    preds = np.round(np.maximum(preds, 0.0), 2)
+
+    out[ok] = preds[ok]
+    return out
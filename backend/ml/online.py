@@ -0,0 +1,125 @@
+# backend/ml/online.py
+"""
+Constant-time version of build_lstm_model for a series that grows one value
+at a time.
+
+OnlineForecast keeps the sufficient statistics of the last FORECAST_WINDOW
+values instead of the series itself:
+ - n, sum_x, sum_xx, sum_y, sum_xy: least-squares trend with x = 0..n-1
+   inside the window
+ - recent_sum, recent_weighted: plain and 1..7-weighted sums of the last
+   RECENT values (the WMA baseline)
+ - recent_mean, recent_m2: Welford mean / sum of squared deviations of the
+   last RECENT values (the volatility)
+plus the window values themselves, so push() knows which value slides out.
+push() and predict() cost the same no matter how long the history is.
+
+Floating point error from the running sums is bounded by recomputing them
+from the window every REBASE_EVERY pushes.
+"""
+
+import math
+from typing import List, Optional
+
+from .forecast_model import FORECAST_WINDOW, blend_alpha
+
+RECENT = 7
+REBASE_EVERY = 1000
+
+# attributes that make up the state (what a persisted copy has to store)
+STATE_FIELDS = (
+    "n", "sum_x", "sum_xx", "sum_y", "sum_xy",
+    "recent_sum", "recent_weighted", "recent_mean", "recent_m2",
+    "window", "pushes",
+)
+
+
+class OnlineForecast:
+    def __init__(self, window=None, n=0, sum_x=0.0, sum_xx=0.0, sum_y=0.0, sum_xy=0.0,
+                 recent_sum=0.0, recent_weighted=0.0, recent_mean=0.0, recent_m2=0.0, pushes=0):
+        self.window = [float(v) for v in (window or [])]
+        self.n = n
+        self.sum_x = sum_x
+        self.sum_xx = sum_xx
+        self.sum_y = sum_y
+        self.sum_xy = sum_xy
+        self.recent_sum = recent_sum
+        self.recent_weighted = recent_weighted
+        self.recent_mean = recent_mean
+        self.recent_m2 = recent_m2
+        self.pushes = pushes
+
+    @classmethod
+    def from_values(cls, values):
+        """State after pushing `values` (oldest -> newest)."""
+        state = cls()
+        for value in list(values)[-FORECAST_WINDOW:]:
+            state.push(value)
+        return state
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in STATE_FIELDS}
+
+    def push(self, value):
+        y = float(value)
+        window = self.window
+        recent = min(len(window), RECENT)
+        leaving = window[-RECENT] if recent == RECENT else None
+
+        # trend sums: re-index x so the window always starts at 0
+        if self.n == FORECAST_WINDOW:
+            oldest = window.pop(0)
+            self.sum_xy += (self.n - 1) * y - (self.sum_y - oldest)
+            self.sum_y += y - oldest
+        else:
+            self.sum_x += self.n
+            self.sum_xx += self.n * self.n
+            self.sum_xy += self.n * y
+            self.sum_y += y
+            self.n += 1
+        window.append(y)
+
+        # WMA: every weight drops by one and the new value gets the top weight
+        if leaving is None:
+            recent += 1
+            self.recent_weighted += recent * y
+            self.recent_sum += y
+            delta = y - self.recent_mean
+            self.recent_mean += delta / recent
+            self.recent_m2 += delta * (y - self.recent_mean)
+        else:
+            self.recent_weighted += RECENT * y - self.recent_sum
+            self.recent_sum += y - leaving
+            mean = self.recent_mean
+            self.recent_mean += (y - leaving) / RECENT
+            self.recent_m2 += (y - leaving) * (y - self.recent_mean + leaving - mean)
+
+        self.pushes += 1
+        if self.pushes % REBASE_EVERY == 0:
+            self._rebase()
+
+    def _rebase(self):
+        fresh = OnlineForecast.from_values(self.window)
+        for name in STATE_FIELDS:
+            if name != "pushes":
+                setattr(self, name, getattr(fresh, name))
+
+    def predict(self) -> Optional[List[float]]:
+        """Same 7 values as build_lstm_model(series); None with fewer than 7 points."""
+        n = self.n
+        if n < RECENT:
+            return None
+
+        denom = n * self.sum_xx - self.sum_x * self.sum_x
+        m = (n * self.sum_xy - self.sum_x * self.sum_y) / denom if denom != 0 else 0.0
+        b = (self.sum_y - m * self.sum_x) / n
+
+        wma = self.recent_weighted / (RECENT * (RECENT + 1) / 2)
+        std = math.sqrt(max(self.recent_m2, 0.0) / RECENT)
+        volatility = std / (self.recent_mean if self.recent_mean != 0 else 1)
+        alpha = blend_alpha(volatility)
+
+        return [
+            float(round(max(0.0, alpha * (m * (n - 1 + i) + b) + (1 - alpha) * wma), 2))
+            for i in range(1, 8)
+        ]
@@ -0,0 +1,96 @@
+# backend/ml/series.py
+"""
+Series loading for the forecasters.
+
+build_lstm_model only looks at the last FORECAST_WINDOW points, so there is
+no reason to pull a user's whole history into Python. These helpers push the
+ORDER BY / LIMIT (and optionally the per-day SUM) into the database and hand
+back just the tail window, oldest -> newest, as a float array.
+
+They take a queryset that is already filtered to one user's series, which
+keeps ml/ free of any knowledge about the app's models.
+"""
+
+from django.db.models import F, Sum, Window
+from django.db.models.functions import RowNumber, TruncDate
+
+from .forecast_model import FORECAST_WINDOW, load_numpy
+
+
+def _as_array(values):
+    values = [float(v) for v in reversed(values)]
+    np = load_numpy()
+    if np is None:
+        return values
+    return np.array(values, dtype=float)
+
+
+def load_tail(queryset, value_field="amount", order_field="date", window=FORECAST_WINDOW):
+    """Last `window` raw values of the series."""
+    rows = (
+        queryset.order_by(f"-{order_field}", "-pk")
+        .values_list(value_field, flat=True)[:window]
+    )
+    return _as_array(list(rows))
+
+
+def load_daily_tail(queryset, value_field="amount", order_field="date", window=FORECAST_WINDOW):
+    """Per-day sums for the last `window` days that have entries."""
+    field = queryset.model._meta.get_field(order_field)
+    if field.get_internal_type() == "DateField":
+        day = order_field
+    else:
+        queryset = queryset.annotate(day=TruncDate(order_field))
+        day = "day"
+    rows = (
+        queryset.values(day)
+        .annotate(total=Sum(value_field))
+        .order_by(f"-{day}")
+        .values_list("total", flat=True)[:window]
+    )
+    return _as_array(list(rows))
+
+
+def load_tail_matrix(queryset, group_field="user_id", value_field="amount", order_field="date",
+                     window=FORECAST_WINDOW, chunk_size=5000, daily=False):
+    """
+    Tail windows of many series in one query (ROW_NUMBER() per group).
+
+    Returns (group ids, matrix) where matrix row i holds the last `window`
+    values of group ids[i], right-aligned (newest last) with NaN padding on
+    the left -- the layout build_batch_forecast expects. With daily=True the
+    values are per-day sums, as in load_daily_tail.
+    """
+    np = load_numpy()
+    if np is None:
+        raise RuntimeError("load_tail_matrix requires numpy")
+
+    if daily:
+        field = queryset.model._meta.get_field(order_field)
+        if field.get_internal_type() != "DateField":
+            queryset = queryset.annotate(day=TruncDate(order_field))
+            order_field = "day"
+        queryset = queryset.values(group_field, order_field).annotate(total=Sum(value_field))
+        value_field = "total"
+        order_by = [F(order_field).desc()]
+    else:
+        order_by = [F(order_field).desc(), F("pk").desc()]
+
+    rows = (
+        queryset.annotate(rn=Window(RowNumber(), partition_by=[F(group_field)], order_by=order_by))
+        .filter(rn__lte=window)
+        .values_list(group_field, "rn", value_field)
+        .order_by()
+    )
+
+    index = {}
+    cells = []
+    for group, rn, value in rows.iterator(chunk_size=chunk_size):
+        row = index.setdefault(group, len(index))
+        cells.append((row, window - rn, float(value)))
+
+    matrix = np.full((len(index), window), np.nan)
+    if cells:
+        r, c, v = (np.array(col) for col in zip(*cells))
+        matrix[r.astype(int), c.astype(int)] = v
+    return list(index), matrix